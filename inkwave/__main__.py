@@ -1,21 +1,197 @@
+import typing
 from pathlib import Path
 
 from plumbum import cli
 
-from . import mainAPI
+if typing.TYPE_CHECKING:
+    from .synth import SynthParams
+
+# the rest is imported in the `main`s, so that a command loads only what it needs: NumPy, the Kaitai-generated parser, multiprocessing, sockets and so on take longer to import than short commands take to run
 
 
 class MainCLI(cli.Application):
     """Convert a .wbf file to a .wrf file or if no output file is specified display human readable info about the specified .wbf or .wrf file."""
 
-    USAGE = "inkwave file.wbf/file.wrf [-o output.wrf]"
+    USAGE = "inkwave file.wbf/file.wrf [-o output.wrf] [--mode MODE --temp TEMP]"
 
     outfile_path = cli.SwitchAttr("-o", help="Specify output file")
     force_input = cli.SwitchAttr("-f", help="Force inkwave to interpret input file as either .wrf or .wbf format regardless of file extension")
     trace = cli.Flag("-t", help="Enable extended tracing needed for testing of identicity of the behavior of different impls.")
+    mode = cli.SwitchAttr("--mode", str, requires=["--temp"], excludes=["-o", "-t", "--trace-file"], help="Decode only the waveform of this mode (a number or a name like GC16)")
+    temp = cli.SwitchAttr("--temp", int, requires=["--mode"], help="Decode only the waveform for this temperature, in °C")
+    cache_dir = cli.SwitchAttr("--cache-dir", help="Keep the decoded waveforms of the files in this dir, so they are not decoded again next time")
+    trace_file = cli.SwitchAttr("--trace-file", help="Write the traces of the waveforms into this file in the compact binary format (see `inkwave.trace.readBinaryTrace`)")
+
+    def main(self, infile_path: str = None) -> int:
+        if self.nested_command:
+            return 0
+
+        if infile_path is None:
+            self.help()
+            return 1
+
+        if self.mode is not None:
+            from .api import lookupAPI
+
+            return lookupAPI(Path(infile_path), self.mode, self.temp, self.force_input, Path(self.cache_dir) if self.cache_dir else None)
+
+        from .api import mainAPI
+
+        args = (Path(infile_path), self.force_input, Path(self.outfile_path) if self.outfile_path else None, (2 if self.trace else 0), Path(self.cache_dir) if self.cache_dir else None)
+        if self.trace_file:
+            from .trace import BinarySink
+
+            with Path(self.trace_file).open("wb") as f:
+                return mainAPI(*args, BinarySink(f))
+
+        return mainAPI(*args)
+
+
+@MainCLI.subcommand("batch")
+class BatchCLI(cli.Application):
+    """Process many .wbf/.wrf files (directories are searched recursively, other arguments are globs) with a pool of worker processes. Results are printed in a stable order."""
+
+    jobs = cli.SwitchAttr(["-j", "--jobs"], int, help="Number of worker processes, the count of CPUs by default")
+    outdir = cli.SwitchAttr("-o", help="Convert the .wbf files into .wrf ones in this directory")
+    force_input = cli.SwitchAttr("-f", help="Force inkwave to interpret input files as either .wrf or .wbf format regardless of file extension")
+    quiet = cli.Flag(["-q", "--quiet"], help="Print only the status of each file")
+    cache_dir = cli.SwitchAttr("--cache-dir", help="Keep the decoded waveforms of the files in this dir, so they are not decoded again next time")
+
+    def main(self, *inputs: str) -> int:
+        from .batch import batchAPI
+
+        return batchAPI(inputs, self.jobs, self.force_input, Path(self.outdir) if self.outdir else None, self.quiet, Path(self.cache_dir) if self.cache_dir else None)
+
+
+@MainCLI.subcommand("serve")
+class ServeCLI(cli.Application):
+    """Keep the parsed files in memory and answer (file, mode, temperature) requests with the transition LUTs of the waveforms, over a Unix socket or a localhost TCP port."""
+
+    socket_path = cli.SwitchAttr("--socket", excludes=["--port"], help="Listen on this Unix socket")
+    port = cli.SwitchAttr("--port", int, excludes=["--socket"], help="Listen on this TCP port of 127.0.0.1")
+    cache_size = cli.SwitchAttr("--cache-size", int, help="Max total size of the responses kept in memory, in bytes, 64 MiB by default")
+    max_files = cli.SwitchAttr("--max-files", cli.Range(1, 1 << 16), help="Max count of the parsed files kept in memory, 16 by default")
+    cache_dir = cli.SwitchAttr("--cache-dir", help="Keep the decoded waveforms of the files in this dir, so they are not decoded again next time")
+    allow = cli.SwitchAttr("--allow", cli.ExistingDirectory, list=True, help="Serve only the files within this dir. Without it any file the server can read can be requested by anyone who can connect to it")
+
+    def main(self, *preload: str) -> int:
+        if self.socket_path is None and self.port is None:
+            self.help()
+            return 1
+
+        from .server import DEFAULT_LUT_CACHE_SIZE, DEFAULT_MAX_FILES, serveAPI
+
+        address = self.socket_path if self.socket_path is not None else ("127.0.0.1", self.port)
+        return serveAPI(address, self.cache_size if self.cache_size is not None else DEFAULT_LUT_CACHE_SIZE, Path(self.cache_dir) if self.cache_dir else None, [Path(p) for p in preload], self.allow or None, self.max_files if self.max_files is not None else DEFAULT_MAX_FILES)
+
+
+@MainCLI.subcommand("diff")
+class DiffCLI(cli.Application):
+    """Check that the traces of the .wbf files (directories are searched recursively) are the same as the ones of the C inkwave, in-process and with a pool of worker processes. The C traces are read from file.wbf_c.txt, as written by tests/convert.sh, unless --c-binary is given."""
+
+    jobs = cli.SwitchAttr(["-j", "--jobs"], int, help="Number of worker processes, the count of CPUs by default")
+    c_binary = cli.SwitchAttr("--c-binary", cli.ExistingFile, help="Produce the C traces with this inkwave binary instead of reading the stored ones")
+    quiet = cli.Flag(["-q", "--quiet"], help="Print only the files that diverged")
+
+    def main(self, *inputs: str) -> int:
+        from .difftrace import diffAPI
+
+        return diffAPI(inputs, self.jobs, self.c_binary, self.quiet)
+
+
+@MainCLI.subcommand("brute")
+class BruteCLI(cli.Application):
+    """Look for the checksum giving an unknown byte of the .wbf files (cs2 by default, directories are searched recursively): sums, xors, byte differences and CRC-8s over every range of the first bytes, evaluated with NumPy over a pool of worker processes."""
+
+    jobs = cli.SwitchAttr(["-j", "--jobs"], int, help="Number of worker processes, the count of CPUs by default")
+    target = cli.SwitchAttr("--target", int, default=47, help="Offset of the byte to explain, 47 (cs2) by default")
+    window = cli.SwitchAttr("--window", int, default=100, help="Look at the ranges within this many first bytes")
+    include_target = cli.Flag("--include-target", help="Also try the ranges containing the target byte itself")
+    top = cli.SwitchAttr("--top", int, default=20, help="Print at most this many matches")
+
+    def main(self, *inputs: str) -> int:
+        from .brute import bruteAPI
+
+        return bruteAPI(inputs, self.target, self.window, self.jobs, self.include_target, self.top)
+
+
+@MainCLI.subcommand("trailer")
+class TrailerCLI(cli.Application):
+    """Rank checksum hypotheses (sums, xors, lengths and CRC-8s with added or xored constants) over the bodies of the unique waveforms of the .wbf files by how many of the unknown bytes following the waveforms they explain. Directories are searched recursively, the files are read with a pool of worker processes."""
+
+    jobs = cli.SwitchAttr(["-j", "--jobs"], int, help="Number of worker processes, the count of CPUs by default")
+
+    def main(self, *inputs: str) -> int:
+        from .trailer import trailerAPI
+
+        return trailerAPI(inputs, self.jobs)
+
+
+@MainCLI.subcommand("store")
+class StoreCLI(cli.Application):
+    """Ingest the .wbf files (directories are searched recursively) into a content-addressed store of decoded waveforms, keeping each waveform once however many files use it, and a manifest of which waveform each (mode, temperature range) pair of each file uses."""
+
+    jobs = cli.SwitchAttr(["-j", "--jobs"], int, help="Number of worker processes, the count of CPUs by default")
+    quiet = cli.Flag(["-q", "--quiet"], help="Print only the totals")
+
+    def main(self, store: str, *inputs: str) -> int:
+        from .store import storeAPI
+
+        return storeAPI(Path(store), inputs, self.jobs, self.quiet)
+
+
+# the defaults of `inkwave.synth.SynthParams`, repeated here so that `--help` doesn't import NumPy
+SYNTH_MODES = 8
+SYNTH_TEMPS = 14
+SYNTH_UNIQUE = 100
+SYNTH_PHASES = 100
+
+
+class SynthSwitches(cli.Application):
+    """Switches of the synthetic files"""
+
+    seed = cli.SwitchAttr("--seed", int, default=0, help="Seed of the first file, each next one uses the next seed")
+    modes = cli.SwitchAttr("--modes", cli.Range(1, 256), default=SYNTH_MODES, help="Number of modes")
+    temps = cli.SwitchAttr("--temps", cli.Range(1, 255), default=SYNTH_TEMPS, help="Number of temperature ranges")
+    unique = cli.SwitchAttr("--unique", int, default=SYNTH_UNIQUE, help="Number of unique waveforms, at most modes * temps")
+    phases = cli.SwitchAttr("--phases", int, default=SYNTH_PHASES, help="Max number of phases in a waveform")
+    five_bpp = cli.Flag("--5bpp", help="Generate 5 bits per pixel files")
+
+    @property
+    def synth_params(self) -> "SynthParams":
+        from .synth import SynthParams
+
+        return SynthParams(self.modes, self.temps, self.unique, self.phases, 5 if self.five_bpp else 4)
+
+
+@MainCLI.subcommand("synth")
+class SynthCLI(SynthSwitches):
+    """Generate synthetic .wbf files with valid checksums and random waveforms."""
+
+    count = cli.SwitchAttr(["-n", "--count"], int, default=1, help="Number of files")
+
+    def main(self, outdir: str) -> int:
+        from .synth import writeCorpus
+
+        for p in writeCorpus(Path(outdir), self.count, self.synth_params, self.seed):
+            print(p)
+        return 0
+
+
+@MainCLI.subcommand("bench")
+class BenchCLI(SynthSwitches):
+    """Time header parsing, the first and second passes, decoding and conversion on the files, or on a synthetic one if there are none."""
+
+    only = cli.SwitchAttr("--only", str, list=True, help="Run only this benchmark, an unknown name lists the available ones")
+    imports = cli.Flag("--imports", help="Time the imports of the package and its modules in fresh interpreters instead")
+
+    def main(self, *inputs: str) -> int:
+        from .bench import benchAPI, importBenchAPI
+
+        if self.imports:
+            return importBenchAPI()
 
-    def main(self, infile_path: str) -> int:
-        return mainAPI(Path(infile_path), self.force_input, Path(self.outfile_path) if self.outfile_path else None, (2 if self.trace else 0))
+        return benchAPI([Path(p) for p in inputs], self.only or None, self.synth_params, self.seed)
 
 
 if __name__ == "__main__":
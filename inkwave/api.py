@@ -0,0 +1,761 @@
+#!/usr/bin/env python3
+
+import heapq
+import io
+import mmap
+import os
+import struct
+import sys
+import typing
+from enum import IntEnum, IntFlag
+from io import IOBase
+from itertools import takewhile
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Union
+from zlib import crc32
+from warnings import warn
+
+import kaitaistruct
+import numpy as np
+
+from .kaitai.eink_wbf import EinkWbf
+from .kaitai.memory_view_io import MemoryViewIO, mapFile
+from .lookup import lookupWaveform, lookupWrfWaveform
+from .checksums import CRC32_START_VALUE, ChecksumError
+from .diskcache import DiskCache
+from .header import HEADER_STRUCT, readHeader
+from .tables import WaveformIndex
+from .trace import TextSink, TraceSink, traceWaveform
+from .waveform import WaveformCache
+from .wrf import WrfFile, WrfLayout, renderTempRanges, renderWrf, writeWrf
+
+warn("We have moved from M$ GitHub to https://codeberg.org/KOLANICH-tools/inkwave.py , read why on https://codeberg.org/KOLANICH/Fuck-GuanTEEnomo .")
+
+class uint(int):
+	def __init__(self, v: Union[int, "uint"]) -> None:
+		self = v
+
+
+class uint64_t(uint):
+	def __init__(self, v: Union[int, "uint64_t"]) -> None:
+		super().__init__(v & 0xFFFFFFFFFFFFFFFF)
+
+
+class uint32_t(uint64_t):
+	def __init__(self, v: Union[int, "uint32_t"]) -> None:
+		super().__init__(v & 0xFFFFFFFF)
+
+
+class uint16_t(uint32_t):
+	def __init__(self, v: Union[int, "uint16_t"]) -> None:
+		super().__init__(v & 0xFFFF)
+
+
+class uint8_t(uint16_t):
+	def __init__(self, v: Union[int, "uint8_t"]) -> None:
+		super().__init__(v & 0xFF)
+
+
+class int64_t(int):
+	def __init__(self, v: Union[int, "int64_t"]):
+		super().__init__(v & 0xFFFFFFFFFFFFFFFF)
+
+
+class size_t(uint64_t):
+	pass
+
+
+class int32_t(int64_t):
+	def __init__(self, v: Union[int, "int32_t"]):
+		super().__init__(v & 0xFFFFFFFF)
+
+
+class int16_t(int32_t):
+	def __init__(self, v: Union[int, "int16_t"]):
+		super().__init__(v & 0xFFFF)
+
+
+class int8_t(int16_t):
+	def __init__(self, v: Union[int, "int8_t"]):
+		super().__init__(v & 0xFF)
+
+
+# there probably aren't any displays with more waveforms than this (we hope)
+# (technically the header allows for 256 * 256 waveforms but that's not realistic)
+MAX_WAVEFORMS = 4096
+
+# these are the actual maximums
+MAX_MODES = 256
+MAX_TEMP_RANGES = 256
+
+
+MODE = EinkWbf.Header.Mode
+
+update_modes = {
+	MODE.initialization: "INIT (panel initialization / clear screen to white)",
+	MODE.direct_update_2: "DU (direct update, gray to black/white transition, 1bpp)",
+	MODE.grayscale_clearing_16: "GC16 (high fidelity, flashing, 4bpp)",
+	MODE.grayscale_clearing_16_fast: "GC16_FAST (medium fidelity, 4bpp)",
+	MODE.animation2: "A2 (animation update, fastest and lowest fidelity)",
+	MODE.gl16: "GL16 (high fidelity from white transition, 4bpp)",
+	MODE.gl16_fast: "GL16_FAST (medium fidelity from white transition, 4bpp)",
+	MODE.direct_update_4: "DU4 (direct update, medium fidelity, text to text, 2bpp)",
+	MODE.reagl: "REAGL (non-flashing, ghost-compensation)",
+	MODE.reagl_dithered: "REAGLD (non-flashing, ghost-compensation with dithering)",
+	MODE.gl4: "GL4 (2-bit from white transition, 2bpp)",
+	MODE.gl16_inv: "GL16_INV (high fidelity for black transition, 4bpp)"
+}
+
+mfg_codes = {
+	EinkWbf.Header.MfgCode.ed060scf_v220_6inch_tequila: 'ED060SCF (V220 6" Tequila)',
+	EinkWbf.Header.MfgCode.ed060scfh1_v220_tequila_hydis_line_2: "ED060SCFH1 (V220 Tequila Hydis – Line 2)",
+	EinkWbf.Header.MfgCode.ed060scfh1_v220_tequila_hydis_line_3: "ED060SCFH1 (V220 Tequila Hydis – Line 3)",
+	EinkWbf.Header.MfgCode.ed060scfc1_v220_tequila_cmo: "ED060SCFC1 (V220 Tequila CMO)",
+	EinkWbf.Header.MfgCode.cpt_v220_tequila_cpt: "ED060SCFT1 (V220 Tequila CPT)",
+	EinkWbf.Header.MfgCode.ed060scg_v220_whitney: "ED060SCG (V220 Whitney)",
+	EinkWbf.Header.MfgCode.ed060scgh1_v220_whitney_hydis_line_2: "ED060SCGH1 (V220 Whitney Hydis – Line 2)",
+	EinkWbf.Header.MfgCode.ed060scgh1_v220_whitney_hydis_line_3: "ED060SCGH1 (V220 Whitney Hydis – Line 3)",
+	EinkWbf.Header.MfgCode.ed060scgc1_v220_whitney_cmo: "ED060SCGC1 (V220 Whitney CMO)",
+	EinkWbf.Header.MfgCode.ed060scgt1_v220_whitney_cpt: "ED060SCGT1 (V220 Whitney CPT)",
+	EinkWbf.Header.MfgCode.unknown_lgd_a0: "Unknown LGD panel",
+	EinkWbf.Header.MfgCode.unknown_lgd_a1: "Unknown LGD panel",
+	EinkWbf.Header.MfgCode.unknown_lgd_a2: "Unknown LGD panel",
+	EinkWbf.Header.MfgCode.lb060s03_rd02_lgd_tequila_line_1: "LB060S03-RD02 (LGD Tequila Line 1)",
+	EinkWbf.Header.MfgCode.lgd_tequila_line_2: "2nd LGD Tequila Line",
+	EinkWbf.Header.MfgCode.lb060s05_rd02_lgd_whitney_line_1: "LB060S05-RD02 (LGD Whitney Line 1)",
+	EinkWbf.Header.MfgCode.lgd_whitney_line_2: "2nd LGD Whitney Line",
+	EinkWbf.Header.MfgCode.unknown_lgd_a7: "Unknown LGD panel",
+	EinkWbf.Header.MfgCode.unknown_lgd_a8: "Unknown LGD panel",
+	EinkWbf.Header.MfgCode.remarkable_panel: "reMarkable panel?",
+}
+
+run_types = {
+	EinkWbf.Header.RunType.baseline: "[B]aseline",
+	EinkWbf.Header.RunType.test_or_trial: "[T]est/trial",
+	EinkWbf.Header.RunType.production: "[P]roduction",
+	EinkWbf.Header.RunType.qualification: "[Q]ualification",
+	EinkWbf.Header.RunType.v110_a: "V110[A]",
+	EinkWbf.Header.RunType.v220_c: "V220[C]",
+	EinkWbf.Header.RunType.d: "D",
+	EinkWbf.Header.RunType.v220_e: "V220[E]",
+	EinkWbf.Header.RunType.f: "F",
+	EinkWbf.Header.RunType.g: "G",
+	EinkWbf.Header.RunType.h: "H",
+	EinkWbf.Header.RunType.i: "I",
+	EinkWbf.Header.RunType.j: "J",
+	EinkWbf.Header.RunType.k: "K",
+	EinkWbf.Header.RunType.l: "L",
+	EinkWbf.Header.RunType.m: "M",
+	EinkWbf.Header.RunType.n: "N"
+}
+
+fpl_platforms = {
+	EinkWbf.Header.FplPlatform.matrix_2_0: "Matrix 2.0",
+	EinkWbf.Header.FplPlatform.matrix_2_1: "Matrix 2.1",
+	EinkWbf.Header.FplPlatform.matrix_2_3_matrix_vixplex_100: "Matrix 2.3 / Matrix Vixplex (V100)",
+	EinkWbf.Header.FplPlatform.matrix_vizplex_110: "Matrix Vizplex 110 (V110)",
+	EinkWbf.Header.FplPlatform.matrix_vizplex_110a: "Matrix Vizplex 110A (V110A)",
+	EinkWbf.Header.FplPlatform.matrix_vizplex_unknown: "Matrix Vizplex unknown",
+	EinkWbf.Header.FplPlatform.matrix_vizplex_220: "Matrix Vizplex 220 (V220)",
+	EinkWbf.Header.FplPlatform.matrix_vizplex_250: "Matrix Vizplex 250 (V250)",
+	EinkWbf.Header.FplPlatform.matrix_vizplex_220e: "Matrix Vizplex 220E (V220E)"
+}
+
+fpl_sizes = {
+	EinkWbf.Header.FplSize.r_5_0_inch: '5.0"',
+	EinkWbf.Header.FplSize.r_6_0_inch: '6.0"',
+	EinkWbf.Header.FplSize.r_6_1_inch: '6.1"',
+	EinkWbf.Header.FplSize.r_6_3_inch: '6.3"',
+	EinkWbf.Header.FplSize.r_8_0_inch: '8.0"',
+	EinkWbf.Header.FplSize.r_9_7_inch: '9.7"',
+	EinkWbf.Header.FplSize.r_9_9_inch: '9.9"',
+	EinkWbf.Header.FplSize.r_unknown_07: "Unknown",
+	EinkWbf.Header.FplSize.r_5_inch: '5", unknown resolution',
+	EinkWbf.Header.FplSize.r_6_inch_800x600_3c: '6", 800x600',
+	EinkWbf.Header.FplSize.r_6_1_inch_1024x768: '6.1", 1024x768',
+	EinkWbf.Header.FplSize.r_6_inch_800x600_3f: '6", 800x600',
+	EinkWbf.Header.FplSize.r_8_inch: '8", unknown resolution',
+	EinkWbf.Header.FplSize.r_9_7_inch_1200x825: '9.7", 1200x825',
+	EinkWbf.Header.FplSize.r_9_7_inch_1600x1200: '9.7", 1600x1200',
+}
+
+mode_versions = {
+	0x00: "MU/GU/GC/PU (V100 modes)",
+	0x01: "DU/GC16/GC4 (V110/V110A modes)",
+	0x02: "DU/GC16/GC4 (V110/V110A modes)",
+	0x03: "DU/GC16/GC4/AU (V220, 50Hz/85Hz modes)",
+	0x04: "DU/GC16/AU (V220, 85Hz modes)",
+	0x06: "? (V220: 210 dpi: 85Hz modes)",
+	0x07: "? (V220, 210 dpi, 85Hz modes)",
+}
+
+waveform_tuning_biases = {
+	EinkWbf.Header.TuningBias.standard: "Standard",
+	EinkWbf.Header.TuningBias.increased_ds_blooming_v110_v110e: "Increased DS Blooming V110/V110E",
+	EinkWbf.Header.TuningBias.increased_ds_blooming_v220_v220e: "Increased DS Blooming V220/V220E",
+	EinkWbf.Header.TuningBias.improved_temperature_range: "Improved temperature range",
+	EinkWbf.Header.TuningBias.gc16_fast: "GC16 fast",
+	EinkWbf.Header.TuningBias.gc16_fast_gl16_fast: "GC16 fast, GL16 fast",
+	EinkWbf.Header.TuningBias.unknown_06: "Unknown",
+}
+
+
+def get_desc(table: Mapping[int, str], key: int, default: str) -> str:
+	if key in table:
+		return table[key]
+
+	if default:
+		return default
+
+	return "Unknown"
+
+
+def print_modes(mode_count: uint8_t) -> None:
+	i: uint8_t = 0
+	desc: str = ""
+
+	print("Modes in file:")
+	for i in range(0, mode_count):
+		i = MODE(i)
+		desc = get_desc(update_modes, i, "Unknown mode")
+		print("	{:2d}: {}".format(i, desc))
+
+	print("")
+
+
+def get_desc_mfg_code(mfg_code: uint) -> str:
+	desc: str = get_desc(mfg_codes, mfg_code, "")
+
+	if desc:
+		return desc
+
+	if mfg_code >= 0x33 and mfg_code < 0x3C:
+		return "PVI/EIH panel\0"
+
+	if mfg_code >= 0xA0 and mfg_code < 0xA8:
+		return "LGD panel\0"
+
+	return "Unknown code\0"
+
+
+class waveform_data_header:
+	__slots__ = ("ks",)
+	parser = HEADER_STRUCT
+	structStr = parser.format
+	structSize = parser.size
+
+	def __getattr__(self, k: str):
+		return getattr(self.ks, k)
+
+	def __init__(self, ks: EinkWbf.Header) -> None:
+		self.__class__.ks.__set__(self, ks)
+
+	def __bytes__(self) -> bytes:
+		# the parsed fields are enums and BCD, so instead of packing them back we take the raw bytes the header was parsed from
+		io = self.ks._io
+		pos = io.pos()
+		io.seek(0)
+		try:
+			return io.read_bytes(self.__class__.structSize)
+		finally:
+			io.seek(pos)
+
+
+def temp_range(data: bytes):
+	"""
+	struct temp_range {
+		uint8_t from;
+		uint8_t to;
+	};"""
+	return range(*struct.unpack("HBB", data))
+
+def compare_checksum(data: str, header: waveform_data_header) -> int:
+	if crc32(data[4 : header.size], CRC32_START_VALUE) != header.whole_header_crc32:
+		return -1
+	return 0
+
+
+def print_header(header: waveform_data_header, is_wbf: int) -> None:
+	print("Header info:")
+	if is_wbf:
+		print("	File size (according to header): " + str(header.size) + " bytes")
+	print("	Serial number: " + str(header.serial))
+	print("	Run type: " + hex(header.run_type) + " | " + get_desc(run_types, header.run_type, "Unknown"))
+	print("	Manufacturer code: " + hex(header.mfg_code) + " | " + get_desc_mfg_code(header.mfg_code))
+
+	print("	Frontplane Laminate (FPL) platform: " + hex(header.fpl_platform) + " | " + get_desc(fpl_platforms, header.fpl_platform, "Unknown"))
+	print("	Frontplane Laminate (FPL) lot: " + str(header.fpl_lot))
+	print("	Frontplane Laminate (FPL) size: " + hex(header.fpl_size) + " | " + get_desc(fpl_sizes, header.fpl_size, "Unknown"))
+	print("	Frontplane Laminate (FPL) rate: " + hex(header.fpl_rate_bcd.digits[0]) + hex(header.fpl_rate_bcd.digits[1])[2:] + " | " + str(header.fpl_rate_bcd.as_int) + "Hz")
+
+	print("	Waveform version: " + str(header.waveform_version))
+	print("	Waveform sub-version: " + str(header.waveform_subversion))
+
+	if isinstance(header.waveform_type, EinkWbf.Header.WaveformType):
+		waveform_type_text_repr = header.waveform_type.name.upper()
+	else:
+		waveform_type_text_repr = "Unknown"
+
+	print("	Waveform type: " + hex(header.waveform_type) + " | " + waveform_type_text_repr)
+
+	try:  # WJ type or earlier
+		print("	Waveform tuning bias: " + hex(header.waveform_tuning_bias) + " | " + get_desc(waveform_tuning_biases, header.waveform_tuning_bias, None))
+	except AttributeError:
+		print("	Waveform tuning bias: Unknown")
+
+	try:  # WR type or later
+		print("	Waveform revision: " + str(header.waveform_revision))
+	except AttributeError:
+		print("	Waveform revision: Unknown")
+
+	# if fpl_platform is < 3 then
+	# mode_version_or_adhesive_run_num is the adhesive run number
+	if header.fpl_platform.value < 3:
+		print("	Adhesive run number: " + str(header.mode_version_or_adhesive_run_num))
+		print("	Mode version: Unknown")
+	else:
+		print("	Adhesive run number: Unknown")
+		print("	Mode version: " + hex(header.mode_version_or_adhesive_run_num) + " | " + get_desc(mode_versions, header.mode_version_or_adhesive_run_num, None))
+
+	print("	Number of modes in this waveform: " + str(header.mode_count + 1))
+	print("	Number of temperature ranges in this waveform: " + str(header.temperature_range_count + 1))
+
+	print("	4 or 5-bits per pixel: " + str(header.bits_per_pixel))
+
+	print("	unknown0: " + hex(header.fpl_rate))
+	print("	vcom_shifted: " + str(header.vcom_shifted))
+	print("	extra waveform info (xwia) offset: " + hex(header.xwia))
+	
+	print("	cs1: " + hex(header.checksum_7_30))
+	print("	waveform modes table offset: " + hex(header.waveform_modes_table))
+	print("	fvsn: " + hex(header.fvsn))
+	print("	luts: " + hex(header.luts))
+	print("	advanced_wfm_flags: " + hex(header.advanced_wfm_flags))
+	print("	eb: " + hex(header.eb))
+	print("	sb: " + hex(header.sb))
+	if any(header.reserved_or_unkn):
+		print("	reserved_or_unkn: " + " ".join((hex(el)[2:] for el in header.reserved_or_unkn)))
+	print("	cs2: " + hex(header.cs2))
+
+	print("")
+
+
+def toS(n: int):
+	if n & 0x80:
+		return n - 0x80
+
+	return n
+
+
+def parse_temp_range_ptrs(header: waveform_data_header, data: str, ranges: typing.Sequence[int], do_print: int, cache: WaveformCache, tracer: Optional[TraceSink] = None) -> int:
+	i = 0  # type: uint8_t
+	state_count = 0  # type: uint16_t
+
+	if do_print:
+		print("		Temperature ranges: ")
+
+	for i, ptr in enumerate(ranges):
+		if do_print:
+			sys.stdout.write("			Checking range {:2d}: ".format(i))
+
+		# TODO
+		# We are cutting off the last two bytes
+		# since we don't know what they are.
+		# See section on unsolved mysteries at the top of this file.
+		try:
+			wf = cache.get(ptr)
+		except KeyError:
+			print("Could not find waveform length", file=sys.stderr)
+			return -1
+
+		if tracer is not None:
+			tracer.waveform(traceWaveform(ptr, data[ptr : ptr + cache.index.length(ptr)]))
+
+		state_count = wf.state_count
+
+		if state_count < 0:
+			return -1
+
+		if do_print:
+			print("{:4d} phases ({:4d})".format(wf.phases, ptr))
+
+	if do_print:
+		print("")
+
+	return 0
+
+
+def parse_mode_index(header: waveform_data_header, data: str, modes: WaveformIndex, first_pass: int, do_print: int, cache: Optional[WaveformCache] = None, tracer: Optional[TraceSink] = None) -> int:
+	i = 0  # type: uint8_t
+
+	if cache is None:
+		cache = WaveformCache(data, modes, header.bits_per_pixel)
+
+	if do_print:
+		print("Modes: ")
+
+	for i, ranges in enumerate(modes.ptrs.tolist()):
+
+		if do_print:
+			sys.stdout.write("	Checking mode {:2d}: ".format(i))
+
+		if do_print:
+			print("Passed")
+
+		if not first_pass:
+			if parse_temp_range_ptrs(header, data, ranges, do_print, cache, tracer) < 0:
+				return -1
+
+	return 0
+
+
+def _kaitaiIndex(wbf: EinkWbf, size: int) -> WaveformIndex:
+	"""The index of the pointers already parsed by Kaitai"""
+	modes = wbf.modes
+	modePtrs = np.array([m.ptr.ptr for m in modes], dtype=np.uint32)
+	ptrs = np.array([[r.wav_addr.ptr for r in m.ranges.ranges] for m in modes], dtype=np.uint32).reshape(len(modes), -1)
+	return WaveformIndex.fromPtrs(modePtrs, ptrs, size)
+
+
+def parse_temp_ranges(header: waveform_data_header, data: str, ranges: "EinkWbf.Mode.TempRanges", outfile: Optional[IOBase], do_print: int) -> int:
+	"""`parse_temp_range_ptrs` for the Kaitai objects. If `outfile` is given, the temperature range table and the waveforms of the mode are written at its current position, as they are laid out in `.wrf`."""
+	index = _kaitaiIndex(ranges._root, len(data))
+	cache = WaveformCache(data, index, header.bits_per_pixel)
+	ptrs = [r.wav_addr.ptr for r in ranges.ranges]
+	if parse_temp_range_ptrs(header, data, ptrs, do_print, cache) < 0:
+		return -1
+
+	if outfile:
+		outfile.write(renderTempRanges(ptrs, cache, outfile.tell()))
+	return 0
+
+
+def parse_modes(header: waveform_data_header, data: str, modes: typing.Sequence["EinkWbf.Mode"], first_pass: int, outfile: Optional[IOBase], do_print: int) -> int:
+	"""`parse_mode_index` for the Kaitai objects (`EinkWbf.modes`). If `outfile` is given and it is not the first pass, the mode table and everything after it are written into it, the header and the temperature range table are left to the caller, like in `inkwave`."""
+	if not modes:
+		return 0
+
+	index = _kaitaiIndex(modes[0]._root, len(data))
+	cache = WaveformCache(data, index, header.bits_per_pixel)
+	if parse_mode_index(header, data, index, first_pass, do_print, cache) < 0:
+		return -1
+
+	if outfile and not first_pass:
+		layout = WrfLayout.fromIndex(index, cache)
+		outfile.seek(layout.modeTable)
+		outfile.write(memoryview(renderWrf(data, header, index, cache, layout))[layout.modeTable :])
+	return 0
+
+
+def parse_wrf_modes(wrf: WrfFile, do_print: int) -> int:
+	"""The same as `parse_mode_index`, but for `.wrf` files. The waveforms there are already expanded, so only the state counts written before them are checked."""
+	i = 0  # type: uint8_t
+	j = 0  # type: uint8_t
+
+	if do_print:
+		print("Modes: ")
+
+	for i in range(wrf.modeCount):
+		if do_print:
+			sys.stdout.write("	Checking mode {:2d}: ".format(i))
+			print("Passed")
+			print("		Temperature ranges: ")
+
+		for j in range(wrf.tempRangeCount):
+			if do_print:
+				sys.stdout.write("			Checking range {:2d}: ".format(j))
+
+			if not wrf.stateCountMatches(i, j):
+				print("State count doesn't match the waveform size", file=sys.stderr)
+				return -1
+
+			if do_print:
+				print("{:4d} phases ({:4d})".format(wrf.waveform(i, j).phases, int(wrf.waveforms[i, j])))
+
+		if do_print:
+			print("")
+
+	return 0
+
+
+def print_xwia(xwia: EinkWbf.Xwia):
+	i = 0  # type: uint8_t
+	non_printables = 0  # type: int
+
+	xwia_s = xwia.value
+
+	for i in range(0, len(xwia_s)):
+		if not xwia_s[i].isprintable():
+			non_printables += 1
+
+	sys.stdout.write("Extra Waveform Info (probably waveform's original filename): ")
+
+	if not xwia.len:
+		print("None")
+	elif non_printables:
+		print("(" + str(xwia.len) + " bytes containing " + str(non_printables) + " unprintable characters)")
+	else:
+		print(xwia_s)
+
+	print("")
+
+
+def dump_temp_range_table(ranges: typing.Sequence[range], do_print: int) -> int:
+	if not len(ranges):
+		return 0
+
+	if do_print:
+		print("Supported temperature ranges:")
+
+	for rng in ranges:
+		if do_print:
+			print("	" + str(rng.start) + " - " + str(rng.stop) + " °C")
+
+	if do_print:
+		print("")
+
+	return 0
+
+
+def mainAPI(infile_path: Path, force_input: bool, outfile_path: Optional[Path], do_print: int = 0, cache_dir: Optional[Path] = None, tracer: Optional[TraceSink] = None) -> int:
+	infile_path = Path(infile_path)  # type: Path
+	infile = None  # type: io.IOBase
+	header = None  # type: waveform_data_header
+	# points to `data` at beginning of header
+	modes = None  # type: str
+	# points to `data` where the modes table begins
+	temp_range_table = None  # type: str
+	# points to `data` where the temp range table begins
+	xwia_len = 0  # type: uint32_t
+	mode_count = 0  # type: uint8_t
+	temp_range_count = 0  # type: uint8_t
+	force_input = force_input  # type: str
+	force = 0  # type: int
+	c = 0  # type: int
+	unique_waveform_count = None  # type: uint32_t
+	# waveform addresses in input file
+	is_wbf = 0  # type: uint32_t
+	to_alloc = 0  # type: size_t
+
+	if outfile_path:
+		outfile_path = Path(outfile_path)
+
+	if do_print == 2 and tracer is None:
+		tracer = TextSink(sys.stdout)
+
+	# memset(wav_addrs, 0, sizeof(wav_addrs))
+
+	# try:
+	if force_input:
+		if force_input == "wbf":
+			is_wbf = 1
+		elif force_input == "wrf":
+			is_wbf = 0
+		else:
+			print("Only wbf and wrf format is supported", file=sys.stderr)
+			raise Exception
+	else:
+		if not infile_path.suffix:
+			print("File has neither .wbf or .wrf extension", file=sys.stderr)
+			print("Consider using `-f` to bypass file format detection", file=sys.stderr)
+			raise Exception
+		if infile_path.suffix == ".wbf":
+			is_wbf = 1
+		elif infile_path.suffix == ".wrf":
+			is_wbf = 0
+		else:
+			print("File has neither .wbf or .wrf extension", file=sys.stderr)
+			print("Consider using `-f` to bypass file format detection", file=sys.stderr)
+			raise Exception
+
+	if not is_wbf and outfile_path:
+		print("Conversion from .wrf format not supported", file=sys.stderr)
+		raise Exception
+
+	with infile_path.open("rb") as infile:
+		st = infile_path.stat()
+
+		to_alloc = st.st_size
+
+		with mapFile(infile, to_alloc) as data:
+
+			if not do_print and not outfile_path:
+				do_print = 1
+
+			if do_print:
+				print("")
+				print("File size: " + str(st.st_size) + " bytes")
+				print("")
+
+			if is_wbf:
+				parsed = EinkWbf(kaitaistruct.KaitaiStream(MemoryViewIO(data)))
+				parsed.tracer = tracer
+
+				header = waveform_data_header(parsed.header)
+			else:
+				# the rest of `.wrf` is not described by the spec, its temperature range table has no checksum
+				header = waveform_data_header(EinkWbf.Header(kaitaistruct.KaitaiStream(MemoryViewIO(data))))
+
+			if is_wbf:
+				if header.size != st.st_size:
+					print("Actual file size does not match file size reported by waveform header", file=sys.stderr)
+					raise Exception
+
+			if is_wbf:
+				if compare_checksum(data, header) < 0:
+					print("Checksum error", file=sys.stderr)
+					raise Exception
+
+			if do_print:
+				print_header(header, is_wbf)
+
+				if header.fpl_platform.value < 3:
+					print("Modes: Unknown (no mode version specified)")
+				else:
+					print_modes(header.mode_count + 1)
+
+			if not is_wbf:
+				try:
+					wrf = WrfFile.fromBuffer(data)
+				except ValueError as e:
+					print(e, file=sys.stderr)
+					return -1
+
+				dump_temp_range_table([range(start, stop) for start, stop in zip(wrf.bounds, wrf.bounds[1:])], do_print)
+
+				if parse_wrf_modes(wrf, do_print) < 0:
+					print("Parse error", file=sys.stderr)
+					raise Exception
+
+				return 0
+
+			# start of temperature range table
+			temp_range_table = None
+			try:
+				temp_range_table = parsed.temp_range_table
+			except kaitaistruct.ValidationExprError:
+				print("Temperature range checksum error", file=sys.stderr)
+				raise
+			else:
+				dump_temp_range_table(temp_range_table.ranges, do_print)
+
+			try:
+				parsed_xwia = parsed.xwia
+			except kaitaistruct.ValidationExprError:
+				print("xwia checksum error", file=sys.stderr)
+				raise
+			else:
+				if do_print:
+					print_xwia(parsed_xwia)
+
+			disk_cache = None
+			cached = None
+			if cache_dir is not None:
+				disk_cache = DiskCache(cache_dir)
+				# the whole file has already been checked against the CRC32, so it is the file the entry was made from
+				cached = disk_cache.load(header.whole_header_crc32, header.size, data)
+
+			# the pointer tables are read only once and all the waveform addresses are known after that,
+			# so there is no need in the first pass
+			try:
+				if cached is None:
+					modes = WaveformIndex.fromBuffer(data, header.waveform_modes_table, header.mode_count + 1, header.temperature_range_count + 1)
+				else:
+					modes, cache = cached
+			except ChecksumError as e:
+				print(e, file=sys.stderr)
+				if do_print:
+					print("Failed")
+				return -1
+			else:
+				unique_waveform_count = len(modes.tracker) - 1  # we have already added file size
+
+				if do_print:
+					print("Number of unique waveforms: " + str(unique_waveform_count) + "\n")
+
+				if cached is None:
+					cache = WaveformCache(data, modes, header.bits_per_pixel)
+					cache.sweep()
+
+					if disk_cache is not None:
+						disk_cache.store(header.whole_header_crc32, header.size, modes, cache)
+
+				if parse_mode_index(header, data, modes, 0, do_print, cache, tracer) < 0:
+					print("Parse error", file=sys.stderr)
+					raise Exception
+
+				if outfile_path:
+					writeWrf(outfile_path, data, header, modes, cache)
+
+				if do_print == 1:
+					print("Decoded waveforms cache: " + str(cache.hits) + " hits, " + str(cache.misses) + " misses\n")
+
+			return 0
+
+	# finally:
+	# 	outfile.__exit__()
+	return 1
+
+
+def parse_mode(mode: str) -> int:
+	"""Accepts a number, a name of a member of `EinkWbf.Header.Mode` or a short name like `GC16`."""
+	try:
+		return int(mode, 0)
+	except ValueError:
+		pass
+
+	try:
+		return MODE[mode]
+	except KeyError:
+		pass
+
+	for m, desc in update_modes.items():
+		if desc.split(" ", 1)[0].lower() == mode.lower():
+			return m
+
+	raise ValueError("Unknown mode: " + mode)
+
+
+def lookupAPI(infile_path: Path, mode: Union[int, str], temp: int, force_input: Optional[str] = None, cache_dir: Optional[Path] = None) -> int:
+	"""Prints the waveform for the mode at the temperature. The format is detected the same way as by `mainAPI`. The `cache_dir` is only read: a lookup decodes a single waveform, so storing all of them would cost more than it saves."""
+	infile_path = Path(infile_path)
+
+	if force_input:
+		if force_input not in ("wbf", "wrf"):
+			print("Only wbf and wrf format is supported", file=sys.stderr)
+			return -1
+		is_wbf = force_input == "wbf"
+	elif infile_path.suffix in (".wbf", ".wrf"):
+		is_wbf = infile_path.suffix == ".wbf"
+	else:
+		print("File has neither .wbf or .wrf extension", file=sys.stderr)
+		print("Consider using `-f` to bypass file format detection", file=sys.stderr)
+		return -1
+
+	try:
+		if isinstance(mode, str):
+			mode = parse_mode(mode)
+
+		with infile_path.open("rb") as infile:
+			with mapFile(infile) as data:
+				if not is_wbf:
+					found = lookupWrfWaveform(data, mode, temp)
+				else:
+					index = None
+					if cache_dir is not None:
+						header = readHeader(data)
+						# the entries are keyed by the CRC32, so it must match the file
+						if header.size and crc32(data[4 : header.size], CRC32_START_VALUE) == header.whole_header_crc32:
+							cached = DiskCache(cache_dir).load(header.whole_header_crc32, header.size, data)
+							if cached is not None:
+								index = cached[0]
+					found = lookupWaveform(data, mode, temp, index)
+	except ValueError as e:
+		print(e, file=sys.stderr)
+		return -1
+
+	print("Mode {:2d}: {}".format(found.mode, get_desc(update_modes, found.mode, "Unknown mode")))
+	print("	Temperature range {:2d}: {} - {} °C".format(found.tempRange, found.temps.start, found.temps.stop))
+	print("	{:4d} phases ({:4d})".format(found.waveform.phases, found.ptr))
+
+	return 0
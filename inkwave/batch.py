@@ -0,0 +1,95 @@
+import glob
+import io
+import os
+import sys
+import typing
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+
+from .api import mainAPI
+
+__all__ = ("BatchResult", "expandInputs", "mirroredOutdirs", "processFile", "batchAPI")
+
+EXTENSIONS = (".wbf", ".wrf")
+
+
+class BatchResult(typing.NamedTuple):
+	path: Path
+	code: int
+	out: str
+	err: str
+
+
+def expandInputs(inputs: typing.Iterable[typing.Union[str, Path]]) -> typing.List[Path]:
+	"""Directories are searched recursively for `.wbf` and `.wrf` files, everything else is treated as a glob. The result is sorted, so the order is stable."""
+	res = set()
+	for inp in inputs:
+		p = Path(inp)
+		if p.is_dir():
+			res.update(f for f in p.rglob("*") if f.suffix in EXTENSIONS and f.is_file())
+		else:
+			res.update(Path(f) for f in glob.glob(str(inp), recursive=True))
+	return sorted(res)
+
+
+def mirroredOutdirs(paths: typing.Sequence[Path], outdir: Path) -> typing.List[Path]:
+	"""The dir in `outdir` to convert each file into: the layout of the files relative to their common parent is mirrored, so the files with the same name from different dirs don't overwrite each other."""
+	parents = [p.resolve().parent for p in paths]
+	root = Path(os.path.commonpath(parents)) if parents else None
+	return [Path(outdir) / parent.relative_to(root) for parent in parents]
+
+
+def processFile(path: Path, force_input: typing.Optional[str] = None, outdir: typing.Optional[Path] = None, do_print: int = 0, cache_dir: typing.Optional[Path] = None) -> BatchResult:
+	"""Does the same as `mainAPI` for a single file, but captures its output instead of printing it."""
+	outfile_path = None
+	if outdir is not None:
+		outfile_path = Path(outdir) / (path.stem + ".wrf")
+
+	out = io.StringIO()
+	err = io.StringIO()
+	with redirect_stdout(out), redirect_stderr(err):
+		try:
+			code = mainAPI(path, force_input, outfile_path, do_print, cache_dir)
+		except Exception as e:
+			code = -1
+			if str(e):
+				print(e, file=err)
+
+	return BatchResult(path, code, out.getvalue(), err.getvalue())
+
+
+def _processFileStar(args: tuple) -> BatchResult:
+	return processFile(*args)
+
+
+def batchAPI(inputs: typing.Iterable[typing.Union[str, Path]], jobs: typing.Optional[int] = None, force_input: typing.Optional[str] = None, outdir: typing.Optional[Path] = None, quiet: bool = False, cache_dir: typing.Optional[Path] = None) -> int:
+	"""Processes many files with a pool of worker processes. The workers live for the whole batch, so the import and startup cost is paid once per worker, not per file. Results are printed in the order of the sorted input paths, as soon as all the preceding ones are ready."""
+	paths = expandInputs(inputs)
+	if not paths:
+		print("No input files found", file=sys.stderr)
+		return -1
+
+	outdirs = [None] * len(paths)  # type: typing.List[typing.Optional[Path]]
+	if outdir is not None:
+		outdirs = mirroredOutdirs(paths, outdir)
+		for d in set(outdirs):
+			d.mkdir(parents=True, exist_ok=True)
+
+	if not jobs:
+		jobs = os.cpu_count() or 1
+
+	failed = 0
+	with ProcessPoolExecutor(max_workers=jobs) as pool:
+		for res in pool.map(_processFileStar, [(p, force_input, d, 0, cache_dir) for p, d in zip(paths, outdirs)], chunksize=max(1, len(paths) // (4 * jobs))):
+			if res.code != 0:
+				failed += 1
+
+			status = "OK" if res.code == 0 else "FAILED (" + str(res.code) + ")"
+			print("==> " + str(res.path) + " <== " + status)
+			if not quiet:
+				sys.stdout.write(res.out)
+			sys.stderr.write(res.err)
+
+	print(str(len(paths)) + " files processed, " + str(failed) + " failed")
+	return 1 if failed else 0
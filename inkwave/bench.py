@@ -0,0 +1,188 @@
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import typing
+from contextlib import redirect_stdout
+from pathlib import Path
+
+import kaitaistruct
+
+from .api import mainAPI, parse_mode_index, waveform_data_header
+from .checksums import validateChecksums
+from .header import readHeader
+from .kaitai.eink_wbf import EinkWbf
+from .kaitai.memory_view_io import MemoryViewIO
+from .synth import SynthParams, generateWbf
+from .tables import WaveformIndex
+from .waveform import WaveformCache, iterWaveformRuns
+from .wrf import renderWrf
+
+__all__ = ("BenchResult", "BENCHMARKS", "benchFile", "benchAPI", "IMPORT_BENCHMARKS", "timeImport", "timeCommand", "importBenchAPI")
+
+# each benchmark is repeated until it takes at least 0.2 s (see `timeit.Timer.autorange`), and the best of `REPEATS` such runs is taken
+REPEATS = 5
+
+
+class BenchResult(typing.NamedTuple):
+	name: str
+	seconds: float  # per call, the best of the runs
+	size: int  # of the file
+
+	@property
+	def throughput(self) -> float:
+		"""MiB/s"""
+		return self.size / self.seconds / (1 << 20)
+
+
+class _Parsed(typing.NamedTuple):
+	data: bytes
+	index: WaveformIndex
+	cache: WaveformCache
+
+
+def _parse(data: bytes) -> _Parsed:
+	h = readHeader(data)
+	index = WaveformIndex.fromBuffer(data, h.waveform_modes_table, h.mode_count + 1, h.temperature_range_count + 1)
+	cache = WaveformCache(data, index, h.bits_per_pixel)
+	cache.sweep()
+	return _Parsed(data, index, cache)
+
+
+def _kaitaiHeader(data: bytes) -> waveform_data_header:
+	return waveform_data_header(EinkWbf(kaitaistruct.KaitaiStream(MemoryViewIO(memoryview(data)))).header)
+
+
+def _firstPass(data: bytes) -> WaveformIndex:
+	h = readHeader(data)
+	return WaveformIndex.fromBuffer(data, h.waveform_modes_table, h.mode_count + 1, h.temperature_range_count + 1)
+
+
+def _decode(p: _Parsed) -> None:
+	WaveformCache(p.data, p.index, p.cache.bitsPerPixel).sweep()
+
+
+def _checkedStreaming(data: bytes) -> _Parsed:
+	"""`_parse`, checking that `iterWaveformRuns` gives the same runs as `decodeWaveform` for every unique waveform"""
+	p = _parse(data)
+	for ptr, l in p.index.extents():
+		wf = p.cache.get(ptr, l)
+		if list(iterWaveformRuns(data[ptr : ptr + l])) != [tuple(s) + (c,) for s, c in zip(wf.unpacked().tolist(), wf.counts.tolist())]:
+			raise ValueError("`iterWaveformRuns` and `decodeWaveform` disagree on the waveform at " + str(ptr))
+	return p
+
+
+def _decodeStreaming(p: _Parsed) -> None:
+	for ptr, l in p.index.extents():
+		for _ in iterWaveformRuns(p.data[ptr : ptr + l]):
+			pass
+
+
+def _secondPass(p: _Parsed, header: waveform_data_header) -> None:
+	parse_mode_index(header, p.data, p.index, 0, 0, p.cache)
+
+
+def _mainAPI(path: Path, outPath: typing.Optional[Path]) -> None:
+	with redirect_stdout(io.StringIO()):
+		mainAPI(path, None, outPath, 0)
+
+
+# name -> a function of the file path, its contents and the output dir returning the function to time
+BENCHMARKS = {
+	"header": lambda path, data, tmp: lambda: readHeader(data),
+	"header-kaitai": lambda path, data, tmp: lambda: _kaitaiHeader(data),
+	"checksums": lambda path, data, tmp: lambda: validateChecksums(data),
+	"first-pass": lambda path, data, tmp: lambda: _firstPass(data),
+	"decoding": lambda path, data, tmp: (lambda p: lambda: _decode(p))(_parse(data)),
+	"decoding-streaming": lambda path, data, tmp: (lambda p: lambda: _decodeStreaming(p))(_checkedStreaming(data)),
+	"second-pass": lambda path, data, tmp: (lambda p, h: lambda: _secondPass(p, h))(_parse(data), _kaitaiHeader(data)),
+	"conversion": lambda path, data, tmp: (lambda p, h: lambda: renderWrf(data, h, p.index, p.cache))(_parse(data), readHeader(data)),
+	"info": lambda path, data, tmp: lambda: _mainAPI(path, None),
+	"convert": lambda path, data, tmp: lambda: _mainAPI(path, tmp / (path.stem + ".wrf")),
+}  # type: typing.Dict[str, typing.Callable[[Path, bytes, Path], typing.Callable[[], typing.Any]]]
+
+
+def _time(func: typing.Callable[[], typing.Any]) -> float:
+	timer = timeit.Timer(func)
+	number, _ = timer.autorange()
+	return min(timer.repeat(REPEATS, number)) / number
+
+
+def benchFile(path: Path, names: typing.Optional[typing.Iterable[str]] = None) -> typing.Iterator[BenchResult]:
+	"""Times the `BENCHMARKS` (or only the ones named) on the file. The "second-pass" and "conversion" ones reuse the decoded waveforms, like `mainAPI` does, so they time only their own work."""
+	path = Path(path)
+	data = path.read_bytes()
+	with tempfile.TemporaryDirectory() as tmp:
+		for name in names if names is not None else BENCHMARKS:
+			yield BenchResult(name, _time(BENCHMARKS[name](path, data, Path(tmp))), len(data))
+
+
+def _formatSeconds(s: float) -> str:
+	for unit, scale in (("s", 1), ("ms", 1e-3), ("µs", 1e-6)):
+		if s >= scale:
+			return "{:8.3f} {}".format(s / scale, unit)
+	return "{:8.3f} ns".format(s / 1e-9)
+
+
+def benchAPI(inputs: typing.Iterable[Path] = (), names: typing.Optional[typing.Iterable[str]] = None, params: SynthParams = SynthParams(), seed: int = 0) -> int:
+	"""Benchmarks the files, or a synthetic one generated with `params` if there are none."""
+	if names is not None:
+		names = list(names)
+		unknown = [n for n in names if n not in BENCHMARKS]
+		if unknown:
+			print("Unknown benchmarks: " + ", ".join(unknown) + ". Available: " + ", ".join(BENCHMARKS), file=sys.stderr)
+			return -1
+
+	with tempfile.TemporaryDirectory() as tmp:
+		inputs = [Path(p) for p in inputs]
+		if not inputs:
+			p = Path(tmp) / "synthetic_{:d}.wbf".format(seed)
+			p.write_bytes(generateWbf(seed, params))
+			print("Synthetic file: " + str(params))
+			inputs = [p]
+
+		for path in inputs:
+			print("==> " + str(path) + " <== " + str(path.stat().st_size) + " bytes")
+			for res in benchFile(path, names):
+				print("	{:20s} {}  {:10.2f} MiB/s".format(res.name, _formatSeconds(res.seconds), res.throughput))
+	return 0
+
+
+# the modules timed by `importBenchAPI`
+IMPORT_BENCHMARKS = ("inkwave", "inkwave.header", "inkwave.lookup", "inkwave.api", "inkwave.__main__")
+
+
+def _runFresh(args: typing.List[str]) -> subprocess.CompletedProcess:
+	"""Runs a fresh interpreter which imports this copy of the package"""
+	env = dict(os.environ)
+	env["PYTHONPATH"] = os.pathsep.join(filter(None, (str(Path(__file__).resolve().parent.parent), env.get("PYTHONPATH"))))
+	return subprocess.run([sys.executable, "-W", "ignore"] + args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=env, check=True)
+
+
+def timeImport(module: str) -> float:
+	"""The best of `REPEATS` imports of the module, each in a fresh interpreter, without the startup of the interpreter itself"""
+	code = "import time; t = time.perf_counter(); import " + module + "; print(time.perf_counter() - t)"
+	return min(float(_runFresh(["-c", code]).stdout) for _ in range(REPEATS))
+
+
+def timeCommand(args: typing.List[str]) -> float:
+	"""The best of `REPEATS` wall times of a fresh interpreter run with `args`, including its startup"""
+	res = []
+	for _ in range(REPEATS):
+		t = time.perf_counter()
+		_runFresh(args)
+		res.append(time.perf_counter() - t)
+	return min(res)
+
+
+def importBenchAPI(modules: typing.Iterable[str] = IMPORT_BENCHMARKS) -> int:
+	"""Times the imports, then the startup of the CLI against the startup of a bare interpreter"""
+	for module in modules:
+		print("	import {:24s} {}".format(module, _formatSeconds(timeImport(module))))
+
+	print("	{:31s} {}".format("python -c pass", _formatSeconds(timeCommand(["-c", "pass"]))))
+	print("	{:31s} {}".format("python -m inkwave --help", _formatSeconds(timeCommand(["-m", "inkwave", "--help"]))))
+	return 0
@@ -0,0 +1,196 @@
+import os
+import sys
+import time
+import typing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from .batch import expandInputs
+from .header import HEADER_STRUCT
+
+__all__ = ("Crc8", "CRC8_VARIANTS", "crc8Table", "HYPOTHESES", "rangeValues", "RangeMatch", "BruteResult", "bruteFile", "bruteAPI")
+
+Buffer = typing.Union[bytes, bytearray, memoryview]
+
+# `cs2` is the last byte of the header, what it is a checksum of (if it is a checksum) is unknown
+CS2_OFFSET = HEADER_STRUCT.size - 1
+
+# `checksum_brute.py` looked at the first 100 bytes: the header, the temperature range table and usually `xwia`
+DEFAULT_WINDOW = 100
+
+# the most matches printed
+DEFAULT_TOP = 20
+
+
+class Crc8(typing.NamedTuple):
+	"""A CRC-8 in the terms of the CRC RevEng catalogue. `init` is applied before the first byte and `xorout` after the last one."""
+
+	name: str
+	poly: int
+	init: int = 0
+	reflected: bool = False
+	xorout: int = 0
+
+
+CRC8_VARIANTS = (
+	Crc8("crc8-smbus", 0x07),
+	Crc8("crc8-i-432-1", 0x07, xorout=0x55),
+	Crc8("crc8-rohc", 0x07, 0xFF, True),
+	Crc8("crc8-maxim-dow", 0x31, 0, True),
+	Crc8("crc8-sae-j1850", 0x1D, 0xFF, xorout=0xFF),
+	Crc8("crc8-autosar", 0x2F, 0xFF, xorout=0xFF),
+	Crc8("crc8-cdma2000", 0x9B, 0xFF),
+	Crc8("crc8-wcdma", 0x9B, 0, True),
+	Crc8("crc8-dvb-s2", 0xD5),
+	Crc8("crc8-bluetooth", 0xA7, 0, True),
+)
+
+# the order of the hypotheses in the results of `rangeValues`
+HYPOTHESES = ("sum", "neg-sum", "xor", "difference") + tuple(crc.name for crc in CRC8_VARIANTS)
+
+
+def _reflect8(b: int) -> int:
+	return int("{:08b}".format(b)[::-1], 2)
+
+
+def crc8Table(crc: Crc8) -> np.ndarray:
+	"""The table of the byte-at-a-time algorithm: the next state is `table[state ^ byte]` for both the reflected and the normal variants."""
+	res = np.empty(256, dtype=np.uint8)
+	poly = _reflect8(crc.poly) if crc.reflected else crc.poly
+	for v in range(256):
+		c = v
+		for _ in range(8):
+			if crc.reflected:
+				c = c >> 1 ^ poly if c & 1 else c >> 1
+			else:
+				c = (c << 1 ^ poly if c & 0x80 else c << 1) & 0xFF
+		res[v] = c
+	return res
+
+
+_CRC8_TABLES = [crc8Table(crc) for crc in CRC8_VARIANTS]
+
+
+def rangeValues(window: Buffer) -> np.ndarray:
+	"""Every hypothesis of `HYPOTHESES` evaluated over every range of the bytes at once. `res[h, start, end]` is the value of the hypothesis `h` over `window[start:end]`, the ranges with `end <= start` are garbage.
+
+	Sums and xors are differences of prefix sums and xors. "difference" is `window[end - 1] - window[start]`, the thing `checksum_brute.py` looked for. CRCs are computed for all the starts in parallel, a byte per step, so it is `len(window)` vector operations, not one per range.
+	"""
+	d = np.frombuffer(window, dtype=np.uint8)
+	n = len(d)
+	res = np.zeros((len(HYPOTHESES), n + 1, n + 1), dtype=np.uint8)
+
+	prefixSums = np.zeros(n + 1, dtype=np.uint8)
+	np.cumsum(d, dtype=np.uint8, out=prefixSums[1:])
+	res[0] = prefixSums[None, :] - prefixSums[:, None]
+	res[1] = -res[0]
+
+	prefixXors = np.zeros(n + 1, dtype=np.uint8)
+	prefixXors[1:] = np.bitwise_xor.accumulate(d)
+	res[2] = prefixXors[None, :] ^ prefixXors[:, None]
+
+	res[3, :n, 1:] = d[None, :] - d[:, None]
+
+	for h, (crc, table) in enumerate(zip(CRC8_VARIANTS, _CRC8_TABLES), 4):
+		states = np.full(n, crc.init, dtype=np.uint8)
+		for end in range(1, n + 1):
+			states[:end] = table[states[:end] ^ d[end - 1]]
+			res[h, :end, end] = states[:end]
+		if crc.xorout:
+			res[h] ^= crc.xorout
+
+	return res
+
+
+def _validRanges(n: int, target: int, includeTarget: bool) -> np.ndarray:
+	starts = np.arange(n + 1)[:, None]
+	ends = np.arange(n + 1)[None, :]
+	res = starts < ends
+	if not includeTarget:
+		# a checksum can't be computed over itself
+		res &= (target < starts) | (target >= ends)
+	return res
+
+
+class RangeMatch(typing.NamedTuple):
+	hypothesis: str
+	start: int
+	end: int  # exclusive
+	files: int  # in which the hypothesis holds
+
+	def __str__(self) -> str:
+		return "{} [{:d}, {:d})".format(self.hypothesis, self.start, self.end)
+
+
+class BruteResult(typing.NamedTuple):
+	path: Path
+	matches: typing.Optional[np.ndarray]  # `np.packbits` of the bool array of the shape of `rangeValues`
+	error: typing.Optional[str] = None
+
+
+def bruteFile(path: Path, target: int = CS2_OFFSET, window: int = DEFAULT_WINDOW, includeTarget: bool = False) -> BruteResult:
+	"""Which hypotheses over which ranges of the first `window` bytes of the file give the byte at `target`. The result is packed to be cheap to send from a worker process."""
+	path = Path(path)
+	with path.open("rb") as f:
+		data = f.read(max(window, target + 1))
+
+	if len(data) < window or len(data) <= target:
+		return BruteResult(path, None, "The file is too short, " + str(len(data)) + " bytes")
+
+	matches = (rangeValues(data[:window]) == data[target]) & _validRanges(window, target, includeTarget)
+	return BruteResult(path, np.packbits(matches))
+
+
+def _bruteFileStar(args: tuple) -> BruteResult:
+	return bruteFile(*args)
+
+
+def _rank(counts: np.ndarray, top: int) -> typing.List[RangeMatch]:
+	flat = counts.ravel()
+	best = np.argsort(-flat.astype(np.int64), kind="stable")[:top]
+	best = best[flat[best] > 0]
+	return [RangeMatch(HYPOTHESES[h], int(s), int(e), int(flat[i])) for i, (h, s, e) in zip(best.tolist(), zip(*np.unravel_index(best, counts.shape)))]
+
+
+def bruteAPI(inputs: typing.Iterable[typing.Union[str, Path]], target: int = CS2_OFFSET, window: int = DEFAULT_WINDOW, jobs: typing.Optional[int] = None, includeTarget: bool = False, top: int = DEFAULT_TOP) -> int:
+	"""Looks for a checksum giving the byte at `target` (`cs2` by default) in the `.wbf` files (directories are searched recursively), over a pool of worker processes. Prints the `(hypothesis, range)`s holding in all the files, or, if there are none, the ones holding in the most files."""
+	paths = [p for p in expandInputs(inputs) if p.suffix == ".wbf"]
+	if not paths:
+		print("No input files found", file=sys.stderr)
+		return -1
+
+	if not jobs:
+		jobs = os.cpu_count() or 1
+
+	shape = (len(HYPOTHESES), window + 1, window + 1)
+	counts = np.zeros(shape, dtype=np.uint32)
+	checked = 0
+	t = time.perf_counter()
+	with ProcessPoolExecutor(max_workers=jobs) as pool:
+		for res in pool.map(_bruteFileStar, [(p, target, window, includeTarget) for p in paths], chunksize=max(1, len(paths) // (4 * jobs))):
+			if res.error is not None:
+				print("==> " + str(res.path) + " <== ERROR: " + res.error, file=sys.stderr)
+				continue
+			counts += np.unpackbits(res.matches, count=counts.size).reshape(shape)
+			checked += 1
+	wall = time.perf_counter() - t
+
+	print(str(checked) + " files checked, " + str(int(_validRanges(window, target, includeTarget).sum()) * len(HYPOTHESES)) + " (hypothesis, range)s each, {:.2f} s".format(wall))
+	if not checked:
+		return 1
+
+	survivors = int((counts == checked).sum())
+	if survivors:
+		print(str(survivors) + " hold in all the files:")
+		matches = _rank(counts, min(survivors, top))
+	else:
+		print("None holds in all the files, the ones holding in the most:")
+		matches = _rank(counts, top)
+
+	for m in matches:
+		print("	{:32s} {:d}/{:d}".format(str(m), m.files, checked))
+	if survivors > top:
+		print("	...")
+	return 0 if survivors else 1
@@ -0,0 +1,106 @@
+import struct
+import typing
+from zlib import crc32
+
+if typing.TYPE_CHECKING:
+	import numpy as np
+
+__all__ = ("ChecksumError", "CRC32_START_VALUE", "sum8", "readChecksummedPtrs", "gatherChecksummedPtrs", "iterChecksumErrors", "validateChecksums")
+
+Buffer = typing.Union[bytes, bytearray, memoryview]
+
+CRC32_START_VALUE = 0x2144DF1C  # crc32(b"\0\0\0\0")
+
+PTR_MASK = 0xFFFFFF
+
+# below this `sum` is faster than creating a NumPy array. NumPy is imported only by the functions using it, so that reading a header doesn't need it
+NUMPY_SUM_THRESHOLD = 4096
+
+HEADER_SIZE = 48
+CHECKSUMMED_7_30 = slice(7, 30)
+CHECKSUM_7_30_OFFSET = 31
+TEMP_RANGE_TABLE_OFFSET = HEADER_SIZE
+
+
+class ChecksumError(ValueError):
+	__slots__ = ("offset",)
+
+	def __init__(self, what: str, offset: int) -> None:
+		super().__init__(what + " checksum error at " + hex(offset))
+		self.offset = offset
+
+
+def sum8(buf: Buffer, init: int = 0) -> int:
+	"""8-bit sum of bytes, like `EinkWbf.Checksummer.calculated_checksum`, but without an object per byte."""
+	if len(buf) < NUMPY_SUM_THRESHOLD:
+		return (init + sum(buf)) & 0xFF
+	import numpy as np
+
+	return (init + int(np.frombuffer(buf, dtype=np.uint8).sum(dtype=np.uint64))) & 0xFF
+
+
+def _validateChecksummedPtrs(raw: "np.ndarray", offsets: "np.ndarray") -> "np.ndarray":
+	import numpy as np
+
+	ptrs = raw & PTR_MASK
+	computed = ((ptrs & 0xFF) + (ptrs >> 8 & 0xFF) + (ptrs >> 16)) & 0xFF
+	bad = np.flatnonzero(computed != raw >> 24)
+	if len(bad):
+		raise ChecksumError("Pointer", int(offsets.flat[bad[0]]))
+	return ptrs
+
+
+def readChecksummedPtrs(data: Buffer, offset: int, count: int) -> "np.ndarray":
+	"""Reads an array of `EinkWbf.ChecksummedPtr`s at once and returns the pointers. The highest byte of each of them must be the 8-bit sum of the other 3 ones."""
+	import numpy as np
+
+	raw = np.frombuffer(data, dtype="<u4", count=count, offset=offset).astype(np.uint32)
+	return _validateChecksummedPtrs(raw, offset + 4 * np.arange(count))
+
+
+def gatherChecksummedPtrs(data: Buffer, offsets: "np.ndarray") -> "np.ndarray":
+	"""Reads `EinkWbf.ChecksummedPtr`s at arbitrary offsets at once"""
+	import numpy as np
+
+	b = np.frombuffer(data, dtype=np.uint8)
+	raw = b[offsets[..., None] + np.arange(4)].view("<u4")[..., 0].astype(np.uint32)
+	return _validateChecksummedPtrs(raw.ravel(), offsets.ravel()).reshape(offsets.shape)
+
+
+def _u24(data: Buffer, offset: int) -> int:
+	return int.from_bytes(data[offset : offset + 3], "little")
+
+
+def iterChecksumErrors(data: Buffer) -> typing.Iterator[ChecksumError]:
+	"""Checks all the checksums in a `.wbf` file: the whole file CRC32, `checksum_7_30`, the temperature range table one, the `xwia` one and the ones of all the pointers. Accepts and rejects the same things as the Kaitai validators and `compare_checksum`."""
+	whole_header_crc32, size = struct.unpack_from("<II", data, 0)
+	if size and crc32(data[4:size], CRC32_START_VALUE) != whole_header_crc32:
+		yield ChecksumError("CRC32", 0)
+
+	if sum8(data[CHECKSUMMED_7_30]) != data[CHECKSUM_7_30_OFFSET]:
+		yield ChecksumError("Header", CHECKSUM_7_30_OFFSET)
+
+	temperature_range_count = data[38]
+	temp_range_table_end = TEMP_RANGE_TABLE_OFFSET + temperature_range_count + 2
+	if sum8(data[TEMP_RANGE_TABLE_OFFSET:temp_range_table_end]) != data[temp_range_table_end]:
+		yield ChecksumError("Temperature range table", temp_range_table_end)
+
+	xwia = _u24(data, 28)
+	xwia_len = data[xwia]
+	if sum8(data[xwia + 1 : xwia + 1 + xwia_len], xwia_len) != data[xwia + 1 + xwia_len]:
+		yield ChecksumError("xwia", xwia + 1 + xwia_len)
+
+	import numpy as np
+
+	mode_count = data[37]
+	try:
+		modePtrs = readChecksummedPtrs(data, _u24(data, 32), mode_count + 1)
+		gatherChecksummedPtrs(data, modePtrs[:, None].astype(np.int64) + 4 * np.arange(temperature_range_count + 1))
+	except ChecksumError as e:
+		yield e
+
+
+def validateChecksums(data: Buffer) -> None:
+	"""Raises the first `ChecksumError` of `iterChecksumErrors`."""
+	for e in iterChecksumErrors(data):
+		raise e
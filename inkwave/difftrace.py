@@ -0,0 +1,198 @@
+import io
+import itertools
+import os
+import re
+import subprocess
+import sys
+import time
+import typing
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+
+from .api import mainAPI
+from .batch import expandInputs
+
+__all__ = ("C_TRACE_SUFFIX", "Divergence", "DiffResult", "findDivergence", "pythonTrace", "cTrace", "diffFile", "diffAPI")
+
+# the name `tests/convert.sh` gives to the trace of the C `inkwave`: `file.wbf_c.txt`
+C_TRACE_SUFFIX = "_c.txt"
+
+# the first line of the trace of a waveform shares the line with "Checking range"
+CHECKING_RANGE_PREFIX = re.compile(r"^\s*Checking range\s+\d+: ")
+BYTE_LINE = re.compile(r"^(\d+), [0-9a-f]+$")
+PHASES_LINE = re.compile(r"^\s*\d+ phases \(\s*(\d+)\)$")
+
+
+class Divergence(typing.NamedTuple):
+	"""Where the traces differ first. `line` is 1-based. If it is within the trace of a waveform, `waveform` is its number in the trace (0-based), `ptr` its address and `offset` the offset of the byte the divergence is at (or of the last one traced before it)."""
+
+	line: int
+	expected: typing.Optional[str]  # `None` if the trace has ended
+	actual: typing.Optional[str]
+	waveform: typing.Optional[int] = None
+	ptr: typing.Optional[int] = None
+	offset: typing.Optional[int] = None
+
+	@property
+	def fileOffset(self) -> typing.Optional[int]:
+		if self.ptr is None or self.offset is None:
+			return None
+		return self.ptr + self.offset
+
+	def __str__(self) -> str:
+		res = "line " + str(self.line)
+		if self.waveform is not None:
+			res += ", waveform " + str(self.waveform)
+			if self.ptr is not None:
+				res += " at " + hex(self.ptr)
+			if self.offset is not None:
+				res += ", byte " + str(self.offset)
+				if self.fileOffset is not None:
+					res += " (" + hex(self.fileOffset) + " in the file)"
+		return res + "\n	expected: " + repr(self.expected) + "\n	actual:   " + repr(self.actual)
+
+
+class DiffResult(typing.NamedTuple):
+	path: Path
+	size: int
+	seconds: float  # taken by the Python side
+	divergence: typing.Optional[Divergence]
+	error: typing.Optional[str] = None
+
+	@property
+	def ok(self) -> bool:
+		return self.error is None and self.divergence is None
+
+
+def _stripPrefix(line: str) -> str:
+	return CHECKING_RANGE_PREFIX.sub("", line, count=1)
+
+
+def _lines(trace: str) -> typing.Iterator[str]:
+	"""Lazily, line endings are ignored"""
+	for line in io.StringIO(trace):
+		yield line.rstrip("\r\n")
+
+
+def findDivergence(expected: str, actual: str) -> typing.Optional[Divergence]:
+	"""Compares the traces event by event (a line is an event) and stops at the first difference, `None` if they are equal. The location within the waveform is taken from the Python side (`actual`): the offset of its event at the difference if it is a byte, else the one of the last equal byte, since the C side may be corrupted or truncated there."""
+	if expected == actual:
+		return None
+
+	e = _lines(expected)
+	a = _lines(actual)
+
+	# within a waveform trace if there are byte lines after the last "phases" line
+	waveform = -1
+	offset = None
+	for i, (el, al) in enumerate(itertools.zip_longest(e, a), 1):
+		if el != al:
+			break
+
+		line = _stripPrefix(al)
+		m = BYTE_LINE.match(line)
+		if m is not None:
+			if offset is None:
+				waveform += 1
+			offset = int(m.group(1))
+		elif PHASES_LINE.match(line) is not None:
+			offset = None
+	else:
+		return None
+
+	res = Divergence(i, el, al)
+
+	if al is not None:
+		m = BYTE_LINE.match(_stripPrefix(al))
+		if m is not None:
+			if offset is None:
+				waveform += 1
+			offset = int(m.group(1))
+
+	if offset is None:
+		return res
+
+	# the address is printed after the trace of the waveform
+	ptr = None
+	for line in a:
+		m = PHASES_LINE.match(_stripPrefix(line))
+		if m is not None:
+			ptr = int(m.group(1))
+			break
+
+	return res._replace(waveform=waveform, ptr=ptr, offset=offset)
+
+
+def pythonTrace(path: Path) -> str:
+	"""What `inkwave -t` prints for the file, without starting a process"""
+	out = io.StringIO()
+	with redirect_stdout(out), redirect_stderr(io.StringIO()):
+		try:
+			mainAPI(path, None, None, 2)
+		except Exception:
+			pass  # the C `inkwave` just exits too, the trace up to the error is compared
+	return out.getvalue()
+
+
+def cTrace(path: Path, cBinary: Path) -> str:
+	return subprocess.run([str(cBinary), "-t", str(path)], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=False).stdout.decode("utf-8", "replace")
+
+
+def diffFile(path: Path, cBinary: typing.Optional[Path] = None) -> DiffResult:
+	"""Compares the trace of the file with the stored trace of the C `inkwave` (`file.wbf_c.txt`, written by `tests/convert.sh`), or with a fresh one if `cBinary` is given."""
+	path = Path(path)
+	size = path.stat().st_size
+
+	if cBinary is not None:
+		expected = cTrace(path, cBinary)
+	else:
+		tracePath = path.with_name(path.name + C_TRACE_SUFFIX)
+		try:
+			expected = tracePath.read_text(encoding="utf-8", errors="replace")
+		except FileNotFoundError:
+			return DiffResult(path, size, 0.0, None, "No C trace " + str(tracePath))
+
+	t = time.perf_counter()
+	actual = pythonTrace(path)
+	seconds = time.perf_counter() - t
+
+	return DiffResult(path, size, seconds, findDivergence(expected, actual))
+
+
+def _diffFileStar(args: tuple) -> DiffResult:
+	return diffFile(*args)
+
+
+def diffAPI(inputs: typing.Iterable[typing.Union[str, Path]], jobs: typing.Optional[int] = None, cBinary: typing.Optional[Path] = None, quiet: bool = False) -> int:
+	"""Checks the parity with the C `inkwave` over the `.wbf` files (directories are searched recursively) with a pool of worker processes, like `batchAPI`. Reports the first divergence of each file."""
+	paths = [p for p in expandInputs(inputs) if p.suffix == ".wbf"]
+	if not paths:
+		print("No input files found", file=sys.stderr)
+		return -1
+
+	if not jobs:
+		jobs = os.cpu_count() or 1
+
+	diverged = 0
+	errors = 0
+	size = 0
+	cpuSeconds = 0.0
+	t = time.perf_counter()
+	with ProcessPoolExecutor(max_workers=jobs) as pool:
+		for res in pool.map(_diffFileStar, [(p, cBinary) for p in paths], chunksize=max(1, len(paths) // (4 * jobs))):
+			size += res.size
+			cpuSeconds += res.seconds
+			if res.error is not None:
+				errors += 1
+				print("==> " + str(res.path) + " <== ERROR: " + res.error)
+			elif res.divergence is not None:
+				diverged += 1
+				print("==> " + str(res.path) + " <== DIVERGED at " + str(res.divergence))
+			elif not quiet:
+				print("==> " + str(res.path) + " <== OK")
+	wall = time.perf_counter() - t
+
+	print(str(len(paths)) + " files checked, " + str(diverged) + " diverged, " + str(errors) + " errors")
+	print("{:.2f} s, {:.2f} files/s, {:.2f} MiB/s ({:.2f} MiB/s per worker)".format(wall, len(paths) / wall, size / wall / (1 << 20), size / cpuSeconds / (1 << 20) if cpuSeconds else 0.0))
+	return 1 if diverged or errors else 0
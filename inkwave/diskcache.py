@@ -0,0 +1,110 @@
+import os
+import tempfile
+import typing
+import zipfile
+from pathlib import Path
+
+import numpy as np
+
+from .tables import WaveformIndex
+from .waveform import DecodedWaveform, WaveformCache
+
+__all__ = ("CACHE_FORMAT_VERSION", "DiskCache")
+
+# bump it when anything affecting the stored data changes: the decoder, the index or the layout of the entries
+CACHE_FORMAT_VERSION = 1
+
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+
+ENTRY_SUFFIX = ".npz"
+
+
+class DiskCache:
+	"""A directory of the indexes and decoded waveforms of the files seen before, keyed by `whole_header_crc32`, `size` (the file must match it) and `CACHE_FORMAT_VERSION`. Each entry is a single file written into a temporary one and then atomically renamed, so several processes can share the directory without locking: a reader sees either the whole entry or no entry. Reading an entry touches it, and when the directory grows above `maxSize` the least recently used entries are removed."""
+
+	__slots__ = ("path", "maxSize")
+
+	def __init__(self, path: Path, maxSize: int = DEFAULT_MAX_SIZE) -> None:
+		self.path = Path(path)
+		self.maxSize = maxSize
+		self.path.mkdir(parents=True, exist_ok=True)
+
+	def entryPath(self, crc32: int, size: int) -> Path:
+		return self.path / ("{:08x}-{:d}-v{:d}".format(crc32, size, CACHE_FORMAT_VERSION) + ENTRY_SUFFIX)
+
+	def load(self, crc32: int, size: int, data: typing.Union[bytes, memoryview]) -> typing.Optional[typing.Tuple[WaveformIndex, WaveformCache]]:
+		"""Returns `None` if there is no entry for the file or it is unreadable. `data` is the file itself, the returned cache already has all its waveforms decoded, so it is used only if something asks for a waveform not in the index."""
+		p = self.entryPath(crc32, size)
+		try:
+			with np.load(p, allow_pickle=False) as entry:
+				index = WaveformIndex.fromPtrs(entry["modePtrs"], entry["ptrs"], size)
+				cache = WaveformCache(data, index, int(entry["bitsPerPixel"]))
+
+				runOffsets = entry["runOffsets"].tolist()
+				states = entry["states"]
+				counts = entry["counts"]
+				for ptr, start, stop in zip(entry["addrs"].tolist(), runOffsets, runOffsets[1:]):
+					cache.decoded[ptr] = DecodedWaveform(states[start:stop], counts[start:stop], cache.bitsPerPixel)
+		except FileNotFoundError:
+			return None
+		except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+			# written by something else or damaged, it will be overwritten
+			return None
+
+		try:
+			os.utime(p)
+		except FileNotFoundError:
+			pass  # evicted by another process meanwhile, we have already read it
+
+		return index, cache
+
+	def store(self, crc32: int, size: int, index: WaveformIndex, cache: WaveformCache) -> None:
+		"""Stores the index and all the waveforms decoded by `cache`, then evicts the old entries if needed."""
+		addrs = sorted(cache.decoded)
+		decoded = [cache.decoded[ptr] for ptr in addrs]
+		runOffsets = np.cumsum([0] + [len(wf) for wf in decoded])
+
+		fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+		try:
+			with os.fdopen(fd, "wb") as f:
+				np.savez(
+					f,
+					modePtrs=index.modePtrs,
+					ptrs=index.ptrs,
+					bitsPerPixel=np.array(cache.bitsPerPixel),
+					addrs=np.array(addrs, dtype=np.int64),
+					runOffsets=runOffsets,
+					states=np.concatenate([wf.states for wf in decoded]) if decoded else np.zeros(0, dtype=np.uint8),
+					counts=np.concatenate([wf.counts for wf in decoded]) if decoded else np.zeros(0, dtype=np.uint16),
+				)
+			os.replace(tmp, self.entryPath(crc32, size))
+		except BaseException:
+			try:
+				os.unlink(tmp)
+			except FileNotFoundError:
+				pass
+			raise
+
+		self.evict()
+
+	def evict(self) -> None:
+		"""Removes the least recently used entries until the total size fits `maxSize`. Entries removed by other processes meanwhile are just skipped."""
+		entries = []
+		total = 0
+		for p in self.path.glob("*" + ENTRY_SUFFIX):
+			try:
+				st = p.stat()
+			except FileNotFoundError:
+				continue
+			entries.append((st.st_mtime, st.st_size, p))
+			total += st.st_size
+
+		entries.sort()
+		for _, entrySize, p in entries:
+			if total <= self.maxSize:
+				break
+			try:
+				p.unlink()
+			except FileNotFoundError:
+				pass
+			total -= entrySize
@@ -0,0 +1,88 @@
+import struct
+import typing
+from pathlib import Path
+
+from .checksums import ChecksumError, sum8
+
+__all__ = ("HEADER_STRUCT", "WaveformHeader", "readHeader", "readHeaderFile", "readTempRangeBounds")
+
+Buffer = typing.Union[bytes, bytearray, memoryview]
+
+# 24-bit fields are split into `H` and `B`
+HEADER_STRUCT = struct.Struct("<IIIBBHBBBBBBBBBBHHBBHBBBBBBBBBBBBBB")
+
+TEMP_RANGE_TABLE_OFFSET = HEADER_STRUCT.size
+
+
+class WaveformHeader(typing.NamedTuple):
+	"""The same fields as `EinkWbf.Header`, but without resolving enums and BCD, so it is just a tuple of numbers."""
+
+	whole_header_crc32: int
+	size: int
+	serial: int
+	run_type: int
+	fpl_platform: int
+	fpl_lot: int
+	mode_version_or_adhesive_run_num: int
+	waveform_version: int
+	waveform_subversion: int
+	waveform_type: int
+	fpl_size: int
+	mfg_code: int
+	waveform_tuning_bias_or_rev: int
+	fpl_rate_bcd: int
+	fpl_rate: int
+	vcom_shifted: int
+	unknown1: int
+	xwia: int
+	checksum_7_30: int
+	waveform_modes_table: int
+	fvsn: int
+	luts: int
+	mode_count: int
+	temperature_range_count: int
+	advanced_wfm_flags: int
+	eb: int
+	sb: int
+	reserved_or_unkn: bytes
+	cs2: int
+
+	@classmethod
+	def fromBuffer(cls, buf: Buffer, offset: int = 0) -> "WaveformHeader":
+		"""Doesn't validate anything, see `readHeader` for that."""
+		f = HEADER_STRUCT.unpack_from(buf, offset)
+		return cls(*f[:17], f[17] | f[18] << 16, f[19], f[20] | f[21] << 16, *f[22:29], bytes(f[29:34]), f[34])
+
+	def __bytes__(self) -> bytes:
+		return HEADER_STRUCT.pack(*self[:17], self.xwia & 0xFFFF, self.xwia >> 16, self.checksum_7_30, self.waveform_modes_table & 0xFFFF, self.waveform_modes_table >> 16, *self[20:27], *self.reserved_or_unkn, self.cs2)
+
+	@property
+	def fpl_rate_hz(self) -> int:
+		return (self.fpl_rate_bcd >> 4) * 10 + (self.fpl_rate_bcd & 0xF)
+
+	@property
+	def bits_per_pixel(self) -> int:
+		return 5 if self.luts & 12 == 4 else 4
+
+
+def readHeader(buf: Buffer, offset: int = 0) -> WaveformHeader:
+	"""Unpacks the header and checks `checksum_7_30`, raising `ChecksumError` if it doesn't match."""
+	header = WaveformHeader.fromBuffer(buf, offset)
+	if sum8(buf[offset + 7 : offset + 30]) != header.checksum_7_30:
+		raise ChecksumError("Header", offset + 31)
+	return header
+
+
+def readHeaderFile(path: Path) -> WaveformHeader:
+	"""Reads only the header of the file."""
+	with Path(path).open("rb") as f:
+		return readHeader(f.read(HEADER_STRUCT.size))
+
+
+def readTempRangeBounds(buf: Buffer, header: WaveformHeader) -> typing.List[int]:
+	"""The temperatures from the temperature range table: range `i` is from `bounds[i]` to `bounds[i + 1]`."""
+	end = TEMP_RANGE_TABLE_OFFSET + header.temperature_range_count + 2
+	bounds = buf[TEMP_RANGE_TABLE_OFFSET:end]
+	if sum8(bounds) != buf[end]:
+		raise ChecksumError("Temperature range table", end)
+	return list(bounds)
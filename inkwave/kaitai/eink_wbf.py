@@ -1,12 +1,17 @@
-from pkg_resources import parse_version
 import kaitaistruct
-from kaitaistruct import KaitaiStruct, KaitaiStream, BytesIO
+from kaitaistruct import KaitaiStream, BytesIO
 from enum import IntEnum
-if parse_version(kaitaistruct.__version__) < parse_version('0.9'):
+if getattr(kaitaistruct, 'API_VERSION', (0, 9)) < (0, 9):
     raise Exception('Incompatible Kaitai Struct Python API: 0.9 or later is required, but you have %s' % kaitaistruct.__version__)
 from . import eink_wbf_wav_addrs_collection
 from . import eink_wbf_wav_addrs_collection
 from . import bcd
+from . import memory_view_io
+from .slotted_struct import SlottedStruct as KaitaiStruct
+from .. import checksums
+
+# the value of the instances not computed yet, checking for it is cheaper than `hasattr`, and it works with `__slots__`
+_NOT_READ = object()
 
 class EinkWbf(KaitaiStruct):
     """`.wbf` is the format stored on the flash chip present on the ribbon cable of some electronic paper displays made by the E Ink Corporation and `.wrf` is the input format used by the i.MX 508 EPDC (electronic paper display controller) and possibly the EPDCs of later i.MX chipsets.
@@ -44,12 +49,18 @@ class EinkWbf(KaitaiStruct):
        Source - https://github.com/julbouln/ice40_eink_controller/tree/master/utils/wbf_dump
     """
 
+    __slots__ = ('_io', '_parent', '_root', 'tracer', 'header', 'temp_range_table', '_m_mysterious_offset', '_m_xwia', '_m_modes', '_m_wav_addrs_external')
+
     def __init__(self, _io, _parent=None, _root=None):
         self._io = _io
         self._parent = _parent
         self._root = _root if _root else self
+        self._m_mysterious_offset = _NOT_READ
+        self._m_xwia = _NOT_READ
+        self._m_modes = _NOT_READ
+        self._m_wav_addrs_external = _NOT_READ
         self._read()
-        self.debug = False
+        self.tracer = None
 
     def _read(self):
         self.header = EinkWbf.Header(self._io, self, self._root)
@@ -58,6 +69,8 @@ class EinkWbf(KaitaiStruct):
     class WavAddrsCollection(KaitaiStruct):
         """A fake type that is not used, which only purpose is to calm down KSC in order to allow us to pass a custom opaque type needed by `calc_length`. Currently it won't work on strictly typed languages. It should be fixed by `interfaces` proposal."""
 
+        __slots__ = ('_io', '_parent', '_root', 'arr')
+
         def __init__(self, _io, _parent=None, _root=None):
             self._io = _io
             self._parent = _parent
@@ -71,10 +84,13 @@ class EinkWbf(KaitaiStruct):
 
     class TempRangeTable(KaitaiStruct):
 
+        __slots__ = ('_io', '_parent', '_root', 'ranges', 'checksum', '_m_calculated_checksum')
+
         def __init__(self, _io, _parent=None, _root=None):
             self._io = _io
             self._parent = _parent
             self._root = _root if _root else self
+            self._m_calculated_checksum = _NOT_READ
             self._read()
 
         def _read(self):
@@ -88,10 +104,15 @@ class EinkWbf(KaitaiStruct):
 
         class Range(KaitaiStruct):
 
+            __slots__ = ('_io', '_parent', '_root', 'idx', 'stop', 'start_own', '_m_is_full', '_m_start', '_m_checksum')
+
             def __init__(self, idx, _io, _parent=None, _root=None):
                 self._io = _io
                 self._parent = _parent
                 self._root = _root if _root else self
+                self._m_is_full = _NOT_READ
+                self._m_start = _NOT_READ
+                self._m_checksum = _NOT_READ
                 self.idx = idx
                 self._read()
 
@@ -102,39 +123,44 @@ class EinkWbf(KaitaiStruct):
 
             @property
             def is_full(self):
-                if hasattr(self, '_m_is_full'):
-                    return self._m_is_full if hasattr(self, '_m_is_full') else None
+                if self._m_is_full is not _NOT_READ:
+                    return self._m_is_full
                 self._m_is_full = self.idx == 0
-                return self._m_is_full if hasattr(self, '_m_is_full') else None
+                return self._m_is_full
 
             @property
             def start(self):
-                if hasattr(self, '_m_start'):
-                    return self._m_start if hasattr(self, '_m_start') else None
+                if self._m_start is not _NOT_READ:
+                    return self._m_start
                 self._m_start = self.start_own if self.is_full else self._parent.ranges[self.idx - 1].stop
-                return self._m_start if hasattr(self, '_m_start') else None
+                return self._m_start
 
             @property
             def checksum(self):
-                if hasattr(self, '_m_checksum'):
-                    return self._m_checksum if hasattr(self, '_m_checksum') else None
+                if self._m_checksum is not _NOT_READ:
+                    return self._m_checksum
                 self._m_checksum = (self.start_own if self.is_full else self._parent.ranges[self.idx - 1].checksum) + self.stop & 255
-                return self._m_checksum if hasattr(self, '_m_checksum') else None
+                return self._m_checksum
 
         @property
         def calculated_checksum(self):
-            if hasattr(self, '_m_calculated_checksum'):
-                return self._m_calculated_checksum if hasattr(self, '_m_calculated_checksum') else None
+            if self._m_calculated_checksum is not _NOT_READ:
+                return self._m_calculated_checksum
             self._m_calculated_checksum = self.ranges[len(self.ranges) - 1].checksum
-            return self._m_calculated_checksum if hasattr(self, '_m_calculated_checksum') else None
+            return self._m_calculated_checksum
 
     class ChecksummedPtr(KaitaiStruct):
         """Pointer with checksum."""
 
+        __slots__ = ('_io', '_parent', '_root', 'raw', 'validate_checksum', '_m_ptr', '_m_checksum', '_m_computed_checksum')
+
         def __init__(self, _io, _parent=None, _root=None):
             self._io = _io
             self._parent = _parent
             self._root = _root if _root else self
+            self._m_ptr = _NOT_READ
+            self._m_checksum = _NOT_READ
+            self._m_computed_checksum = _NOT_READ
             self._read()
 
         def _read(self):
@@ -146,31 +172,34 @@ class EinkWbf(KaitaiStruct):
 
         @property
         def ptr(self):
-            if hasattr(self, '_m_ptr'):
-                return self._m_ptr if hasattr(self, '_m_ptr') else None
+            if self._m_ptr is not _NOT_READ:
+                return self._m_ptr
             self._m_ptr = self.raw & 16777215
-            return self._m_ptr if hasattr(self, '_m_ptr') else None
+            return self._m_ptr
 
         @property
         def checksum(self):
-            if hasattr(self, '_m_checksum'):
-                return self._m_checksum if hasattr(self, '_m_checksum') else None
+            if self._m_checksum is not _NOT_READ:
+                return self._m_checksum
             self._m_checksum = self.raw >> 24
-            return self._m_checksum if hasattr(self, '_m_checksum') else None
+            return self._m_checksum
 
         @property
         def computed_checksum(self):
-            if hasattr(self, '_m_computed_checksum'):
-                return self._m_computed_checksum if hasattr(self, '_m_computed_checksum') else None
+            if self._m_computed_checksum is not _NOT_READ:
+                return self._m_computed_checksum
             self._m_computed_checksum = (self.ptr & 255) + (self.ptr >> 8 & 255) + (self.ptr >> 16 & 255) & 255
-            return self._m_computed_checksum if hasattr(self, '_m_computed_checksum') else None
+            return self._m_computed_checksum
 
     class Mode(KaitaiStruct):
 
+        __slots__ = ('_io', '_parent', '_root', 'ptr', '_unnamed1', '_m_ranges')
+
         def __init__(self, _io, _parent=None, _root=None):
             self._io = _io
             self._parent = _parent
             self._root = _root if _root else self
+            self._m_ranges = _NOT_READ
             self._read()
 
         def _read(self):
@@ -181,6 +210,8 @@ class EinkWbf(KaitaiStruct):
             """It causes parsing of `ranges` array, this way populating `_root.wav_addrs_external` and doing the first pass
             """
 
+            __slots__ = ('_io', '_parent', '_root', '_unnamed0')
+
             def __init__(self, _io, _parent=None, _root=None):
                 self._io = _io
                 self._parent = _parent
@@ -193,6 +224,8 @@ class EinkWbf(KaitaiStruct):
 
         class TempRanges(KaitaiStruct):
 
+            __slots__ = ('_io', '_parent', '_root', 'ranges')
+
             def __init__(self, _io, _parent=None, _root=None):
                 self._io = _io
                 self._parent = _parent
@@ -206,10 +239,16 @@ class EinkWbf(KaitaiStruct):
 
             class TempRange(KaitaiStruct):
 
+                __slots__ = ('_io', '_parent', '_root', 'wav_addr', '_unnamed1', '_m_wav_addrs', '_raw__m_waveform', '_m_waveform', '_raw__m_cl', '_m_cl', '_m_l')
+
                 def __init__(self, _io, _parent=None, _root=None):
                     self._io = _io
                     self._parent = _parent
                     self._root = _root if _root else self
+                    self._m_wav_addrs = _NOT_READ
+                    self._m_waveform = _NOT_READ
+                    self._m_cl = _NOT_READ
+                    self._m_l = _NOT_READ
                     self._read()
 
                 def _read(self):
@@ -218,10 +257,15 @@ class EinkWbf(KaitaiStruct):
 
                 class CalcLength(KaitaiStruct):
 
+                    __slots__ = ('_io', '_parent', '_root', '_m_max_waveforms', '_m_search', '_m_size')
+
                     def __init__(self, _io, _parent=None, _root=None):
                         self._io = _io
                         self._parent = _parent
                         self._root = _root if _root else self
+                        self._m_max_waveforms = _NOT_READ
+                        self._m_search = _NOT_READ
+                        self._m_size = _NOT_READ
                         self._read()
 
                     def _read(self):
@@ -229,10 +273,18 @@ class EinkWbf(KaitaiStruct):
 
                     class SearchIteration(KaitaiStruct):
 
+                        __slots__ = ('_io', '_parent', '_root', 'i', '_m_is_over', '_m_next_addr', '_m_addr', '_m_size', '_m_is_found', '_m_is_terminator')
+
                         def __init__(self, i, _io, _parent=None, _root=None):
                             self._io = _io
                             self._parent = _parent
                             self._root = _root if _root else self
+                            self._m_is_over = _NOT_READ
+                            self._m_next_addr = _NOT_READ
+                            self._m_addr = _NOT_READ
+                            self._m_size = _NOT_READ
+                            self._m_is_found = _NOT_READ
+                            self._m_is_terminator = _NOT_READ
                             self.i = i
                             self._read()
 
@@ -241,61 +293,61 @@ class EinkWbf(KaitaiStruct):
 
                         @property
                         def is_over(self):
-                            if hasattr(self, '_m_is_over'):
-                                return self._m_is_over if hasattr(self, '_m_is_over') else None
+                            if self._m_is_over is not _NOT_READ:
+                                return self._m_is_over
                             self._m_is_over = self.i == len(self._parent._parent.wav_addrs.arr) - 2
-                            return self._m_is_over if hasattr(self, '_m_is_over') else None
+                            return self._m_is_over
 
                         @property
                         def next_addr(self):
-                            if hasattr(self, '_m_next_addr'):
-                                return self._m_next_addr if hasattr(self, '_m_next_addr') else None
+                            if self._m_next_addr is not _NOT_READ:
+                                return self._m_next_addr
                             self._m_next_addr = self._parent._parent.wav_addrs.arr[self.i + 1]
-                            return self._m_next_addr if hasattr(self, '_m_next_addr') else None
+                            return self._m_next_addr
 
                         @property
                         def addr(self):
-                            if hasattr(self, '_m_addr'):
-                                return self._m_addr if hasattr(self, '_m_addr') else None
+                            if self._m_addr is not _NOT_READ:
+                                return self._m_addr
                             self._m_addr = self._parent._parent.wav_addrs.arr[self.i]
-                            return self._m_addr if hasattr(self, '_m_addr') else None
+                            return self._m_addr
 
                         @property
                         def size(self):
-                            if hasattr(self, '_m_size'):
-                                return self._m_size if hasattr(self, '_m_size') else None
+                            if self._m_size is not _NOT_READ:
+                                return self._m_size
                             if self.is_found:
                                 self._m_size = self._parent._parent.wav_addrs.arr[self.i + 1] - self._parent._parent.wav_addr.ptr
-                            return self._m_size if hasattr(self, '_m_size') else None
+                            return self._m_size if self._m_size is not _NOT_READ else None
 
                         @property
                         def is_found(self):
-                            if hasattr(self, '_m_is_found'):
-                                return self._m_is_found if hasattr(self, '_m_is_found') else None
+                            if self._m_is_found is not _NOT_READ:
+                                return self._m_is_found
                             self._m_is_found = self.addr == self._parent._parent.wav_addr.ptr
-                            return self._m_is_found if hasattr(self, '_m_is_found') else None
+                            return self._m_is_found
 
                         @property
                         def is_terminator(self):
-                            if hasattr(self, '_m_is_terminator'):
-                                return self._m_is_terminator if hasattr(self, '_m_is_terminator') else None
+                            if self._m_is_terminator is not _NOT_READ:
+                                return self._m_is_terminator
                             self._m_is_terminator = self.addr == 0
-                            return self._m_is_terminator if hasattr(self, '_m_is_terminator') else None
+                            return self._m_is_terminator
 
                     @property
                     def max_waveforms(self):
                         """there probably aren't any displays with more waveforms than this (we hope)
                         (technically the header allows for 256 * 256 waveforms but that's not realistic)
                         """
-                        if hasattr(self, '_m_max_waveforms'):
-                            return self._m_max_waveforms if hasattr(self, '_m_max_waveforms') else None
+                        if self._m_max_waveforms is not _NOT_READ:
+                            return self._m_max_waveforms
                         self._m_max_waveforms = 4096
-                        return self._m_max_waveforms if hasattr(self, '_m_max_waveforms') else None
+                        return self._m_max_waveforms
 
                     @property
                     def search(self):
-                        if hasattr(self, '_m_search'):
-                            return self._m_search if hasattr(self, '_m_search') else None
+                        if self._m_search is not _NOT_READ:
+                            return self._m_search
                         _pos = self._io.pos()
                         self._io.seek(0)
                         self._m_search = []
@@ -307,21 +359,24 @@ class EinkWbf(KaitaiStruct):
                                 break
                             i += 1
                         self._io.seek(_pos)
-                        return self._m_search if hasattr(self, '_m_search') else None
+                        return self._m_search
 
                     @property
                     def size(self):
-                        if hasattr(self, '_m_size'):
-                            return self._m_size if hasattr(self, '_m_size') else None
+                        if self._m_size is not _NOT_READ:
+                            return self._m_size
                         self._m_size = self.search[len(self.search) - 1].size
-                        return self._m_size if hasattr(self, '_m_size') else None
+                        return self._m_size if self._m_size is not _NOT_READ else None
 
                 class Waveform(KaitaiStruct):
 
+                    __slots__ = ('_io', '_parent', '_root', 'waveform', '_m_state_count')
+
                     def __init__(self, _io, _parent=None, _root=None):
                         self._io = _io
                         self._parent = _parent
                         self._root = _root if _root else self
+                        self._m_state_count = _NOT_READ
                         self._read()
 
                     def _read(self):
@@ -330,115 +385,124 @@ class EinkWbf(KaitaiStruct):
                         while not self._io.is_eof():
                             self.waveform.append(EinkWbf.Mode.TempRanges.TempRange.Waveform.WaveformPiece(i, self._io, self, self._root))
                             i += 1
+                        if self._root.tracer is not None:
+                            self._root.tracer.kaitaiWaveform(self)
 
                     class WaveformPiece(KaitaiStruct):
 
+                        __slots__ = ('_io', '_parent', '_root', 'k', 'current_byte', 'count_read', '_m_is_first', '_m_count', '_m_is_end_of_stream', '_m_s', '_m_is_terminator', '_m_fc_active', '_m_zero_pad', '_m_state_count', '_m_should_read_count')
+
                         def __init__(self, k, _io, _parent=None, _root=None):
                             self._io = _io
                             self._parent = _parent
                             self._root = _root if _root else self
+                            self._m_is_first = _NOT_READ
+                            self._m_count = _NOT_READ
+                            self._m_is_end_of_stream = _NOT_READ
+                            self._m_s = _NOT_READ
+                            self._m_is_terminator = _NOT_READ
+                            self._m_fc_active = _NOT_READ
+                            self._m_zero_pad = _NOT_READ
+                            self._m_state_count = _NOT_READ
+                            self._m_should_read_count = _NOT_READ
                             self.k = k
                             self._read()
 
-                        def pp(self, *args, **kwargs):
-                            if self._root.debug and self.k >= 0:
-                                print(*args, **kwargs)
-
                         def _read(self):
                             if not self.is_end_of_stream:
                                 self.current_byte = self._io.read_u1()
-                                if self._root.debug:
-                                    print('{}, {}'.format(self._io.pos() - 1, hex(self.current_byte)[2:]))
-                                if not self.is_terminator:
-                                    self.pp('s', (self.s.s0, self.s.s1, self.s.s2, self.s.s3), self.k)
                             if self.should_read_count:
                                 self.count_read = self._io.read_u1()
-                            if not self.is_terminator:
-                                self.pp('count {:d}'.format(self.count), self.k)
 
                         @property
                         def is_first(self):
-                            if hasattr(self, '_m_is_first'):
-                                return self._m_is_first if hasattr(self, '_m_is_first') else None
+                            if self._m_is_first is not _NOT_READ:
+                                return self._m_is_first
                             self._m_is_first = self.k == 0
-                            return self._m_is_first if hasattr(self, '_m_is_first') else None
+                            return self._m_is_first
 
                         @property
                         def count(self):
                             """if `is_end_of_stream` is `false` and `should_read_count` is `true`, `count_read` still must be read, but it seems it is discarded. Maybe in that case it serves some other purpose."""
-                            if hasattr(self, '_m_count'):
-                                return self._m_count if hasattr(self, '_m_count') else None
+                            if self._m_count is not _NOT_READ:
+                                return self._m_count
                             self._m_count = (1 if self.fc_active else 1 if self.is_end_of_stream else self.count_read + 1) if not self.is_terminator else 0 if self.is_first else self._parent.waveform[self.k - 1].count
-                            return self._m_count if hasattr(self, '_m_count') else None
+                            return self._m_count
 
                         @property
                         def is_end_of_stream(self):
-                            if hasattr(self, '_m_is_end_of_stream'):
-                                return self._m_is_end_of_stream if hasattr(self, '_m_is_end_of_stream') else None
+                            if self._m_is_end_of_stream is not _NOT_READ:
+                                return self._m_is_end_of_stream
                             self._m_is_end_of_stream = self._io.pos() >= self._parent._parent.l
-                            return self._m_is_end_of_stream if hasattr(self, '_m_is_end_of_stream') else None
+                            return self._m_is_end_of_stream
 
                         @property
                         def s(self):
-                            if hasattr(self, '_m_s'):
-                                return self._m_s if hasattr(self, '_m_s') else None
+                            if self._m_s is not _NOT_READ:
+                                return self._m_s
                             _pos = self._io.pos()
                             self._io.seek(0)
                             self._m_s = EinkWbf.Mode.TempRanges.TempRange.Waveform.PackedState(self.current_byte, self._io, self, self._root)
                             self._io.seek(_pos)
-                            return self._m_s if hasattr(self, '_m_s') else None
+                            return self._m_s
 
                         @property
                         def is_terminator(self):
                             """0xfc is a start and end tag for a section
                             of one-byte bit-patterns with an assumed count of 1
                             """
-                            if hasattr(self, '_m_is_terminator'):
-                                return self._m_is_terminator if hasattr(self, '_m_is_terminator') else None
+                            if self._m_is_terminator is not _NOT_READ:
+                                return self._m_is_terminator
                             self._m_is_terminator = self.current_byte == 252
-                            return self._m_is_terminator if hasattr(self, '_m_is_terminator') else None
+                            return self._m_is_terminator
 
                         @property
                         def fc_active(self):
                             """`is_first?is_terminator` is because `fc_active` is set to `false` initially, then it is flipped if `is_terminator`, so essentially it is `fc_active = fc_active xor is_terminator`, and for the first iteration `fc_active = false xor is_terminator = is_terminator`
                             """
-                            if hasattr(self, '_m_fc_active'):
-                                return self._m_fc_active if hasattr(self, '_m_fc_active') else None
+                            if self._m_fc_active is not _NOT_READ:
+                                return self._m_fc_active
                             self._m_fc_active = self.is_terminator if self.is_first else not self._parent.waveform[self.k - 1].fc_active if self.is_terminator else self._parent.waveform[self.k - 1].fc_active
-                            return self._m_fc_active if hasattr(self, '_m_fc_active') else None
+                            return self._m_fc_active
 
                         @property
                         def zero_pad(self):
-                            if hasattr(self, '_m_zero_pad'):
-                                return self._m_zero_pad if hasattr(self, '_m_zero_pad') else None
+                            if self._m_zero_pad is not _NOT_READ:
+                                return self._m_zero_pad
                             if not self.is_terminator:
                                 self._m_zero_pad = 1 if self.fc_active else 0
-                            return self._m_zero_pad if hasattr(self, '_m_zero_pad') else None
+                            return self._m_zero_pad if self._m_zero_pad is not _NOT_READ else None
 
                         @property
                         def state_count(self):
                             """WARNING, it is not exactly `state_count` from `inkwave`, it is divided by 4 (`>>2`) because there it is multiplied by 4, only to `>>8` later (we do `>>6`), but then write into file of other binary format as it is (looks like they have done bit packing in a wrong place, we fix that)
                             !!!WARNING!!!: Read this in each iteration in order to cache it, or you get your stack exceeded
                             """
-                            if hasattr(self, '_m_state_count'):
-                                return self._m_state_count if hasattr(self, '_m_state_count') else None
+                            if self._m_state_count is not _NOT_READ:
+                                return self._m_state_count
                             self._m_state_count = (0 if self.is_first else self._parent.waveform[self.k - 1].state_count) + (0 if self.is_terminator else self.count & 16383)
-                            return self._m_state_count if hasattr(self, '_m_state_count') else None
+                            return self._m_state_count
 
                         @property
                         def should_read_count(self):
                             """if `is_end_of_stream` is `false` and `should_read_count` is `true`, `count_read` still must be read, but it seems it is discarded. Maybe in that case it serves some other purpose."""
-                            if hasattr(self, '_m_should_read_count'):
-                                return self._m_should_read_count if hasattr(self, '_m_should_read_count') else None
+                            if self._m_should_read_count is not _NOT_READ:
+                                return self._m_should_read_count
                             self._m_should_read_count = not self.is_end_of_stream and (not self.is_terminator) and (not self.fc_active)
-                            return self._m_should_read_count if hasattr(self, '_m_should_read_count') else None
+                            return self._m_should_read_count
 
                     class PackedState(KaitaiStruct):
 
+                        __slots__ = ('_io', '_parent', '_root', 'b', '_m_s0', '_m_s1', '_m_s2', '_m_s3')
+
                         def __init__(self, b, _io, _parent=None, _root=None):
                             self._io = _io
                             self._parent = _parent
                             self._root = _root if _root else self
+                            self._m_s0 = _NOT_READ
+                            self._m_s1 = _NOT_READ
+                            self._m_s2 = _NOT_READ
+                            self._m_s3 = _NOT_READ
                             self.b = b
                             self._read()
 
@@ -447,90 +511,90 @@ class EinkWbf(KaitaiStruct):
 
                         @property
                         def s0(self):
-                            if hasattr(self, '_m_s0'):
-                                return self._m_s0 if hasattr(self, '_m_s0') else None
+                            if self._m_s0 is not _NOT_READ:
+                                return self._m_s0
                             self._m_s0 = self.b & 3
-                            return self._m_s0 if hasattr(self, '_m_s0') else None
+                            return self._m_s0
 
                         @property
                         def s1(self):
-                            if hasattr(self, '_m_s1'):
-                                return self._m_s1 if hasattr(self, '_m_s1') else None
+                            if self._m_s1 is not _NOT_READ:
+                                return self._m_s1
                             self._m_s1 = self.b >> 2 & 3
-                            return self._m_s1 if hasattr(self, '_m_s1') else None
+                            return self._m_s1
 
                         @property
                         def s2(self):
-                            if hasattr(self, '_m_s2'):
-                                return self._m_s2 if hasattr(self, '_m_s2') else None
+                            if self._m_s2 is not _NOT_READ:
+                                return self._m_s2
                             self._m_s2 = self.b >> 4 & 3
-                            return self._m_s2 if hasattr(self, '_m_s2') else None
+                            return self._m_s2
 
                         @property
                         def s3(self):
-                            if hasattr(self, '_m_s3'):
-                                return self._m_s3 if hasattr(self, '_m_s3') else None
+                            if self._m_s3 is not _NOT_READ:
+                                return self._m_s3
                             self._m_s3 = self.b >> 6 & 3
-                            return self._m_s3 if hasattr(self, '_m_s3') else None
+                            return self._m_s3
 
                     @property
                     def state_count(self):
-                        if hasattr(self, '_m_state_count'):
-                            return self._m_state_count if hasattr(self, '_m_state_count') else None
+                        if self._m_state_count is not _NOT_READ:
+                            return self._m_state_count
                         self._m_state_count = self.waveform[len(self.waveform) - 1].state_count
-                        return self._m_state_count if hasattr(self, '_m_state_count') else None
+                        return self._m_state_count
 
                 @property
                 def wav_addrs(self):
-                    if hasattr(self, '_m_wav_addrs'):
-                        return self._m_wav_addrs if hasattr(self, '_m_wav_addrs') else None
+                    if self._m_wav_addrs is not _NOT_READ:
+                        return self._m_wav_addrs
                     self._m_wav_addrs = self._root.wav_addrs_external
-                    return self._m_wav_addrs if hasattr(self, '_m_wav_addrs') else None
+                    return self._m_wav_addrs
 
                 @property
                 def waveform(self):
-                    if hasattr(self, '_m_waveform'):
-                        return self._m_waveform if hasattr(self, '_m_waveform') else None
+                    if self._m_waveform is not _NOT_READ:
+                        return self._m_waveform
                     io = self._root._io
                     _pos = io.pos()
                     io.seek(self.wav_addr.ptr)
-                    self._raw__m_waveform = io.read_bytes(self.l)
-                    _io__raw__m_waveform = KaitaiStream(BytesIO(self._raw__m_waveform))
+                    self._raw__m_waveform = memory_view_io.readView(io, self.l)
+                    _io__raw__m_waveform = KaitaiStream(memory_view_io.MemoryViewIO(self._raw__m_waveform))
                     self._m_waveform = EinkWbf.Mode.TempRanges.TempRange.Waveform(_io__raw__m_waveform, self, self._root)
                     io.seek(_pos)
-                    return self._m_waveform if hasattr(self, '_m_waveform') else None
+                    return self._m_waveform
 
                 @property
                 def cl(self):
-                    if hasattr(self, '_m_cl'):
-                        return self._m_cl if hasattr(self, '_m_cl') else None
+                    if self._m_cl is not _NOT_READ:
+                        return self._m_cl
                     _pos = self._io.pos()
                     self._io.seek(0)
                     self._raw__m_cl = self._io.read_bytes(0)
                     _io__raw__m_cl = KaitaiStream(BytesIO(self._raw__m_cl))
                     self._m_cl = EinkWbf.Mode.TempRanges.TempRange.CalcLength(_io__raw__m_cl, self, self._root)
                     self._io.seek(_pos)
-                    return self._m_cl if hasattr(self, '_m_cl') else None
+                    return self._m_cl
 
                 @property
                 def l(self):
                     """We are cutting off the last two bytes since we don't know what they are.
                     See section on unsolved mysteries at the top of this file.
                     """
-                    if hasattr(self, '_m_l'):
-                        return self._m_l if hasattr(self, '_m_l') else None
-                    self._m_l = self.cl.size - 2
-                    return self._m_l if hasattr(self, '_m_l') else None
+                    if self._m_l is not _NOT_READ:
+                        return self._m_l
+                    self._m_l = self.wav_addrs.sizeOf(self.wav_addr.ptr) - 2
+                    return self._m_l
 
         @property
         def ranges(self):
-            if hasattr(self, '_m_ranges'):
-                return self._m_ranges if hasattr(self, '_m_ranges') else None
+            if self._m_ranges is not _NOT_READ:
+                return self._m_ranges
             _pos = self._io.pos()
             self._io.seek(self.ptr.ptr)
             self._m_ranges = EinkWbf.Mode.TempRanges(self._io, self, self._root)
             self._io.seek(_pos)
-            return self._m_ranges if hasattr(self, '_m_ranges') else None
+            return self._m_ranges
 
     class Header(KaitaiStruct):
 
@@ -675,10 +739,15 @@ class EinkWbf(KaitaiStruct):
             remarkable_panel = 202
             unkn_db = 219
 
+        __slots__ = ('_io', '_parent', '_root', 'whole_header_crc32', 'size', 'serial', 'run_type', 'fpl_platform', 'fpl_lot', 'mode_version_or_adhesive_run_num', 'waveform_version', 'waveform_subversion', 'waveform_type', 'fpl_size', 'mfg_code', 'fpl_rate_bcd', 'fpl_rate', 'vcom_shifted', 'unknown1', 'xwia', 'checksum_7_30', 'waveform_modes_table', 'fvsn', 'luts', 'mode_count', 'temperature_range_count', 'advanced_wfm_flags', 'eb', 'sb', 'reserved_or_unkn', 'cs2', 'waveform_revision', 'waveform_tuning_bias', 'waveform_tuning_bias_or_rev_or_unkn', '_m_another_checksum_method', '_raw__m_checksummer_7_30', '_m_checksummer_7_30', '_m_bits_per_pixel')
+
         def __init__(self, _io, _parent=None, _root=None):
             self._io = _io
             self._parent = _parent
             self._root = _root if _root else self
+            self._m_another_checksum_method = _NOT_READ
+            self._m_checksummer_7_30 = _NOT_READ
+            self._m_bits_per_pixel = _NOT_READ
             self._read()
 
         def _read(self):
@@ -724,6 +793,8 @@ class EinkWbf(KaitaiStruct):
 
         class AdvancedWfmFlags(KaitaiStruct):
 
+            __slots__ = ('_io', '_parent', '_root', 'voltage_control', 'algorithm_control', 'unkn')
+
             def __init__(self, _io, _parent=None, _root=None):
                 self._io = _io
                 self._parent = _parent
@@ -740,34 +811,36 @@ class EinkWbf(KaitaiStruct):
             """From the kernel it looks like sometimes `size` (header->`filesize`) can be zero. If this is the case there is a different method for calculating the checksum.
             Look at `eink_get_computed_waveform_checksum` in `eink_waveform.c`.
             """
-            if hasattr(self, '_m_another_checksum_method'):
-                return self._m_another_checksum_method if hasattr(self, '_m_another_checksum_method') else None
+            if self._m_another_checksum_method is not _NOT_READ:
+                return self._m_another_checksum_method
             self._m_another_checksum_method = self.size == 0
-            return self._m_another_checksum_method if hasattr(self, '_m_another_checksum_method') else None
+            return self._m_another_checksum_method
 
         @property
         def checksummer_7_30(self):
-            if hasattr(self, '_m_checksummer_7_30'):
-                return self._m_checksummer_7_30 if hasattr(self, '_m_checksummer_7_30') else None
+            if self._m_checksummer_7_30 is not _NOT_READ:
+                return self._m_checksummer_7_30
             _pos = self._io.pos()
             self._io.seek(7)
-            self._raw__m_checksummer_7_30 = self._io.read_bytes(23)
-            _io__raw__m_checksummer_7_30 = KaitaiStream(BytesIO(self._raw__m_checksummer_7_30))
+            self._raw__m_checksummer_7_30 = memory_view_io.readView(self._io, 23)
+            _io__raw__m_checksummer_7_30 = KaitaiStream(memory_view_io.MemoryViewIO(self._raw__m_checksummer_7_30))
             self._m_checksummer_7_30 = EinkWbf.Checksummer(0, _io__raw__m_checksummer_7_30, self, self._root)
             self._io.seek(_pos)
-            return self._m_checksummer_7_30 if hasattr(self, '_m_checksummer_7_30') else None
+            return self._m_checksummer_7_30
 
         @property
         def bits_per_pixel(self):
             """Dumping `wrf` for waveforms using 5 bits per pixel not yet supported in `inkwave`. Parsing, though, seems to be working."""
-            if hasattr(self, '_m_bits_per_pixel'):
-                return self._m_bits_per_pixel if hasattr(self, '_m_bits_per_pixel') else None
+            if self._m_bits_per_pixel is not _NOT_READ:
+                return self._m_bits_per_pixel
             self._m_bits_per_pixel = 5 if self.luts & 12 == 4 else 4
-            return self._m_bits_per_pixel if hasattr(self, '_m_bits_per_pixel') else None
+            return self._m_bits_per_pixel
 
     class Passthrough(KaitaiStruct):
         """a workaround for missingness of validation in `instance`s."""
 
+        __slots__ = ('_io', '_parent', '_root', 'value')
+
         def __init__(self, value, _io, _parent=None, _root=None):
             self._io = _io
             self._parent = _parent
@@ -782,26 +855,45 @@ class EinkWbf(KaitaiStruct):
         """A checksummer type.
         """
 
+        __slots__ = ('_io', '_parent', '_root', 'init_value', '_m_checksum_calculation', '_m_calculated_checksum')
+
         def __init__(self, init_value, _io, _parent=None, _root=None):
             self._io = _io
             self._parent = _parent
             self._root = _root if _root else self
+            self._m_checksum_calculation = _NOT_READ
+            self._m_calculated_checksum = _NOT_READ
             self.init_value = init_value
             self._read()
 
         def _read(self):
-            self.checksum_calculation = []
+            pass
+
+        @property
+        def checksum_calculation(self):
+            """Not needed for `calculated_checksum` anymore, kept for inspection."""
+            if self._m_checksum_calculation is not _NOT_READ:
+                return self._m_checksum_calculation
+            _pos = self._io.pos()
+            self._io.seek(0)
+            self._m_checksum_calculation = []
             i = 0
             while not self._io.is_eof():
-                self.checksum_calculation.append(EinkWbf.Checksummer.Checksum(i, self._io, self, self._root))
+                self._m_checksum_calculation.append(EinkWbf.Checksummer.Checksum(i, self._io, self, self._root))
                 i += 1
+            self._io.seek(_pos)
+            return self._m_checksum_calculation
 
         class Checksum(KaitaiStruct):
 
+            __slots__ = ('_io', '_parent', '_root', 'idx', 'ch', '_m_is_first', '_m_checksum')
+
             def __init__(self, idx, _io, _parent=None, _root=None):
                 self._io = _io
                 self._parent = _parent
                 self._root = _root if _root else self
+                self._m_is_first = _NOT_READ
+                self._m_checksum = _NOT_READ
                 self.idx = idx
                 self._read()
 
@@ -810,37 +902,43 @@ class EinkWbf(KaitaiStruct):
 
             @property
             def is_first(self):
-                if hasattr(self, '_m_is_first'):
-                    return self._m_is_first if hasattr(self, '_m_is_first') else None
+                if self._m_is_first is not _NOT_READ:
+                    return self._m_is_first
                 self._m_is_first = self.idx == 0
-                return self._m_is_first if hasattr(self, '_m_is_first') else None
+                return self._m_is_first
 
             @property
             def checksum(self):
-                if hasattr(self, '_m_checksum'):
-                    return self._m_checksum if hasattr(self, '_m_checksum') else None
+                if self._m_checksum is not _NOT_READ:
+                    return self._m_checksum
                 self._m_checksum = (self._parent.init_value if self.is_first else self._parent.checksum_calculation[self.idx - 1].checksum) + self.ch & 255
-                return self._m_checksum if hasattr(self, '_m_checksum') else None
+                return self._m_checksum
 
         @property
         def calculated_checksum(self):
-            if hasattr(self, '_m_calculated_checksum'):
-                return self._m_calculated_checksum if hasattr(self, '_m_calculated_checksum') else None
-            self._m_calculated_checksum = self.checksum_calculation[len(self.checksum_calculation) - 1].checksum
-            return self._m_calculated_checksum if hasattr(self, '_m_calculated_checksum') else None
+            if self._m_calculated_checksum is not _NOT_READ:
+                return self._m_calculated_checksum
+            _pos = self._io.pos()
+            self._io.seek(0)
+            self._m_calculated_checksum = checksums.sum8(memory_view_io.readView(self._io, self._io.size()), self.init_value)
+            self._io.seek(_pos)
+            return self._m_calculated_checksum
 
     class Xwia(KaitaiStruct):
 
+        __slots__ = ('_io', '_parent', '_root', 'len', '_raw_checksummed', 'checksummed', 'checksum', '_m_value')
+
         def __init__(self, _io, _parent=None, _root=None):
             self._io = _io
             self._parent = _parent
             self._root = _root if _root else self
+            self._m_value = _NOT_READ
             self._read()
 
         def _read(self):
             self.len = self._io.read_u1()
-            self._raw_checksummed = self._io.read_bytes(self.len)
-            _io__raw_checksummed = KaitaiStream(BytesIO(self._raw_checksummed))
+            self._raw_checksummed = memory_view_io.readView(self._io, self.len)
+            _io__raw_checksummed = KaitaiStream(memory_view_io.MemoryViewIO(self._raw_checksummed))
             self.checksummed = EinkWbf.Checksummer(self.len, _io__raw_checksummed, self, self._root)
             self.checksum = self._io.read_u1()
             _ = self.checksum
@@ -849,52 +947,52 @@ class EinkWbf(KaitaiStruct):
 
         @property
         def value(self):
-            if hasattr(self, '_m_value'):
-                return self._m_value if hasattr(self, '_m_value') else None
+            if self._m_value is not _NOT_READ:
+                return self._m_value
             io = self.checksummed._io
             _pos = io.pos()
             io.seek(0)
             self._m_value = io.read_bytes_full().decode(u'ascii')
             io.seek(_pos)
-            return self._m_value if hasattr(self, '_m_value') else None
+            return self._m_value
 
     @property
     def mysterious_offset(self):
         """All mode pointers in the `.wrf` file need to be offset by 63 bytes. Likely has something to do with how they are passed by the epdc kernel module to the epdc."""
-        if hasattr(self, '_m_mysterious_offset'):
-            return self._m_mysterious_offset if hasattr(self, '_m_mysterious_offset') else None
+        if self._m_mysterious_offset is not _NOT_READ:
+            return self._m_mysterious_offset
         self._m_mysterious_offset = 63
-        return self._m_mysterious_offset if hasattr(self, '_m_mysterious_offset') else None
+        return self._m_mysterious_offset
 
     @property
     def xwia(self):
-        if hasattr(self, '_m_xwia'):
-            return self._m_xwia if hasattr(self, '_m_xwia') else None
+        if self._m_xwia is not _NOT_READ:
+            return self._m_xwia
         _pos = self._io.pos()
         self._io.seek(self.header.xwia)
         self._m_xwia = EinkWbf.Xwia(self._io, self, self._root)
         self._io.seek(_pos)
-        return self._m_xwia if hasattr(self, '_m_xwia') else None
+        return self._m_xwia
 
     @property
     def modes(self):
-        if hasattr(self, '_m_modes'):
-            return self._m_modes if hasattr(self, '_m_modes') else None
+        if self._m_modes is not _NOT_READ:
+            return self._m_modes
         _pos = self._io.pos()
         self._io.seek(self.header.waveform_modes_table)
         self._m_modes = [None] * (self._root.header.mode_count + 1)
         for i in range(self._root.header.mode_count + 1):
             self._m_modes[i] = EinkWbf.Mode(self._io, self, self._root)
         self._io.seek(_pos)
-        return self._m_modes if hasattr(self, '_m_modes') else None
+        return self._m_modes
 
     @property
     def wav_addrs_external(self):
         """`calc_length` needs an array of pointers to correctly determine lengths of waveforms."""
-        if hasattr(self, '_m_wav_addrs_external'):
-            return self._m_wav_addrs_external if hasattr(self, '_m_wav_addrs_external') else None
+        if self._m_wav_addrs_external is not _NOT_READ:
+            return self._m_wav_addrs_external
         _pos = self._io.pos()
         self._io.seek(0)
         self._m_wav_addrs_external = eink_wbf_wav_addrs_collection.EinkWbfWavAddrsCollection(self._root, self._io)
         self._io.seek(_pos)
-        return self._m_wav_addrs_external if hasattr(self, '_m_wav_addrs_external') else None
+        return self._m_wav_addrs_external
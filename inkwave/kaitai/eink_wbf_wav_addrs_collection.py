@@ -1,52 +1,51 @@
 from kaitaistruct import KaitaiStruct
 import typing
-from typing import Union
 
-import bisect
 
-def binSearch(arr: list, v: int) -> int:
-	if not arr:
-		return -1
-
-	b = len(arr) - 1
+class WaveformTracker:
+	"""Collects unique waveform addresses. They are sorted only once, when they are first needed after the last `add`, and the sizes of waveforms are computed from the differences of adjacent addresses at the same time, so getting a size is a single lookup."""
 
-	if arr[b] < v:
-		return b
+	__slots__ = ("addrs", "_wAddrs", "_sizes")
 
-	if arr[0] >= v:
-		return -1
+	def __init__(self):
+		self.addrs = set()
+		self._wAddrs = None
+		self._sizes = None
 
-	a = 0
+	def add(self, addr: int):
+		if addr in self.addrs:
+			return
 
-	d = b - a
-	m = a
-	while d > 1:
-		d = b - a
-		m = (a + b) // 2
-		el = arr[m]
-		if el >= v:  # [ a v el b ]
-			b = m
-		else:
-			a = m
-	return m
+		self.addrs.add(addr)
+		self._wAddrs = None
+		self._sizes = None
 
+	def update(self, addrs: typing.Iterable[int]):
+		self.addrs.update(addrs)
+		self._wAddrs = None
+		self._sizes = None
 
-class WaveformTracker:
-	__slots__ = ("wAddrs",)
+	def __len__(self) -> int:
+		return len(self.addrs)
 
-	def __init__(self):
-		self.wAddrs = [0]
+	@property
+	def wAddrs(self) -> typing.List[int]:
+		"""Sorted addresses terminated by 0, the same as `wav_addrs` in `inkwave`."""
+		if self._wAddrs is None:
+			self._wAddrs = sorted(self.addrs)
+			self._wAddrs.append(0)
+		return self._wAddrs
 
-	def add(self, addr: int):
-		# print("Add ", addr)
-		idx = binSearch(self.wAddrs[:-1], addr) + 1
-		# print(self.wAddrs[idx], "idx", idx, self.wAddrs[:idx], self.wAddrs[idx], self.wAddrs[idx+1:])
+	@property
+	def sizes(self) -> typing.Dict[int, int]:
+		if self._sizes is None:
+			arr = self.wAddrs
+			self._sizes = {arr[i]: arr[i + 1] - arr[i] for i in range(len(arr) - 2)}
+		return self._sizes
 
-		d = self.wAddrs[idx] - addr
-		if not d:
-			return
-		else:
-			self.wAddrs.insert(idx, addr)
+	def sizeOf(self, addr: int) -> int:
+		"""Distance to the next waveform address (or to the end of file). Raises `KeyError` for an unknown address."""
+		return self.sizes[addr]
 
 
 class EinkWbfWavAddrsCollection(KaitaiStruct):
@@ -55,12 +54,21 @@ class EinkWbfWavAddrsCollection(KaitaiStruct):
 		self._parent = _parent
 		self._root = _root if _root else self
 		self.wt = WaveformTracker()
-		self.arr = self.wt.wAddrs
 
 		# add file endpoint to waveform address table
 		# since we use this to determine end address of each waveform
 		self.wt.add(_io.size())
 
+	@property
+	def arr(self) -> typing.List[int]:
+		return self.wt.wAddrs
+
+	def __len__(self) -> int:
+		return len(self.wt)
+
+	def sizeOf(self, addr: int) -> int:
+		return self.wt.sizeOf(addr)
+
 	class Add(KaitaiStruct):
 		def __init__(self, ptr, collection, _io=None, _parent=None):
 			collection.wt.add(ptr)
@@ -0,0 +1,100 @@
+import io
+import mmap
+import typing
+from contextlib import contextmanager
+
+from kaitaistruct import KaitaiStream
+
+__all__ = ("MemoryViewIO", "readView", "mapFile")
+
+
+class MemoryViewIO(io.BufferedIOBase):
+	"""A read-only stream over a buffer. Unlike `BytesIO` it doesn't copy the buffer, only the bytes being `read`, and `readView` doesn't copy even them."""
+
+	def __init__(self, buf: typing.Union[bytes, bytearray, memoryview, mmap.mmap]) -> None:
+		super().__init__()
+		self.view = memoryview(buf).cast("B")
+		self.pos = 0
+
+	def readable(self) -> bool:
+		return True
+
+	def seekable(self) -> bool:
+		return True
+
+	def tell(self) -> int:
+		return self.pos
+
+	def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+		if whence == io.SEEK_CUR:
+			offset += self.pos
+		elif whence == io.SEEK_END:
+			offset += len(self.view)
+		elif whence != io.SEEK_SET:
+			raise ValueError("Invalid whence: " + repr(whence))
+
+		if offset < 0:
+			raise ValueError("Negative seek position " + str(offset))
+
+		self.pos = offset
+		return offset
+
+	def readView(self, size: int = -1) -> memoryview:
+		start = min(self.pos, len(self.view))
+		if size is None or size < 0:
+			end = len(self.view)
+		else:
+			end = min(start + size, len(self.view))
+		self.pos = end
+		return self.view[start:end]
+
+	def read(self, size: int = -1) -> bytes:
+		return self.readView(size).tobytes()
+
+	read1 = read
+
+	def readinto(self, b) -> int:
+		v = self.readView(len(b))
+		b[: len(v)] = v
+		return len(v)
+
+	def getbuffer(self) -> memoryview:
+		return self.view
+
+	def close(self) -> None:
+		try:
+			self.view.release()
+		except BufferError:
+			pass  # something still uses the buffer, let it be released when it dies
+		super().close()
+
+
+def readView(io: KaitaiStream, n: int) -> typing.Union[memoryview, bytes]:
+	"""The same as `io.read_bytes(n)`, but if the stream is over a `MemoryViewIO`, returns a slice of its buffer instead of a copy. Used by the patched generated code instead of `read_bytes` + `BytesIO` for substreams."""
+	src = io._io
+	if not isinstance(src, MemoryViewIO):
+		return io.read_bytes(n)
+
+	io.align_to_byte()
+	if n < 0:
+		raise ValueError("requested invalid %d amount of bytes" % (n,))
+
+	res = src.readView(n)
+	if len(res) < n:
+		raise EOFError("requested %d bytes, but only %d bytes available" % (n, len(res)))
+	return res
+
+
+@contextmanager
+def mapFile(f: typing.BinaryIO, size: int = 0) -> typing.Iterator[memoryview]:
+	"""Maps the file read-only and gives a `memoryview` of it. Slices of it may outlive the block (Kaitai objects reference each other via `_parent` and `_root`, so they are freed only by GC). In this case the mapping is not closed explicitly, but unmapped when the last slice dies."""
+	m = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+	view = memoryview(m)
+	try:
+		yield view
+	finally:
+		view.release()
+		try:
+			m.close()
+		except BufferError:
+			pass
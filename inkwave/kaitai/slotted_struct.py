@@ -0,0 +1,9 @@
+from kaitaistruct import KaitaiStruct
+
+__all__ = ("SlottedStruct",)
+
+
+class SlottedStruct(KaitaiStruct):
+	"""`kaitaistruct.KaitaiStruct` with empty `__slots__`. The patched generated classes derive from this one and declare all their fields in `__slots__`, so they are stored in the objects themselves. `KaitaiStruct` has no `__slots__`, so the objects still have a `__dict__` slot, but the dict is never created, which matters since there is an object per byte of a waveform."""
+
+	__slots__ = ()
@@ -0,0 +1,92 @@
+import bisect
+import typing
+
+import numpy as np
+
+from .header import readHeader, readTempRangeBounds
+from .tables import WaveformIndex
+from .waveform import DecodedWaveform, decodeWaveform
+from .wrf import ExpandedWaveform, WrfFile
+
+__all__ = ("FoundWaveform", "findTempRange", "temperatureTable", "WaveformLookup", "lookupWaveform", "lookupWrfWaveform")
+
+# the temperatures in the temperature range table are bytes
+TEMPERATURES_COUNT = 256
+
+
+class FoundWaveform(typing.NamedTuple):
+	mode: int
+	tempRange: int
+	temps: range
+	ptr: int
+	waveform: typing.Union[DecodedWaveform, ExpandedWaveform]
+
+
+def findTempRange(bounds: typing.Sequence[int], temp: int) -> int:
+	"""`bounds` are the temperatures from the temperature range table, each range `i` is `[bounds[i], bounds[i + 1])`. Temperatures out of the table fall into the first or the last range."""
+	return min(max(bisect.bisect_right(bounds, temp) - 1, 0), len(bounds) - 2)
+
+
+def temperatureTable(bounds: typing.Sequence[int]) -> np.ndarray:
+	"""`findTempRange` for every temperature representable in the temperature range table at once, so it is an array read."""
+	return np.clip(np.searchsorted(bounds, np.arange(TEMPERATURES_COUNT), side="right") - 1, 0, len(bounds) - 2).astype(np.uint8)
+
+
+class WaveformLookup:
+	"""Finds the waveform for a mode and a temperature with two array reads: the temperature range from `temps` and the waveform from `ids`. The result is the number of the waveform in `ptrs`, the addresses of the unique waveforms."""
+
+	__slots__ = ("ids", "temps", "ptrs")
+
+	def __init__(self, ids: np.ndarray, temps: np.ndarray, ptrs: np.ndarray) -> None:
+		self.ids = ids  # shape is (modes, temperature ranges)
+		self.temps = temps  # shape is (TEMPERATURES_COUNT,)
+		self.ptrs = ptrs
+
+	@classmethod
+	def fromIndex(cls, index: WaveformIndex, bounds: typing.Sequence[int]) -> "WaveformLookup":
+		return cls(index.ids, temperatureTable(bounds), np.array(index.unique, dtype=index.ptrs.dtype))
+
+	@classmethod
+	def fromBuffer(cls, data: typing.Union[bytes, memoryview]) -> "WaveformLookup":
+		header = readHeader(data)
+		index = WaveformIndex.fromBuffer(data, header.waveform_modes_table, header.mode_count + 1, header.temperature_range_count + 1)
+		return cls.fromIndex(index, readTempRangeBounds(data, header))
+
+	def find(self, mode: int, temp: int) -> int:
+		"""Temperatures out of the table are clipped, like in `findTempRange`."""
+		# `item` doesn't create NumPy scalars
+		return self.ids.item(mode, self.temps.item(min(max(temp, 0), TEMPERATURES_COUNT - 1)))
+
+
+def _checkMode(mode: int, modeCount: int) -> None:
+	if not 0 <= mode < modeCount:
+		raise ValueError("There is no mode " + str(mode) + " in the file, there are only " + str(modeCount))
+
+
+def lookupWaveform(data: typing.Union[bytes, memoryview], mode: int, temp: int, index: typing.Optional[WaveformIndex] = None) -> FoundWaveform:
+	"""Decodes only the waveform for the `mode` at the temperature `temp`. Only the header and the temperature range table are parsed, the pointer tables are only read, not walked."""
+	header = readHeader(data)
+
+	_checkMode(mode, header.mode_count + 1)
+
+	bounds = readTempRangeBounds(data, header)
+	tempRange = findTempRange(bounds, temp)
+
+	if index is None:
+		index = WaveformIndex.fromBuffer(data, header.waveform_modes_table, header.mode_count + 1, header.temperature_range_count + 1)
+
+	ptr = int(index.ptrs[mode, tempRange])
+	l = index.length(ptr)
+
+	return FoundWaveform(mode, tempRange, range(bounds[tempRange], bounds[tempRange + 1]), ptr, decodeWaveform(data[ptr : ptr + l], header.bits_per_pixel))
+
+
+def lookupWrfWaveform(data: typing.Union[bytes, memoryview], mode: int, temp: int, wrf: typing.Optional[WrfFile] = None) -> FoundWaveform:
+	"""The same as `lookupWaveform`, but for `.wrf` files. `ptr` is the offset of the waveform within the `.wrf` file, and the waveform is a view of `data`."""
+	if wrf is None:
+		wrf = WrfFile.fromBuffer(data)
+
+	_checkMode(mode, wrf.modeCount)
+	tempRange = findTempRange(wrf.bounds, temp)
+
+	return FoundWaveform(mode, tempRange, range(wrf.bounds[tempRange], wrf.bounds[tempRange + 1]), int(wrf.waveforms[mode, tempRange]), wrf.waveform(mode, tempRange))
@@ -0,0 +1,319 @@
+import os
+import signal
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import typing
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from .api import parse_mode
+from .checksums import validateChecksums
+from .diskcache import DiskCache
+from .header import readHeader, readTempRangeBounds
+from .lookup import WaveformLookup, findTempRange
+from .tables import WaveformIndex
+from .waveform import WaveformCache
+from .wrf import WrfFile
+
+__all__ = ("REQUEST_HEADER", "RESPONSE_HEADER", "ServedLut", "WaveformServer", "WaveformClient", "serveAPI")
+
+Address = typing.Union[str, Path, typing.Tuple[str, int]]
+
+# path length, mode length, temperature; followed by the path in UTF-8 and the mode (a number or a name like GC16) in ASCII
+REQUEST_HEADER = struct.Struct("<HBh")
+
+# status, bits per pixel, mode, temperature range, phases, payload length; followed by the payload: the LUT tensor if the status is `STATUS_OK`, an UTF-8 error message otherwise
+RESPONSE_HEADER = struct.Struct("<BBBBII")
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+DEFAULT_LUT_CACHE_SIZE = 64 * 1024 * 1024
+
+# parsed files kept in memory
+DEFAULT_MAX_FILES = 16
+
+
+class ServedLut(typing.NamedTuple):
+	mode: int
+	tempRange: int
+	lut: np.ndarray  # [phase][from gray level][to gray level], see `transitionLut`
+
+
+def _recvExactly(sock: socket.socket, n: int) -> typing.Optional[bytes]:
+	"""`None` if the connection is closed before anything is received"""
+	buf = bytearray()
+	while len(buf) < n:
+		chunk = sock.recv(n - len(buf))
+		if not chunk:
+			if buf:
+				raise ConnectionError("Connection closed in the middle of a message")
+			return None
+		buf += chunk
+	return bytes(buf)
+
+
+def _errorResponse(message: str) -> bytes:
+	msg = message.encode("utf-8")
+	return RESPONSE_HEADER.pack(STATUS_ERROR, 0, 0, 0, 0, len(msg)) + msg
+
+
+class _ResidentFile:
+	"""A parsed file kept in memory. `.wbf` files are validated and all their waveforms are decoded when loaded, `.wrf` ones are only indexed."""
+
+	__slots__ = ("stamp", "bitsPerPixel", "modeCount", "_lut")
+
+	def __init__(self, path: Path, stamp: typing.Tuple[int, int], diskCache: typing.Optional[DiskCache]) -> None:
+		self.stamp = stamp
+		# read, not mapped: the file may be rewritten while we serve it
+		data = path.read_bytes()
+		header = readHeader(data)
+		self.bitsPerPixel = header.bits_per_pixel
+		self.modeCount = header.mode_count + 1
+
+		if path.suffix == ".wrf":
+			wrf = WrfFile.fromBuffer(data)
+
+			def lut(mode: int, temp: int) -> typing.Tuple[int, np.ndarray]:
+				tempRange = findTempRange(wrf.bounds, temp)
+				return tempRange, wrf.waveform(mode, tempRange).lut()
+		else:
+			validateChecksums(data)
+
+			cached = None
+			if diskCache is not None:
+				cached = diskCache.load(header.whole_header_crc32, header.size, data)
+
+			if cached is None:
+				index = WaveformIndex.fromBuffer(data, header.waveform_modes_table, self.modeCount, header.temperature_range_count + 1)
+				cache = WaveformCache(data, index, header.bits_per_pixel)
+				cache.sweep()
+				if diskCache is not None:
+					diskCache.store(header.whole_header_crc32, header.size, index, cache)
+			else:
+				index, cache = cached
+
+			lookup = WaveformLookup.fromIndex(index, readTempRangeBounds(data, header))
+
+			def lut(mode: int, temp: int) -> typing.Tuple[int, np.ndarray]:
+				tempRange = lookup.temps.item(min(max(temp, 0), len(lookup.temps) - 1))
+				return tempRange, cache.lut(lookup.ptrs.item(lookup.ids.item(mode, tempRange)))
+
+		self._lut = lut
+
+	def lut(self, mode: int, temp: int) -> typing.Tuple[int, np.ndarray]:
+		if not 0 <= mode < self.modeCount:
+			raise ValueError("There is no mode " + str(mode) + " in the file, there are only " + str(self.modeCount))
+		return self._lut(mode, temp)
+
+
+class WaveformServer:
+	"""Keeps the parsed files and the encoded responses in memory. The files are kept in an LRU bounded by their count, the responses in one bounded by their total size. Files are reloaded when their mtime or size changes. Thread-safe: a file is loaded under a lock of its own, existing only while it is loaded, so loading a new or changed file delays only the requests for it, `lock` guards only the dicts.
+
+	Files are keyed by the paths as they are given, not resolved ones, since resolving costs more than the rest of a cached request. So a file requested by different paths is kept several times.
+
+	The server reads whatever paths the clients send, with its own permissions. So anyone able to connect can make it read (and parse, which fails on anything but waveform files) any file it can reach. If `allowedRoots` are given, only the files within them are served; the paths are resolved and checked when a file is (re)loaded.
+	"""
+
+	__slots__ = ("files", "maxFiles", "loadLocks", "responses", "responsesSize", "maxResponsesSize", "diskCache", "allowedRoots", "lock")
+
+	def __init__(self, maxResponsesSize: int = DEFAULT_LUT_CACHE_SIZE, cache_dir: typing.Optional[Path] = None, allowedRoots: typing.Optional[typing.Iterable[Path]] = None, maxFiles: int = DEFAULT_MAX_FILES) -> None:
+		self.files = OrderedDict()  # type: OrderedDict[str, _ResidentFile]
+		self.maxFiles = maxFiles
+		self.loadLocks = {}  # type: typing.Dict[str, threading.Lock]
+		self.responses = OrderedDict()  # type: OrderedDict[typing.Tuple[str, typing.Tuple[int, int], int, int], bytes]
+		self.responsesSize = 0
+		self.maxResponsesSize = maxResponsesSize
+		self.diskCache = DiskCache(cache_dir) if cache_dir is not None else None
+		self.allowedRoots = [Path(r).resolve() for r in allowedRoots] if allowedRoots is not None else None
+		self.lock = threading.Lock()
+
+	def _checkAllowed(self, path: str) -> None:
+		if self.allowedRoots is None:
+			return
+
+		resolved = Path(path).resolve()
+		for root in self.allowedRoots:
+			try:
+				resolved.relative_to(root)
+				return
+			except ValueError:
+				pass
+		raise PermissionError("The server doesn't serve files outside of " + ", ".join(map(str, self.allowedRoots)) + ": " + path)
+
+	def _getFile(self, path: str) -> _ResidentFile:
+		st = os.stat(path)
+		stamp = (st.st_mtime_ns, st.st_size)
+		with self.lock:
+			f = self.files.get(path, None)
+			if f is not None and f.stamp == stamp:
+				self.files.move_to_end(path)
+				return f
+			loadLock = self.loadLocks.setdefault(path, threading.Lock())
+
+		with loadLock:
+			try:
+				# may have been loaded by another thread while we were waiting
+				with self.lock:
+					f = self.files.get(path, None)
+				if f is None or f.stamp != stamp:
+					self._checkAllowed(path)
+					f = _ResidentFile(Path(path), stamp, self.diskCache)
+					with self.lock:
+						self.files[path] = f
+						while len(self.files) > self.maxFiles:
+							self.files.popitem(last=False)
+			finally:
+				with self.lock:
+					# the threads already waiting for it still hold it, the next ones get a new one
+					if self.loadLocks.get(path, None) is loadLock:
+						del self.loadLocks[path]
+		return f
+
+	def respond(self, path: typing.Union[str, Path], mode: typing.Union[int, str], temp: int) -> bytes:
+		"""The encoded response to the request. Errors are encoded too."""
+		try:
+			if isinstance(mode, str):
+				mode = parse_mode(mode)
+			path = os.fspath(path)
+
+			f = self._getFile(path)
+			tempRange, lut = f.lut(mode, temp)
+
+			key = (path, f.stamp, mode, tempRange)
+			with self.lock:
+				res = self.responses.get(key, None)
+				if res is not None:
+					self.responses.move_to_end(key)
+					return res
+
+			res = RESPONSE_HEADER.pack(STATUS_OK, f.bitsPerPixel, mode, tempRange, len(lut), lut.nbytes) + lut.tobytes()
+			with self.lock:
+				if key not in self.responses:
+					self.responses[key] = res
+					self.responsesSize += len(res)
+				while self.responsesSize > self.maxResponsesSize and len(self.responses) > 1:
+					_, evicted = self.responses.popitem(last=False)
+					self.responsesSize -= len(evicted)
+			return res
+		except (OSError, ValueError, IndexError, struct.error) as e:
+			return _errorResponse(str(e))
+
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+	"""Answers the requests of a connection until the client closes it"""
+
+	def handle(self) -> None:
+		while True:
+			head = _recvExactly(self.request, REQUEST_HEADER.size)
+			if head is None:
+				return
+
+			pathLen, modeLen, temp = REQUEST_HEADER.unpack(head)
+			body = _recvExactly(self.request, pathLen + modeLen) if pathLen + modeLen else b""
+			if body is None:
+				return
+
+			try:
+				path = body[:pathLen].decode("utf-8")
+				mode = body[pathLen:].decode("ascii")
+			except UnicodeDecodeError as e:
+				self.request.sendall(_errorResponse("Malformed request: " + str(e)))
+				continue
+			self.request.sendall(self.server.waveforms.respond(path, mode, temp))
+
+
+class _ThreadingUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+	daemon_threads = True
+
+
+class _ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+	daemon_threads = True
+	allow_reuse_address = True
+
+
+def makeServer(address: Address, waveforms: WaveformServer) -> socketserver.BaseServer:
+	"""A Unix socket server if `address` is a path, a TCP one if it is `(host, port)`"""
+	if isinstance(address, tuple):
+		server = _ThreadingTCPServer(address, _RequestHandler)
+	else:
+		address = Path(address)
+		if address.is_socket():
+			address.unlink()  # left by a previous run
+		server = _ThreadingUnixServer(str(address), _RequestHandler)
+	server.waveforms = waveforms
+	return server
+
+
+class WaveformClient:
+	"""Keeps a connection to `inkwave serve` and sends requests over it"""
+
+	__slots__ = ("sock",)
+
+	def __init__(self, address: Address) -> None:
+		if isinstance(address, tuple):
+			self.sock = socket.create_connection(address)
+		else:
+			self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+			self.sock.connect(str(address))
+
+	def get(self, path: typing.Union[str, Path], mode: typing.Union[int, str], temp: int) -> ServedLut:
+		"""Raises `ValueError` with the message from the server if it cannot answer. `path` is opened by the server, so it should be absolute if the server runs in another dir."""
+		pathB = str(path).encode("utf-8")
+		modeB = str(mode).encode("ascii")
+		self.sock.sendall(REQUEST_HEADER.pack(len(pathB), len(modeB), temp) + pathB + modeB)
+
+		head = _recvExactly(self.sock, RESPONSE_HEADER.size)
+		if head is None:
+			raise ConnectionError("The server has closed the connection")
+		status, bitsPerPixel, mode, tempRange, phases, payloadLen = RESPONSE_HEADER.unpack(head)
+		payload = _recvExactly(self.sock, payloadLen) if payloadLen else b""
+
+		if status != STATUS_OK:
+			raise ValueError(payload.decode("utf-8"))
+
+		levels = 1 << bitsPerPixel
+		return ServedLut(mode, tempRange, np.frombuffer(payload, dtype=np.uint8).reshape(phases, levels, levels))
+
+	def close(self) -> None:
+		self.sock.close()
+
+	def __enter__(self) -> "WaveformClient":
+		return self
+
+	def __exit__(self, *args, **kwargs) -> None:
+		self.close()
+
+
+def serveAPI(address: Address, maxResponsesSize: int = DEFAULT_LUT_CACHE_SIZE, cache_dir: typing.Optional[Path] = None, preload: typing.Iterable[Path] = (), allowedRoots: typing.Optional[typing.Iterable[Path]] = None, maxFiles: int = DEFAULT_MAX_FILES) -> int:
+	"""See `WaveformServer` for who can read what through the server"""
+	waveforms = WaveformServer(maxResponsesSize, cache_dir, allowedRoots, maxFiles)
+
+	for p in preload:
+		try:
+			waveforms._getFile(os.fspath(p))
+		except (OSError, ValueError) as e:
+			print(str(p) + ": " + str(e), file=sys.stderr)
+			return -1
+
+	def stop(signum, frame):
+		raise KeyboardInterrupt
+
+	# so that the socket file is removed when we are killed too
+	signal.signal(signal.SIGTERM, stop)
+
+	with makeServer(address, waveforms) as server:
+		print("Serving on " + str(address), file=sys.stderr)
+		try:
+			server.serve_forever()
+		except KeyboardInterrupt:
+			pass
+		finally:
+			if not isinstance(address, tuple):
+				Path(address).unlink()
+	return 0
@@ -0,0 +1,238 @@
+import hashlib
+import os
+import struct
+import sys
+import tempfile
+import typing
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from .batch import expandInputs
+from .checksums import validateChecksums
+from .header import readHeader
+from .tables import WaveformIndex
+from .waveform import COUNT_MASK, DecodedWaveform, WaveformCache
+
+__all__ = ("STORE_FORMAT_VERSION", "waveformDigest", "FileManifest", "IngestResult", "WaveformStore", "storeAPI")
+
+# bump it when anything affecting the digests or the layout of the entries changes
+STORE_FORMAT_VERSION = 1
+
+ENTRY_SUFFIX = ".npz"
+
+Buffer = typing.Union[bytes, bytearray, memoryview]
+
+
+def waveformDigest(wf: DecodedWaveform) -> bytes:
+	"""SHA-256 of what the waveform expands to, not of its encoding: adjacent runs of the same state are merged first, so the same waveform encoded with different run splits gets the same digest."""
+	states = wf.states
+	counts = (wf.counts & COUNT_MASK).astype(np.uint64)
+	if len(states):
+		starts = np.flatnonzero(np.concatenate(((True,), states[1:] != states[:-1])))
+		states = states[starts]
+		counts = np.add.reduceat(counts, starts)
+	h = hashlib.sha256(bytes((wf.bitsPerPixel,)))
+	h.update(states.tobytes())
+	h.update(counts.astype("<u8").tobytes())
+	return h.digest()
+
+
+def _rawKey(body: Buffer, bitsPerPixel: int) -> str:
+	"""The encoded bytes of a waveform, to skip decoding the ones already stored"""
+	h = hashlib.blake2b(bytes((bitsPerPixel,)), digest_size=16)
+	h.update(body)
+	return h.hexdigest()
+
+
+class FileManifest(typing.NamedTuple):
+	"""Which waveform each `(mode, temperature range)` pair of a file uses. `digests` are the ones of the unique waveforms of the file in the order of their addresses, `ids` index them and have the shape of `WaveformIndex.ptrs`."""
+
+	name: str  # of the file ingested first with this content
+	crc32: int
+	size: int
+	bitsPerPixel: int
+	digests: typing.List[bytes]
+	ids: np.ndarray
+
+	def digest(self, mode: int, tempRange: int) -> bytes:
+		return self.digests[int(self.ids[mode, tempRange])]
+
+	@property
+	def pairs(self) -> int:
+		return self.ids.size
+
+
+class IngestResult(typing.NamedTuple):
+	path: Path
+	manifest: typing.Optional[FileManifest]
+	decoded: int = 0  # waveforms decoded, the ones seen before in any file are not
+	added: int = 0  # waveforms new to the store
+	error: typing.Optional[str] = None
+
+
+def _writeAtomically(p: Path, write: typing.Callable[[typing.BinaryIO], None]) -> None:
+	"""The same way as `DiskCache.store`: into a temporary file, then renamed, so readers see either the whole entry or none"""
+	fd, tmp = tempfile.mkstemp(dir=p.parent, suffix=".tmp")
+	try:
+		with os.fdopen(fd, "wb") as f:
+			write(f)
+		os.replace(tmp, p)
+	except BaseException:
+		try:
+			os.unlink(tmp)
+		except FileNotFoundError:
+			pass
+		raise
+
+
+class WaveformStore:
+	"""A content-addressed directory of decoded waveforms shared by any number of `.wbf` files. Each unique waveform is stored once, however many files, modes and temperature ranges use it, and each file gets a `FileManifest` mapping its `(mode, temperature range)` pairs to the digests. Like `DiskCache`, every entry is written atomically, so several processes can ingest into the same directory without locking.
+
+	The layout is `waveforms/xx/<digest>.npz`, `files/<crc32>-<size>.npz` and `raw/xx/<raw key>`, the last ones map the encoded bytes of the waveforms seen before to their digests.
+	"""
+
+	__slots__ = ("path",)
+
+	def __init__(self, path: Path) -> None:
+		self.path = Path(path) / ("v" + str(STORE_FORMAT_VERSION))
+		for d in ("waveforms", "files", "raw"):
+			(self.path / d).mkdir(parents=True, exist_ok=True)
+
+	def waveformPath(self, digest: bytes) -> Path:
+		h = digest.hex()
+		return self.path / "waveforms" / h[:2] / (h + ENTRY_SUFFIX)
+
+	def manifestPath(self, crc32: int, size: int) -> Path:
+		return self.path / "files" / ("{:08x}-{:d}".format(crc32, size) + ENTRY_SUFFIX)
+
+	def _rawPath(self, key: str) -> Path:
+		return self.path / "raw" / key[:2] / key
+
+	def __contains__(self, digest: bytes) -> bool:
+		return self.waveformPath(digest).is_file()
+
+	def __len__(self) -> int:
+		"""The count of the unique waveforms stored"""
+		return sum(1 for _ in (self.path / "waveforms").glob("*/*" + ENTRY_SUFFIX))
+
+	def waveform(self, digest: bytes) -> DecodedWaveform:
+		with np.load(self.waveformPath(digest), allow_pickle=False) as entry:
+			return DecodedWaveform(entry["states"], entry["counts"], int(entry["bitsPerPixel"]))
+
+	def _addWaveform(self, digest: bytes, wf: DecodedWaveform) -> bool:
+		p = self.waveformPath(digest)
+		if p.is_file():
+			return False
+		p.parent.mkdir(exist_ok=True)
+		_writeAtomically(p, lambda f: np.savez_compressed(f, states=wf.states, counts=wf.counts, bitsPerPixel=np.array(wf.bitsPerPixel)))
+		return True
+
+	def _digestOfRaw(self, key: str) -> typing.Optional[bytes]:
+		try:
+			res = self._rawPath(key).read_bytes()
+		except FileNotFoundError:
+			return None
+		return res if len(res) == hashlib.sha256().digest_size else None
+
+	def _addRaw(self, key: str, digest: bytes) -> None:
+		p = self._rawPath(key)
+		p.parent.mkdir(exist_ok=True)
+		_writeAtomically(p, lambda f: f.write(digest))
+
+	def manifest(self, crc32: int, size: int) -> typing.Optional[FileManifest]:
+		"""`None` if no file with this content was ingested or its manifest is unreadable"""
+		try:
+			with np.load(self.manifestPath(crc32, size), allow_pickle=False) as entry:
+				return FileManifest(str(entry["name"]), crc32, size, int(entry["bitsPerPixel"]), [bytes(d) for d in entry["digests"]], entry["ids"])
+		except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+			return None
+
+	def manifests(self) -> typing.Iterator[FileManifest]:
+		for p in sorted((self.path / "files").glob("*" + ENTRY_SUFFIX)):
+			crc32, size = p.stem.split("-")
+			res = self.manifest(int(crc32, 16), int(size))
+			if res is not None:
+				yield res
+
+	def _storeManifest(self, m: FileManifest) -> None:
+		def write(f: typing.BinaryIO) -> None:
+			digests = np.frombuffer(b"".join(m.digests), dtype=np.uint8).reshape(len(m.digests), -1)
+			np.savez(f, name=np.array(m.name), bitsPerPixel=np.array(m.bitsPerPixel), digests=digests, ids=m.ids)
+
+		_writeAtomically(self.manifestPath(m.crc32, m.size), write)
+
+	def ingestBuffer(self, data: Buffer, name: str) -> IngestResult:
+		"""Stores the waveforms of the file not stored yet and its manifest. A file with the same content as one ingested before is not even parsed. Of its unique waveforms (see `WaveformIndex.unique`), only the ones whose encoded bytes have not been seen in any file are decoded."""
+		h = readHeader(data)
+		existing = self.manifest(h.whole_header_crc32, h.size)
+		if existing is not None:
+			return IngestResult(Path(name), existing)
+
+		validateChecksums(data)
+		index = WaveformIndex.fromBuffer(data, h.waveform_modes_table, h.mode_count + 1, h.temperature_range_count + 1)
+		cache = WaveformCache(data, index, h.bits_per_pixel)
+
+		digests = []
+		decoded = added = 0
+		for ptr, l in index.extents():
+			key = _rawKey(data[ptr : ptr + l], h.bits_per_pixel)
+			digest = self._digestOfRaw(key)
+			if digest is None or digest not in self:
+				wf = cache.get(ptr, l)
+				decoded += 1
+				digest = waveformDigest(wf)
+				added += self._addWaveform(digest, wf)
+				self._addRaw(key, digest)
+			digests.append(digest)
+
+		m = FileManifest(name, h.whole_header_crc32, h.size, h.bits_per_pixel, digests, index.ids)
+		self._storeManifest(m)
+		return IngestResult(Path(name), m, decoded, added)
+
+	def ingest(self, path: Path) -> IngestResult:
+		path = Path(path)
+		return self.ingestBuffer(path.read_bytes(), str(path))
+
+
+def _ingestFile(args: typing.Tuple[Path, Path]) -> IngestResult:
+	storePath, path = args
+	try:
+		return WaveformStore(storePath).ingest(path)
+	except (OSError, ValueError, IndexError, struct.error) as e:
+		return IngestResult(path, None, error=str(e))
+
+
+def storeAPI(storePath: Path, inputs: typing.Iterable[typing.Union[str, Path]], jobs: typing.Optional[int] = None, quiet: bool = False) -> int:
+	"""Ingests the `.wbf` files (directories are searched recursively) into the store with a pool of worker processes, and reports how much the storage and the decoding were deduplicated."""
+	paths = [p for p in expandInputs(inputs) if p.suffix == ".wbf"]
+	if not paths:
+		print("No input files found", file=sys.stderr)
+		return -1
+
+	if not jobs:
+		jobs = os.cpu_count() or 1
+
+	store = WaveformStore(storePath)
+	failed = pairs = fileUnique = decoded = added = 0
+	with ProcessPoolExecutor(max_workers=jobs) as pool:
+		for res in pool.map(_ingestFile, [(storePath, p) for p in paths], chunksize=max(1, len(paths) // (4 * jobs))):
+			if res.error is not None:
+				failed += 1
+				print("==> " + str(res.path) + " <== ERROR: " + res.error)
+				continue
+
+			m = res.manifest
+			pairs += m.pairs
+			fileUnique += len(m.digests)
+			decoded += res.decoded
+			added += res.added
+			if not quiet:
+				print("==> " + str(res.path) + " <== " + str(m.pairs) + " pairs, " + str(len(m.digests)) + " unique waveforms, " + str(res.decoded) + " decoded, " + str(res.added) + " new")
+
+	print(str(len(paths) - failed) + " files ingested, " + str(failed) + " failed")
+	print(str(pairs) + " (mode, temperature range) pairs, " + str(fileUnique) + " waveforms unique within their files, " + str(decoded) + " decoded, " + str(added) + " new to the store")
+	print(str(len(store)) + " unique waveforms in the store")
+	return 1 if failed else 0
@@ -0,0 +1,171 @@
+import struct
+import typing
+from pathlib import Path
+from zlib import crc32
+
+import numpy as np
+
+from .checksums import CRC32_START_VALUE, PTR_MASK, sum8
+from .header import TEMP_RANGE_TABLE_OFFSET, WaveformHeader
+from .waveform import DEFAULT_BITS_PER_PIXEL, RLE_TERMINATOR, phaseShift
+
+__all__ = ("SynthParams", "generateWaveform", "generateWbf", "writeCorpus")
+
+PTR_STRUCT = struct.Struct("<I")
+
+# the value of `luts` making the file 5 bits per pixel, see `WaveformHeader.bits_per_pixel`
+LUTS_5BPP = 4
+
+# the most runs encoded between `0xfc` sections and the most states in a section
+MAX_PAIRS_IN_A_ROW = 64
+MAX_SECTION_LEN = 16
+
+# run lengths are geometrically distributed, short runs are the most common
+MEAN_RUN_LENGTH = 8
+
+XWIA = b"synthetic.wbf"
+
+
+class SynthParams(typing.NamedTuple):
+	"""What to generate, the defaults are about the size of real files. `phases` is the max length of a waveform, the length of each one is random between the half of it and it."""
+
+	modeCount: int = 8
+	tempRangeCount: int = 14
+	uniqueWaveforms: int = 100
+	phases: int = 100
+	bitsPerPixel: int = DEFAULT_BITS_PER_PIXEL
+	sectionProbability: float = 0.2
+
+
+def _checksummedPtr(ptr: int) -> bytes:
+	return PTR_STRUCT.pack(ptr | sum8(ptr.to_bytes(3, "little")) << 24)
+
+
+def _randomStates(rng: np.random.Generator, n: int) -> np.ndarray:
+	"""State bytes, anything but `0xfc`"""
+	states = rng.integers(0, 255, n, dtype=np.uint8)
+	states[states >= RLE_TERMINATOR] += 1
+	return states
+
+
+def generateWaveform(rng: np.random.Generator, phases: int, bitsPerPixel: int = DEFAULT_BITS_PER_PIXEL, sectionProbability: float = 0.2) -> bytes:
+	"""RLE-encoded waveform of exactly `phases` phases, without the trailing 2 bytes. `(state, count)` pairs are mixed with `0xfc` sections, the counts may be `0xfc` too, so the decoders have to track the sections."""
+	left = phases << phaseShift(bitsPerPixel)
+	out = bytearray()
+	while left:
+		if rng.random() < sectionProbability:
+			n = min(int(rng.integers(1, MAX_SECTION_LEN + 1)), left)
+			out.append(RLE_TERMINATOR)
+			out += _randomStates(rng, n).tobytes()
+			out.append(RLE_TERMINATOR)
+			left -= n
+			continue
+
+		n = int(rng.integers(1, MAX_PAIRS_IN_A_ROW + 1))
+		counts = np.minimum(rng.geometric(1 / MEAN_RUN_LENGTH, n) - 1, 0xFF).astype(np.uint8)
+		total = np.cumsum(counts.astype(np.int64) + 1)
+		k = int(np.searchsorted(total, left))
+		if k < n:
+			# the last run is cut so that the waveform has exactly `phases` phases
+			n = k + 1
+			counts = counts[:n]
+			counts[-1] = left - (int(total[k - 1]) if k else 0) - 1
+			total = total[:n]
+			total[-1] = left
+
+		pairs = np.empty((n, 2), dtype=np.uint8)
+		pairs[:, 0] = _randomStates(rng, n)
+		pairs[:, 1] = counts
+		out += pairs.tobytes()
+		left -= int(total[-1])
+
+	return bytes(out)
+
+
+def generateWbf(seed: int = 0, params: SynthParams = SynthParams()) -> bytes:
+	"""A valid `.wbf` file: the CRC32, `checksum_7_30`, the temperature range table, `xwia` and pointer checksums are all correct.
+
+	Every unique waveform is used by at least one `(mode, temperature range)` pair, so the waveform lengths computed from the addresses are right. Each waveform is followed by `0xff` and `sum8` of its body. The real meaning of that byte is unknown, `sum8` is only a stand-in known to the generator.
+	"""
+	rng = np.random.default_rng(seed)
+	modeCount, tempRangeCount = params.modeCount, params.tempRangeCount
+	uniqueWaveforms = max(1, min(params.uniqueWaveforms, modeCount * tempRangeCount))
+
+	bounds = np.sort(rng.choice(np.arange(max(60, tempRangeCount + 1)), tempRangeCount + 1, replace=False)).astype(np.uint8).tobytes()
+	tempRangeTable = bounds + bytes((sum8(bounds),))
+	xwia = bytes((len(XWIA),)) + XWIA + bytes((sum8(XWIA, len(XWIA)),))
+
+	xwiaOffset = TEMP_RANGE_TABLE_OFFSET + len(tempRangeTable)
+	modeTable = xwiaOffset + len(xwia)
+	tempRangeTables = modeTable + 4 * modeCount
+	waveformsOffset = tempRangeTables + 4 * modeCount * tempRangeCount
+
+	waveforms = []
+	for _ in range(uniqueWaveforms):
+		body = generateWaveform(rng, int(rng.integers(max(1, params.phases // 2), params.phases + 1)), params.bitsPerPixel, params.sectionProbability)
+		waveforms.append(body + bytes((0xFF, sum8(body))))
+
+	addrs = waveformsOffset + np.cumsum([0] + [len(wf) for wf in waveforms[:-1]])
+	ids = np.concatenate((np.arange(uniqueWaveforms), rng.integers(0, uniqueWaveforms, modeCount * tempRangeCount - uniqueWaveforms)))
+	rng.shuffle(ids)
+
+	body = bytearray()
+	for m in range(modeCount):
+		body += _checksummedPtr(tempRangeTables + 4 * tempRangeCount * m)
+	for ptr in addrs[ids].tolist():
+		body += _checksummedPtr(ptr)
+	for wf in waveforms:
+		body += wf
+
+	size = waveformsOffset + sum(len(wf) for wf in waveforms)
+	assert size <= PTR_MASK, "The file is too large for 24-bit pointers"
+
+	header = WaveformHeader(
+		whole_header_crc32=0,
+		size=size,
+		serial=int(rng.integers(0, 1 << 32)),
+		run_type=2,
+		fpl_platform=6,
+		fpl_lot=42,
+		mode_version_or_adhesive_run_num=3,
+		waveform_version=1,
+		waveform_subversion=2,
+		waveform_type=21,
+		fpl_size=60,
+		mfg_code=0x33,
+		waveform_tuning_bias_or_rev=0,
+		fpl_rate_bcd=0x85,
+		fpl_rate=0x85,
+		vcom_shifted=100,
+		unknown1=0,
+		xwia=xwiaOffset,
+		checksum_7_30=0,
+		waveform_modes_table=modeTable,
+		fvsn=0,
+		luts=LUTS_5BPP if params.bitsPerPixel == 5 else 0,
+		mode_count=modeCount - 1,
+		temperature_range_count=tempRangeCount - 1,
+		advanced_wfm_flags=0,
+		eb=0,
+		sb=0,
+		reserved_or_unkn=bytes(5),
+		cs2=0,
+	)
+	h = bytes(header)
+	header = header._replace(checksum_7_30=sum8(h[7:30]))
+
+	data = bytearray(bytes(header) + tempRangeTable + xwia + body)
+	struct.pack_into("<I", data, 0, crc32(data[4:], CRC32_START_VALUE))
+	return bytes(data)
+
+
+def writeCorpus(outdir: Path, count: int, params: SynthParams = SynthParams(), seed: int = 0) -> typing.List[Path]:
+	"""Writes `count` files generated with the seeds from `seed` on. Returns their paths."""
+	outdir = Path(outdir)
+	outdir.mkdir(parents=True, exist_ok=True)
+	res = []
+	for i in range(count):
+		p = outdir / "synthetic_{:d}.wbf".format(seed + i)
+		p.write_bytes(generateWbf(seed + i, params))
+		res.append(p)
+	return res
@@ -0,0 +1,67 @@
+import typing
+
+import numpy as np
+
+from .checksums import gatherChecksummedPtrs, readChecksummedPtrs
+from .kaitai.eink_wbf_wav_addrs_collection import WaveformTracker
+
+__all__ = ("WaveformIndex",)
+
+
+class WaveformIndex:
+	"""Waveform pointers of every `(mode, temperature range)` pair, read from the pointer tables in one go without any Kaitai objects, and the lengths of the unique waveforms. This replaces the first pass."""
+
+	__slots__ = ("modePtrs", "ptrs", "tracker", "_ids")
+
+	def __init__(self, modePtrs: np.ndarray, ptrs: np.ndarray, tracker: WaveformTracker) -> None:
+		self.modePtrs = modePtrs
+		self.ptrs = ptrs  # shape is (modes, temperature ranges)
+		self.tracker = tracker
+		self._ids = None
+
+	@classmethod
+	def fromBuffer(cls, data: typing.Union[bytes, memoryview], modesTable: int, modeCount: int, tempRangeCount: int, size: typing.Optional[int] = None) -> "WaveformIndex":
+		if size is None:
+			size = len(data)
+
+		modePtrs = readChecksummedPtrs(data, modesTable, modeCount)
+		ptrs = gatherChecksummedPtrs(data, modePtrs[:, None].astype(np.int64) + 4 * np.arange(tempRangeCount))
+		return cls.fromPtrs(modePtrs, ptrs, size)
+
+	@classmethod
+	def fromPtrs(cls, modePtrs: np.ndarray, ptrs: np.ndarray, size: int) -> "WaveformIndex":
+		"""For the pointers already read, `size` is the size of the file"""
+		tracker = WaveformTracker()
+		# the end of file is needed to determine the length of the last waveform
+		tracker.add(size)
+		tracker.update(np.unique(ptrs).tolist())
+		return cls(modePtrs, ptrs, tracker)
+
+	@property
+	def modeCount(self) -> int:
+		return self.ptrs.shape[0]
+
+	@property
+	def tempRangeCount(self) -> int:
+		return self.ptrs.shape[1]
+
+	@property
+	def unique(self) -> typing.List[int]:
+		"""Addresses of the unique waveforms in ascending order"""
+		return self.tracker.wAddrs[:-2]
+
+	@property
+	def ids(self) -> np.ndarray:
+		"""The number of the waveform of each `(mode, temperature range)` pair in `unique`, shape is the same as of `ptrs`"""
+		if self._ids is None:
+			self._ids = np.searchsorted(np.array(self.unique, dtype=self.ptrs.dtype), self.ptrs).astype(np.uint16)
+		return self._ids
+
+	def length(self, ptr: int) -> int:
+		"""We are cutting off the last two bytes since we don't know what they are. See the section on unsolved mysteries in the ReadMe."""
+		return self.tracker.sizeOf(ptr) - 2
+
+	def extents(self) -> typing.Iterator[typing.Tuple[int, int]]:
+		"""`(ptr, length)` of the unique waveforms in the order of addresses, so reading them is sequential."""
+		for ptr in self.unique:
+			yield ptr, self.length(ptr)
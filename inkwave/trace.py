@@ -0,0 +1,152 @@
+import struct
+import typing
+from io import RawIOBase, TextIOBase
+
+import numpy as np
+
+from .waveform import _markSections
+
+__all__ = ("TRACE_RECORD", "WaveformTrace", "traceWaveform", "TraceSink", "ListSink", "TextSink", "BinarySink", "readBinaryTrace")
+
+Buffer = typing.Union[bytes, bytearray, memoryview]
+
+# a piece of a waveform: a terminator or a state with its count. `count` is 0 for terminators. The number of the piece (`k` in the traces) is its index.
+TRACE_RECORD = np.dtype([("offset", "<u4"), ("byte", "u1"), ("count", "<u2")])
+
+BINARY_TRACE_MAGIC = b"IWTR\x01"
+
+# the address of the waveform and the count of its pieces, followed by the pieces
+BINARY_TRACE_WAVEFORM = struct.Struct("<II")
+
+_HEX = [hex(b)[2:] for b in range(256)]
+_STATES = ["s " + str((b & 3, b >> 2 & 3, b >> 4 & 3, b >> 6 & 3)) + " " for b in range(256)]
+
+
+class WaveformTrace(typing.NamedTuple):
+	"""Everything the tracing of a waveform produces, as a single event. `offset`s of the pieces are relative to `ptr`."""
+
+	ptr: int
+	pieces: np.ndarray  # of `TRACE_RECORD`
+
+	def lines(self) -> typing.List[str]:
+		"""The trace in the format of the C `inkwave` with tracing: the offset and the byte of each piece, then the state and the count if it is not a terminator."""
+		res = []
+		for k, (offset, b, count) in enumerate(self.pieces.tolist()):
+			res.append(str(offset) + ", " + _HEX[b])
+			if count:
+				ks = str(k)
+				res.append(_STATES[b] + ks)
+				res.append("count " + str(count) + " " + ks)
+		return res
+
+	def __eq__(self, other: "WaveformTrace") -> bool:
+		return self.ptr == other.ptr and np.array_equal(self.pieces, other.pieces)
+
+
+def traceWaveform(ptr: int, buf: Buffer) -> WaveformTrace:
+	"""Traces the waveform bytes in bulk, the same way `decodeWaveform` decodes them. Gives the same pieces as the Kaitai-generated `WaveformPiece`s."""
+	b = np.frombuffer(buf, dtype=np.uint8)
+	isState, isCount = _markSections(b)
+
+	positions = np.flatnonzero(~isCount[: len(b)])
+	pieces = np.zeros(len(positions), dtype=TRACE_RECORD)
+	pieces["offset"] = positions
+	pieces["byte"] = b[positions]
+
+	states = isState[positions]
+	counts = np.ones(len(positions), dtype=np.uint16)
+	hasCount = isCount[positions + 1]
+	counts[hasCount] += b[positions[hasCount] + 1]
+	pieces["count"] = np.where(states, counts, 0)
+
+	return WaveformTrace(ptr, pieces)
+
+
+class TraceSink:
+	"""Receives the traces of the waveforms. Tracing is enabled by passing a sink, so when it is disabled the only cost is an `is None` check per waveform."""
+
+	__slots__ = ()
+
+	def waveform(self, trace: WaveformTrace) -> None:
+		raise NotImplementedError
+
+	def kaitaiWaveform(self, wf: "EinkWbf.Mode.TempRanges.TempRange.Waveform") -> None:
+		"""Called by the Kaitai-generated `Waveform` when `EinkWbf.tracer` is set."""
+		pieces = np.zeros(len(wf.waveform), dtype=TRACE_RECORD)
+		offset = 0
+		for k, piece in enumerate(wf.waveform):
+			pieces[k] = (offset, piece.current_byte, 0 if piece.is_terminator else piece.count)
+			offset += 2 if piece.should_read_count else 1
+		self.waveform(WaveformTrace(wf._parent.wav_addr.ptr, pieces))
+
+	def flush(self) -> None:
+		pass
+
+	def close(self) -> None:
+		self.flush()
+
+	def __enter__(self) -> "TraceSink":
+		return self
+
+	def __exit__(self, *args, **kwargs) -> None:
+		self.close()
+
+
+class ListSink(TraceSink):
+	"""Keeps the traces in memory"""
+
+	__slots__ = ("traces",)
+
+	def __init__(self) -> None:
+		self.traces = []  # type: typing.List[WaveformTrace]
+
+	def waveform(self, trace: WaveformTrace) -> None:
+		self.traces.append(trace)
+
+
+class TextSink(TraceSink):
+	"""Writes the traces in the text format of the C `inkwave`, see `WaveformTrace.lines`. Each waveform is formatted as a whole and written with a single `write`, so the output of the others writing into the same stream stays in order."""
+
+	__slots__ = ("stream",)
+
+	def __init__(self, stream: TextIOBase) -> None:
+		self.stream = stream
+
+	def waveform(self, trace: WaveformTrace) -> None:
+		lines = trace.lines()
+		if lines:
+			lines.append("")
+			self.stream.write("\n".join(lines))
+
+	def flush(self) -> None:
+		self.stream.flush()
+
+
+class BinarySink(TraceSink):
+	"""Writes the traces as `BINARY_TRACE_MAGIC` followed by each waveform: `BINARY_TRACE_WAVEFORM` and the `TRACE_RECORD`s, 7 bytes per piece. See `readBinaryTrace`."""
+
+	__slots__ = ("stream",)
+
+	def __init__(self, stream: RawIOBase) -> None:
+		self.stream = stream
+		stream.write(BINARY_TRACE_MAGIC)
+
+	def waveform(self, trace: WaveformTrace) -> None:
+		self.stream.write(BINARY_TRACE_WAVEFORM.pack(trace.ptr, len(trace.pieces)))
+		self.stream.write(trace.pieces.tobytes())
+
+	def flush(self) -> None:
+		self.stream.flush()
+
+
+def readBinaryTrace(buf: Buffer) -> typing.Iterator[WaveformTrace]:
+	"""Reads what `BinarySink` writes. The pieces are views of `buf`."""
+	if bytes(buf[: len(BINARY_TRACE_MAGIC)]) != BINARY_TRACE_MAGIC:
+		raise ValueError("Not an inkwave binary trace")
+
+	offset = len(BINARY_TRACE_MAGIC)
+	while offset < len(buf):
+		ptr, count = BINARY_TRACE_WAVEFORM.unpack_from(buf, offset)
+		offset += BINARY_TRACE_WAVEFORM.size
+		yield WaveformTrace(ptr, np.frombuffer(buf, dtype=TRACE_RECORD, count=count, offset=offset))
+		offset += count * TRACE_RECORD.itemsize
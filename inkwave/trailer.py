@@ -0,0 +1,212 @@
+import hashlib
+import os
+import struct
+import sys
+import time
+import typing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from .batch import expandInputs
+from .brute import _CRC8_TABLES, CRC8_VARIANTS
+from .checksums import ChecksumError
+from .header import readHeader
+from .tables import WaveformIndex
+
+__all__ = ("TRAILER_HYPOTHESES", "WaveformTrailers", "readTrailers", "bodyValues", "TrailerHypothesis", "rankHypotheses", "trailerAPI")
+
+Buffer = typing.Union[bytes, bytearray, memoryview]
+
+# the first byte of the trailer
+TRAILER_MARKER = 0xFF
+
+# the order of the hypotheses in the results of `bodyValues`. "none" is 0 for every waveform, so it is the baseline: how often the most common trailer byte occurs
+TRAILER_HYPOTHESES = ("none", "sum", "neg-sum", "xor", "length", "length-high") + tuple(crc.name for crc in CRC8_VARIANTS)
+
+# the tables of all the variants one after another, the state of the variant `v` indexes it at `256 * v + state`
+_CRC_TABLES = np.concatenate(_CRC8_TABLES)
+_CRC_TABLE_OFFSETS = 256 * np.arange(len(CRC8_VARIANTS), dtype=np.intp)[:, None]
+_CRC_INITS = np.array([crc.init for crc in CRC8_VARIANTS], dtype=np.uint8)
+_CRC_XOROUTS = np.array([crc.xorout for crc in CRC8_VARIANTS], dtype=np.uint8)
+
+
+class WaveformTrailers(typing.NamedTuple):
+	"""The unique waveforms of a file: their bodies (without the trailers) and the 2 bytes following each of them"""
+
+	ptrs: np.ndarray
+	lengths: np.ndarray  # of the bodies
+	trailers: np.ndarray  # shape is (waveforms, 2)
+
+
+def readTrailers(data: Buffer) -> WaveformTrailers:
+	"""Takes the extents of the unique waveforms from the length table of `WaveformIndex`, so there is no Kaitai parsing and no `CalcLength.search`."""
+	h = readHeader(data)
+	index = WaveformIndex.fromBuffer(data, h.waveform_modes_table, h.mode_count + 1, h.temperature_range_count + 1)
+	extents = np.array(list(index.extents()), dtype=np.int64).reshape(-1, 2)
+	ptrs, lengths = extents[:, 0], extents[:, 1]
+
+	# the last waveform may be cut by the end of the file
+	ok = (lengths >= 0) & (ptrs + lengths + 2 <= len(data))
+	ptrs, lengths = ptrs[ok], lengths[ok]
+
+	b = np.frombuffer(data, dtype=np.uint8)
+	return WaveformTrailers(ptrs, lengths, b[(ptrs + lengths)[:, None] + np.arange(2)])
+
+
+def bodyValues(data: Buffer, ptrs: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+	"""Every hypothesis of `TRAILER_HYPOTHESES` evaluated over the bodies of all the waveforms at once, the shape is (hypotheses, waveforms).
+
+	Sums and xors are `reduceat`s over the concatenated bodies. CRCs are stepped a byte per step for all the waveforms and all the CRC variants together, the waveforms sorted by length so that the ones still running are a prefix.
+	"""
+	b = np.frombuffer(data, dtype=np.uint8)
+	count = len(ptrs)
+	res = np.zeros((len(TRAILER_HYPOTHESES), count), dtype=np.uint8)
+	if not count:
+		return res
+
+	total = int(lengths.sum())
+	bounds = np.zeros(count, dtype=np.int64)
+	np.cumsum(lengths[:-1], out=bounds[1:])
+	nonEmpty = lengths > 0
+	if total:
+		flat = b[np.repeat(ptrs - bounds, lengths) + np.arange(total)]
+		res[1, nonEmpty] = np.add.reduceat(flat, bounds[nonEmpty], dtype=np.uint64) & 0xFF
+		res[3, nonEmpty] = np.bitwise_xor.reduceat(flat, bounds[nonEmpty])
+	res[2] = -res[1]
+	res[4] = lengths & 0xFF
+	res[5] = lengths >> 8 & 0xFF
+
+	order = np.argsort(-lengths, kind="stable")
+	starts = ptrs[order]
+	# the number of the waveforms longer than `k` for each `k`
+	running = count - np.searchsorted(np.sort(lengths), np.arange(int(lengths.max())), side="right")
+	states = np.repeat(_CRC_INITS[:, None], count, axis=1)
+	for k, n in enumerate(running.tolist()):
+		states[:, :n] = _CRC_TABLES.take(_CRC_TABLE_OFFSETS + (states[:, :n] ^ b[starts[:n] + k]))
+	res[6:, order] = states ^ _CRC_XOROUTS[:, None]
+
+	return res
+
+
+# files evaluated together by a worker: CRCs are stepped for all their waveforms at once, so the cost of a step is paid once per chunk, not per file
+CHUNK_FILES = 64
+
+
+class _ChunkResult(typing.NamedTuple):
+	files: int
+	values: np.ndarray
+	trailers: np.ndarray
+	digests: np.ndarray  # of the bodies with the trailers, to count the waveforms repeated across the files once
+	errors: typing.List[typing.Tuple[Path, str]]
+
+
+def _digests(data: Buffer, ptrs: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+	m = memoryview(data)
+	return np.frombuffer(b"".join(hashlib.blake2b(m[p : p + l + 2], digest_size=8).digest() for p, l in zip(ptrs.tolist(), lengths.tolist())), dtype="<u8")
+
+
+def _processChunk(paths: typing.List[Path]) -> _ChunkResult:
+	"""The files are concatenated and their waveforms are evaluated by a single `bodyValues`"""
+	datas, ptrs, lengths, trailers, errors = [], [], [], [], []
+	offset = 0
+	for path in paths:
+		try:
+			data = Path(path).read_bytes()
+			t = readTrailers(data)
+		except (ChecksumError, ValueError, IndexError, struct.error) as e:
+			errors.append((path, str(e)))
+			continue
+		datas.append(data)
+		ptrs.append(t.ptrs + offset)
+		lengths.append(t.lengths)
+		trailers.append(t.trailers)
+		offset += len(data)
+
+	data = b"".join(datas)
+	ptrs = np.concatenate(ptrs) if ptrs else np.zeros(0, dtype=np.int64)
+	lengths = np.concatenate(lengths) if lengths else np.zeros(0, dtype=np.int64)
+	trailers = np.concatenate(trailers) if trailers else np.zeros((0, 2), dtype=np.uint8)
+	return _ChunkResult(len(datas), bodyValues(data, ptrs, lengths), trailers, _digests(data, ptrs, lengths), errors)
+
+
+class TrailerHypothesis(typing.NamedTuple):
+	"""The trailer byte is `relation(value, constant)`, where `value` is the hypothesis evaluated over the body and `relation` is `+` or `^`"""
+
+	hypothesis: str
+	relation: str
+	constant: int
+	matched: int
+	total: int
+
+	@property
+	def share(self) -> float:
+		return self.matched / self.total if self.total else 0.0
+
+	def __str__(self) -> str:
+		return "{} {} {:#04x}".format(self.hypothesis, self.relation, self.constant)
+
+
+def _bestConstants(diffs: np.ndarray) -> typing.Tuple[np.ndarray, np.ndarray]:
+	"""The most common value of each row and its count"""
+	rows = diffs.shape[0]
+	hist = np.bincount((diffs.astype(np.int64) + 256 * np.arange(rows)[:, None]).ravel(), minlength=256 * rows).reshape(rows, 256)
+	best = hist.argmax(axis=1)
+	return best, hist[np.arange(rows), best]
+
+
+def rankHypotheses(values: np.ndarray, trailers: np.ndarray) -> typing.List[TrailerHypothesis]:
+	"""Fits each hypothesis to the trailer bytes with an added and with a xored constant (so the `init`s and `xorout`s of sums and CRCs are found too), and sorts them by the share of the waveforms they explain."""
+	mystery = trailers[None, :]
+	res = []
+	for relation, diffs in (("+", mystery - values), ("^", mystery ^ values)):
+		constants, matched = _bestConstants(diffs)
+		res.extend(TrailerHypothesis(name, relation, c, m, len(trailers)) for name, c, m in zip(TRAILER_HYPOTHESES, constants.tolist(), matched.tolist()))
+
+	# for the same hypothesis prefer `+`, they coincide when the constant is 0
+	res.sort(key=lambda h: -h.matched)
+	seen = set()
+	return [h for h in res if not (h.hypothesis in seen or seen.add(h.hypothesis))]
+
+
+def trailerAPI(inputs: typing.Iterable[typing.Union[str, Path]], jobs: typing.Optional[int] = None) -> int:
+	"""Collects the trailers of the unique waveforms of the `.wbf` files (directories are searched recursively) over a pool of worker processes, and ranks the checksum hypotheses over the waveform bodies by how many of the trailers they explain. Waveforms present in several files are counted once."""
+	paths = [p for p in expandInputs(inputs) if p.suffix == ".wbf"]
+	if not paths:
+		print("No input files found", file=sys.stderr)
+		return -1
+
+	if not jobs:
+		jobs = os.cpu_count() or 1
+
+	chunks = max(-(-len(paths) // CHUNK_FILES), min(len(paths), jobs))
+	values, trailers, digests = [], [], []
+	files = 0
+	t = time.perf_counter()
+	with ProcessPoolExecutor(max_workers=jobs) as pool:
+		for res in pool.map(_processChunk, [paths[i::chunks] for i in range(chunks)]):
+			for path, error in res.errors:
+				print("==> " + str(path) + " <== ERROR: " + error, file=sys.stderr)
+			values.append(res.values)
+			trailers.append(res.trailers)
+			digests.append(res.digests)
+			files += res.files
+
+	if not sum(len(tr) for tr in trailers):
+		print("No waveforms found", file=sys.stderr)
+		return 1
+
+	_, first = np.unique(np.concatenate(digests), return_index=True)
+	values = np.concatenate(values, axis=1)[:, first]
+	trailers = np.concatenate(trailers)[first]
+	marked = trailers[:, 0] == TRAILER_MARKER
+	ranking = rankHypotheses(values[:, marked], trailers[marked, 1])
+	wall = time.perf_counter() - t
+
+	print(str(len(trailers)) + " unique waveforms in " + str(files) + " files, {:.2f} s".format(wall))
+	if not marked.all():
+		print(str(int((~marked).sum())) + " of them are not followed by " + hex(TRAILER_MARKER) + ", their lengths are likely wrong, they are skipped")
+	for h in ranking:
+		print("	{:24s} {:7d}/{:d} {:6.1%}".format(str(h), h.matched, h.total, h.share))
+	return 0 if ranking and ranking[0].matched == ranking[0].total else 1
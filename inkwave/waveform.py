@@ -0,0 +1,205 @@
+import typing
+
+import numpy as np
+
+__all__ = ("RLE_TERMINATOR", "phaseShift", "transitionLut", "DecodedWaveform", "decodeWaveform", "iterWaveformRuns", "WaveformCache")
+
+# 0xfc is a start and end tag for a section
+# of one-byte bit-patterns with an assumed count of 1
+RLE_TERMINATOR = 0xFC
+
+COUNT_MASK = 0x3FFF
+
+DEFAULT_BITS_PER_PIXEL = 4
+
+# the C `inkwave` prints `state_count >> 6` as the count of phases whatever the bits per pixel
+INKWAVE_PHASE_SHIFT = 6
+
+if typing.TYPE_CHECKING:
+	from .tables import WaveformIndex
+
+WaveformRun = typing.Tuple[int, int, int, int, int]
+
+
+def phaseShift(bitsPerPixel: int) -> int:
+	"""A phase is a matrix of 2-bit states for each transition from each gray level to each one, and a state byte holds 4 of them. So a phase is `1 << phaseShift(bitsPerPixel)` state bytes: 64 for 4 bits per pixel and 256 for 5."""
+	return 2 * bitsPerPixel - 2
+
+
+def transitionLut(expanded: np.ndarray, bitsPerPixel: int = DEFAULT_BITS_PER_PIXEL) -> np.ndarray:
+	"""Reshapes the expanded states into the `[phase][from gray level][to gray level]` tensor of drive states. The states of a phase are stored by the level transitioned from, then by the one transitioned to. An incomplete phase at the end is dropped. A view of `expanded` if it is contiguous."""
+	levels = 1 << bitsPerPixel
+	phases = len(expanded) >> phaseShift(bitsPerPixel)
+	return expanded.reshape(-1)[: phases * levels * levels].reshape(phases, levels, levels)
+
+
+class DecodedWaveform:
+	"""A run-length-decoded waveform. `states` are the packed state bytes (`s0` in the lowest 2 bits, `s3` in the highest ones), `counts` are how many times each of them is repeated."""
+
+	__slots__ = ("states", "counts", "bitsPerPixel")
+
+	def __init__(self, states: np.ndarray, counts: np.ndarray, bitsPerPixel: int = DEFAULT_BITS_PER_PIXEL) -> None:
+		self.states = states
+		self.counts = counts
+		self.bitsPerPixel = bitsPerPixel
+
+	def __len__(self) -> int:
+		return len(self.states)
+
+	@property
+	def state_count(self) -> int:
+		"""The same as `EinkWbf.Mode.TempRanges.TempRange.Waveform.state_count`, so it is `inkwave`'s one divided by 4."""
+		return int((self.counts & COUNT_MASK).sum())
+
+	@property
+	def state_counts(self) -> np.ndarray:
+		"""Cumulative `state_count` of each piece, like `WaveformPiece.state_count` of the non-terminator pieces"""
+		return np.cumsum(self.counts & COUNT_MASK)
+
+	@property
+	def phases(self) -> int:
+		"""As printed by the C `inkwave`, for 5 bits per pixel it is 4 times `lutPhases`"""
+		return self.state_count >> INKWAVE_PHASE_SHIFT
+
+	@property
+	def lutPhases(self) -> int:
+		"""The real count of the phases, the length of `lut()`"""
+		return self.state_count >> phaseShift(self.bitsPerPixel)
+
+	def unpacked(self) -> np.ndarray:
+		"""`(s0, s1, s2, s3)` for each run, an `uint8` array of shape `(len(self), 4)`."""
+		return (self.states[:, None] >> np.array((0, 2, 4, 6), dtype=np.uint8)) & 3
+
+	def expand(self) -> np.ndarray:
+		"""Unpacked states, each repeated `count` times, the stuff written into `.wrf`."""
+		return np.repeat(self.unpacked(), self.counts, axis=0)
+
+	def lut(self) -> np.ndarray:
+		"""See `transitionLut`"""
+		return transitionLut(self.expand(), self.bitsPerPixel)
+
+
+def _markSections(b: np.ndarray) -> typing.Tuple[np.ndarray, np.ndarray]:
+	"""Returns masks of bytes being states and bytes being counts.
+
+	Outside of `0xfc` sections the bytes come in `(state, count)` pairs, so a `0xfc` there is a terminator only if it is at even offset from the section start; a `0xfc` at odd offset is just a count. Within a section every byte is a state until the next `0xfc`. So we only need a Python iteration per section, not per byte.
+	"""
+	n = len(b)
+	terms = np.flatnonzero(b == RLE_TERMINATOR)
+	termsByParity = (terms[terms & 1 == 0], terms[terms & 1 == 1])
+
+	isState = np.zeros(n, dtype=np.bool_)
+	isCount = np.zeros(n + 1, dtype=np.bool_)
+
+	pos = 0
+	fcActive = False
+	while pos < n:
+		if fcActive:
+			candidates = terms
+		else:
+			candidates = termsByParity[pos & 1]
+
+		i = np.searchsorted(candidates, pos)
+		end = int(candidates[i]) if i < len(candidates) else n
+
+		if fcActive:
+			isState[pos:end] = True
+		else:
+			isState[pos:end:2] = True
+			isCount[pos + 1 : end : 2] = True
+
+		pos = end + 1
+		fcActive = not fcActive
+
+	return isState, isCount
+
+
+def decodeWaveform(buf: typing.Union[bytes, bytearray, memoryview], bitsPerPixel: int = DEFAULT_BITS_PER_PIXEL) -> DecodedWaveform:
+	"""Decodes the waveform bytes (`wav_addr.ptr` to `wav_addr.ptr + l`) in bulk, without creating an object per byte. Gives the same states and counts as the Kaitai-generated `Waveform`.
+
+	If the last byte of the waveform is a state outside of a `0xfc` section, it has no count byte after it. The Kaitai-generated code fails to read it there; here, like in the original `inkwave`, its count is 1.
+
+	The encoding is the same for 4 and 5 bits per pixel, `bitsPerPixel` only determines how many states are in a phase.
+	"""
+	b = np.frombuffer(buf, dtype=np.uint8)
+	isState, isCount = _markSections(b)
+
+	statePositions = np.flatnonzero(isState)
+	states = b[statePositions]
+	counts = np.ones(len(states), dtype=np.uint16)
+
+	hasCount = isCount[statePositions + 1]
+	counts[hasCount] += b[statePositions[hasCount] + 1]
+
+	return DecodedWaveform(states, counts, bitsPerPixel)
+
+
+def iterWaveformRuns(buf: typing.Union[bytes, bytearray, memoryview]) -> typing.Iterator[WaveformRun]:
+	"""Walks the waveform bytes once and yields `(s0, s1, s2, s3, count)` for each run. Keeps only `fc_active` and the position as its state, so, unlike `WaveformPiece`, it never looks back and cannot exceed the stack on long waveforms."""
+	n = len(buf)
+	i = 0
+	fcActive = False
+	while i < n:
+		b = buf[i]
+		i += 1
+
+		if b == RLE_TERMINATOR:
+			fcActive = not fcActive
+			continue
+
+		if fcActive or i >= n:
+			count = 1
+		else:
+			count = buf[i] + 1
+			i += 1
+
+		yield (b & 3, b >> 2 & 3, b >> 4 & 3, b >> 6 & 3, count)
+
+
+class WaveformCache:
+	"""Decoded waveforms of a single file keyed by their addresses. Many `(mode, temperature range)` pairs point to the same waveform, so each of them is decoded only once."""
+
+	__slots__ = ("data", "index", "bitsPerPixel", "decoded", "luts", "hits", "misses")
+
+	def __init__(self, data: typing.Union[bytes, bytearray, memoryview], index: typing.Optional["WaveformIndex"] = None, bitsPerPixel: int = DEFAULT_BITS_PER_PIXEL) -> None:
+		self.data = data
+		self.index = index
+		self.bitsPerPixel = bitsPerPixel
+		self.decoded = {}  # type: typing.Dict[int, DecodedWaveform]
+		self.luts = {}  # type: typing.Dict[int, np.ndarray]
+		self.hits = 0
+		self.misses = 0
+
+	def get(self, ptr: int, l: typing.Optional[int] = None) -> DecodedWaveform:
+		"""`l` can be omitted if the cache was given an index."""
+		res = self.decoded.get(ptr, None)
+		if res is not None:
+			self.hits += 1
+			return res
+
+		if l is None:
+			l = self.index.length(ptr)
+
+		self.misses += 1
+		res = self.decoded[ptr] = decodeWaveform(self.data[ptr : ptr + l], self.bitsPerPixel)
+		return res
+
+	def lut(self, ptr: int, l: typing.Optional[int] = None) -> np.ndarray:
+		"""The `transitionLut` of the waveform. It is expanded only once and shared, so it is read-only."""
+		res = self.luts.get(ptr, None)
+		if res is None:
+			res = self.luts[ptr] = self.get(ptr, l).lut()
+			res.flags.writeable = False
+		return res
+
+	def sweep(self) -> None:
+		"""Decodes all the unique waveforms of the index in the order of their addresses, so the file is read sequentially."""
+		for ptr, l in self.index.extents():
+			if ptr not in self.decoded:
+				self.get(ptr, l)
+
+	def __len__(self) -> int:
+		return len(self.decoded)
+
+	def __repr__(self) -> str:
+		return self.__class__.__name__ + "(" + str(len(self)) + " waveforms, " + str(self.hits) + " hits, " + str(self.misses) + " misses)"
@@ -0,0 +1,223 @@
+import struct
+import typing
+from pathlib import Path
+
+import numpy as np
+
+from .header import TEMP_RANGE_TABLE_OFFSET, WaveformHeader, readHeader
+from .tables import WaveformIndex
+from .waveform import DEFAULT_BITS_PER_PIXEL, INKWAVE_PHASE_SHIFT, WaveformCache, phaseShift, transitionLut
+
+__all__ = ("MYSTERIOUS_OFFSET", "WrfLayout", "renderWrf", "renderTempRanges", "writeWrf", "ExpandedWaveform", "WrfFile")
+
+Buffer = typing.Union[bytes, bytearray, memoryview]
+
+# for unknown reasons addresses in the .wrf file
+# need to be offset by 63 bytes
+MYSTERIOUS_OFFSET = 63
+
+# an address in the mode table and the temperature range tables is followed by 4 unused bytes
+TABLE_ENTRY_SIZE = 8
+
+# each waveform is preceded by its state count and 6 unused bytes
+STATE_COUNT_STRUCT = struct.Struct("<H")
+WAVEFORM_PREFIX_SIZE = 8
+
+# each state is written as 4 bytes: s0, s1, s2, s3
+STATE_SIZE = 4
+
+
+class WrfLayout:
+	"""Offsets of everything in the `.wrf` file, computed before writing anything, so the file can be filled in a single preallocated buffer instead of seeking back and forth to patch the tables.
+
+	The file is: the header, the temperature range table, the mode table, then for each mode its temperature range table followed by the waveforms of each its temperature range. A waveform is written for each `(mode, temperature range)` pair, even if it is shared.
+	"""
+
+	__slots__ = ("modeTable", "tempRangeTables", "waveforms", "stateCounts", "size")
+
+	def __init__(self, modeTable: int, tempRangeTables: np.ndarray, waveforms: np.ndarray, stateCounts: np.ndarray, size: int) -> None:
+		self.modeTable = modeTable
+		self.tempRangeTables = tempRangeTables  # shape is (modes,)
+		self.waveforms = waveforms  # offsets of the state counts preceding the waveforms, shape is (modes, temperature ranges)
+		self.stateCounts = stateCounts  # shape is (modes, temperature ranges)
+		self.size = size
+
+	@classmethod
+	def fromIndex(cls, index: WaveformIndex, cache: WaveformCache) -> "WrfLayout":
+		modeCount, tempRangeCount = index.ptrs.shape
+
+		unique = np.array(index.unique, dtype=index.ptrs.dtype)
+		uniqueStateCounts = np.array([cache.get(ptr).state_count for ptr in index.unique], dtype=np.int64)
+		stateCounts = uniqueStateCounts[np.searchsorted(unique, index.ptrs)]
+
+		# there is one more temperature than temperature ranges
+		modeTable = TEMP_RANGE_TABLE_OFFSET + tempRangeCount + 1
+
+		waveformSizes = WAVEFORM_PREFIX_SIZE + STATE_SIZE * stateCounts
+		tempRangeTableSize = TABLE_ENTRY_SIZE * tempRangeCount
+		modeSizes = tempRangeTableSize + waveformSizes.sum(axis=1)
+
+		tempRangeTables = modeTable + TABLE_ENTRY_SIZE * modeCount + np.cumsum(modeSizes) - modeSizes
+		waveforms = tempRangeTables[:, None] + tempRangeTableSize + np.cumsum(waveformSizes, axis=1) - waveformSizes
+		size = int(tempRangeTables[-1] + modeSizes[-1]) if modeCount else modeTable
+		return cls(modeTable, tempRangeTables, waveforms, stateCounts, size)
+
+
+def _fillTable(buf: bytearray, offset: int, addrs: np.ndarray) -> None:
+	table = np.zeros((len(addrs), TABLE_ENTRY_SIZE // 4), dtype="<u4")
+	table[:, 0] = addrs - MYSTERIOUS_OFFSET
+	buf[offset : offset + table.nbytes] = table.tobytes()
+
+
+def _fillTempRanges(buf: bytearray, base: int, tempRangeTable: int, ranges: typing.Iterable[int], offsets: np.ndarray, stateCounts: typing.Iterable[int], cache: WaveformCache, expanded: typing.Dict[int, bytes]) -> None:
+	"""Writes a temperature range table and the waveforms following it. The offsets are the ones in the file, `buf` starts at `base` of it."""
+	_fillTable(buf, tempRangeTable - base, offsets)
+
+	for ptr, offset, stateCount in zip(ranges, offsets.tolist(), stateCounts):
+		states = expanded.get(ptr, None)
+		if states is None:
+			states = expanded[ptr] = cache.get(ptr).expand().tobytes()
+
+		# `inkwave` counts bytes, not states, and stores the count into `uint16_t`
+		STATE_COUNT_STRUCT.pack_into(buf, offset - base, (stateCount << 2) & 0xFFFF)
+		start = offset - base + WAVEFORM_PREFIX_SIZE
+		buf[start : start + len(states)] = states
+
+
+def renderWrf(data: typing.Union[bytes, memoryview], header: typing.SupportsBytes, index: WaveformIndex, cache: typing.Optional[WaveformCache] = None, layout: typing.Optional[WrfLayout] = None) -> bytearray:
+	"""Converts the `.wbf` file into a `.wrf` one in memory. The header is copied as is."""
+	if cache is None:
+		cache = WaveformCache(data, index)
+	if layout is None:
+		layout = WrfLayout.fromIndex(index, cache)
+
+	buf = bytearray(layout.size)
+	buf[:TEMP_RANGE_TABLE_OFFSET] = bytes(header)
+	buf[TEMP_RANGE_TABLE_OFFSET : layout.modeTable] = data[TEMP_RANGE_TABLE_OFFSET : layout.modeTable]
+
+	_fillTable(buf, layout.modeTable, layout.tempRangeTables)
+
+	expanded = {}  # type: typing.Dict[int, bytes]
+	for ranges, tempRangeTable, offsets, stateCounts in zip(index.ptrs.tolist(), layout.tempRangeTables.tolist(), layout.waveforms, layout.stateCounts.tolist()):
+		_fillTempRanges(buf, 0, tempRangeTable, ranges, offsets, stateCounts, cache, expanded)
+
+	return buf
+
+
+def renderTempRanges(ranges: typing.Sequence[int], cache: WaveformCache, offset: int) -> bytearray:
+	"""The temperature range table of a mode and its waveforms (see `WrfLayout`), to be written at `offset` of a `.wrf` file"""
+	stateCounts = [cache.get(ptr).state_count for ptr in ranges]
+	waveformSizes = WAVEFORM_PREFIX_SIZE + STATE_SIZE * np.array(stateCounts, dtype=np.int64)
+	tableSize = TABLE_ENTRY_SIZE * len(ranges)
+	offsets = offset + tableSize + np.cumsum(waveformSizes) - waveformSizes
+
+	buf = bytearray(tableSize + int(waveformSizes.sum()))
+	_fillTempRanges(buf, offset, offset, ranges, offsets, stateCounts, cache, {})
+	return buf
+
+
+def writeWrf(path: Path, data: typing.Union[bytes, memoryview], header: typing.SupportsBytes, index: WaveformIndex, cache: typing.Optional[WaveformCache] = None) -> int:
+	"""Writes the `.wrf` file with a single `write`. Returns its size."""
+	buf = renderWrf(data, header, index, cache)
+	with Path(path).open("wb") as f:
+		f.write(buf)
+	return len(buf)
+
+
+class ExpandedWaveform:
+	"""A waveform as it is stored in `.wrf`: every state is already repeated `count` times. Has the same interface as `DecodedWaveform`, but `expand` doesn't copy anything."""
+
+	__slots__ = ("states", "bitsPerPixel")
+
+	def __init__(self, states: np.ndarray, bitsPerPixel: int = DEFAULT_BITS_PER_PIXEL) -> None:
+		self.states = states  # shape is (state_count, 4)
+		self.bitsPerPixel = bitsPerPixel
+
+	def __len__(self) -> int:
+		return len(self.states)
+
+	@property
+	def state_count(self) -> int:
+		return len(self.states)
+
+	@property
+	def phases(self) -> int:
+		"""See `DecodedWaveform.phases`"""
+		return self.state_count >> INKWAVE_PHASE_SHIFT
+
+	@property
+	def lutPhases(self) -> int:
+		return self.state_count >> phaseShift(self.bitsPerPixel)
+
+	def expand(self) -> np.ndarray:
+		return self.states
+
+	def lut(self) -> np.ndarray:
+		"""See `transitionLut`, here it is a view of the file."""
+		return transitionLut(self.states, self.bitsPerPixel)
+
+
+class WrfFile:
+	"""Reads a `.wrf` file: the address tables are read at once, the waveforms are views of the buffer created only when asked for."""
+
+	__slots__ = ("data", "header", "bounds", "tempRangeTables", "waveforms", "stateCounts")
+
+	def __init__(self, data: Buffer, header: WaveformHeader, bounds: typing.List[int], tempRangeTables: np.ndarray, waveforms: np.ndarray, stateCounts: np.ndarray) -> None:
+		self.data = data
+		self.header = header
+		self.bounds = bounds
+		self.tempRangeTables = tempRangeTables  # shape is (modes,)
+		self.waveforms = waveforms  # offsets of the state counts preceding the waveforms, shape is (modes, temperature ranges)
+		self.stateCounts = stateCounts  # shape is (modes, temperature ranges)
+
+	@classmethod
+	def fromBuffer(cls, data: Buffer) -> "WrfFile":
+		"""Raises `ValueError` if the tables point outside of the file or the waveforms overlap."""
+		header = readHeader(data)
+		modeCount = header.mode_count + 1
+		tempRangeCount = header.temperature_range_count + 1
+
+		modeTable = TEMP_RANGE_TABLE_OFFSET + tempRangeCount + 1
+		bounds = list(data[TEMP_RANGE_TABLE_OFFSET:modeTable])
+
+		b = np.frombuffer(data, dtype=np.uint8)
+		tempRangeTables = cls._readTable(b, np.array([modeTable]), modeCount)[0]
+		waveforms = cls._readTable(b, tempRangeTables, tempRangeCount)
+
+		# the state counts stored in the file are 16-bit, so they overflow on long waveforms. Each waveform ends where the next thing in the file starts.
+		starts = np.unique(np.concatenate((tempRangeTables, waveforms.ravel(), (len(b),))))
+		ends = starts[np.minimum(np.searchsorted(starts, waveforms, side="right"), len(starts) - 1)]
+		sizes = ends - waveforms - WAVEFORM_PREFIX_SIZE
+		if (sizes < 0).any() or (sizes % STATE_SIZE).any():
+			raise ValueError("Broken .wrf: waveforms overlap or are truncated")
+
+		return cls(data, header, bounds, tempRangeTables, waveforms, sizes // STATE_SIZE)
+
+	@staticmethod
+	def _readTable(b: np.ndarray, offsets: np.ndarray, count: int) -> np.ndarray:
+		entries = offsets[:, None] + TABLE_ENTRY_SIZE * np.arange(count)
+		if len(entries) and entries.max() + 4 > len(b):
+			raise ValueError("Broken .wrf: an address table is out of the file")
+		addrs = b[entries[..., None] + np.arange(4)].view("<u4")[..., 0].astype(np.int64) + MYSTERIOUS_OFFSET
+		if len(addrs) and (addrs.max() + WAVEFORM_PREFIX_SIZE > len(b)):
+			raise ValueError("Broken .wrf: an address points out of the file")
+		return addrs
+
+	@property
+	def modeCount(self) -> int:
+		return self.waveforms.shape[0]
+
+	@property
+	def tempRangeCount(self) -> int:
+		return self.waveforms.shape[1]
+
+	def storedStateCount(self, mode: int, tempRange: int) -> int:
+		"""The state count as it is written before the waveform: in bytes, truncated to 16 bits."""
+		return STATE_COUNT_STRUCT.unpack_from(self.data, int(self.waveforms[mode, tempRange]))[0]
+
+	def stateCountMatches(self, mode: int, tempRange: int) -> bool:
+		return self.storedStateCount(mode, tempRange) == (int(self.stateCounts[mode, tempRange]) << 2) & 0xFFFF
+
+	def waveform(self, mode: int, tempRange: int) -> ExpandedWaveform:
+		n = int(self.stateCounts[mode, tempRange])
+		return ExpandedWaveform(np.frombuffer(self.data, dtype=np.uint8, count=STATE_SIZE * n, offset=int(self.waveforms[mode, tempRange]) + WAVEFORM_PREFIX_SIZE).reshape(n, STATE_SIZE), self.header.bits_per_pixel)
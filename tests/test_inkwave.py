@@ -0,0 +1,243 @@
+import re
+import socket
+import struct
+import threading
+from pathlib import Path
+from zlib import crc32
+
+import kaitaistruct
+import numpy as np
+import pytest
+
+from inkwave.api import mainAPI
+from inkwave.checksums import CRC32_START_VALUE, ChecksumError, iterChecksumErrors, validateChecksums
+from inkwave.diskcache import DiskCache
+from inkwave.header import readHeader
+from inkwave.kaitai.eink_wbf import EinkWbf
+from inkwave.kaitai.memory_view_io import MemoryViewIO
+from inkwave.lookup import lookupWaveform, lookupWrfWaveform
+from inkwave.server import REQUEST_HEADER, RESPONSE_HEADER, STATUS_ERROR, STATUS_OK, WaveformClient, WaveformServer, makeServer
+from inkwave.store import storeAPI
+from inkwave.synth import SynthParams, generateWbf
+from inkwave.tables import WaveformIndex
+from inkwave.trace import ListSink, traceWaveform
+from inkwave.trailer import trailerAPI
+from inkwave.waveform import WaveformCache, decodeWaveform, iterWaveformRuns
+from inkwave.wrf import WrfFile, renderWrf
+
+# small enough for the Kaitai-generated parser, the baseline everything is compared to
+PARAMS = {
+	4: SynthParams(modeCount=3, tempRangeCount=4, uniqueWaveforms=6, phases=8),
+	5: SynthParams(modeCount=3, tempRangeCount=4, uniqueWaveforms=6, phases=8, bitsPerPixel=5),
+}
+
+PHASES_LINE = re.compile(r"^\s*Checking range\s+\d+:\s+(\d+) phases \(\s*(\d+)\)$")
+
+
+@pytest.fixture(params=sorted(PARAMS), ids=lambda bpp: str(bpp) + "bpp")
+def wbf(request) -> bytes:
+	return generateWbf(request.param, PARAMS[request.param])
+
+
+@pytest.fixture
+def wbfPath(wbf: bytes, tmp_path: Path) -> Path:
+	p = tmp_path / "synthetic.wbf"
+	p.write_bytes(wbf)
+	return p
+
+
+def _index(data: bytes) -> WaveformIndex:
+	h = readHeader(data)
+	return WaveformIndex.fromBuffer(data, h.waveform_modes_table, h.mode_count + 1, h.temperature_range_count + 1)
+
+
+def _kaitai(data: bytes) -> EinkWbf:
+	return EinkWbf(kaitaistruct.KaitaiStream(MemoryViewIO(memoryview(data))))
+
+
+def _kaitaiWaveforms(data: bytes) -> dict:
+	"""The Kaitai-generated `Waveform`s by their addresses"""
+	return {r.wav_addr.ptr: r.waveform for m in _kaitai(data).modes for r in m.ranges.ranges}
+
+
+def _corrupt(data: bytes, offset: int) -> bytes:
+	"""Flips a byte and fixes the CRC32, so only the checksum covering the byte fails"""
+	d = bytearray(data)
+	d[offset] ^= 0x55
+	struct.pack_into("<I", d, 0, crc32(d[4:], CRC32_START_VALUE))
+	return bytes(d)
+
+
+def testDecodingParity(wbf: bytes) -> None:
+	bitsPerPixel = readHeader(wbf).bits_per_pixel
+	index = _index(wbf)
+	for ptr, kw in _kaitaiWaveforms(wbf).items():
+		body = wbf[ptr : ptr + index.length(ptr)]
+		wf = decodeWaveform(body, bitsPerPixel)
+		pieces = [p for p in kw.waveform if not p.is_terminator]
+
+		assert wf.states.tolist() == [p.current_byte for p in pieces]
+		assert wf.counts.tolist() == [p.count for p in pieces]
+		assert wf.state_count == kw.state_count
+		assert list(iterWaveformRuns(body)) == [tuple(s) + (c,) for s, c in zip(wf.unpacked().tolist(), wf.counts.tolist())]
+
+
+def testTraceParity(wbf: bytes) -> None:
+	sink = ListSink()
+	k = _kaitai(wbf)
+	k.tracer = sink
+	for m in k.modes:
+		for r in m.ranges.ranges:
+			r.waveform
+
+	index = _index(wbf)
+	assert sink.traces
+	for trace in sink.traces:
+		assert traceWaveform(trace.ptr, wbf[trace.ptr : trace.ptr + index.length(trace.ptr)]) == trace
+
+
+def testPrintedPhases(wbfPath: Path, capsys) -> None:
+	"""The C `inkwave` prints `state_count >> 6` phases for 5 bits per pixel too"""
+	kws = _kaitaiWaveforms(wbfPath.read_bytes())
+	assert mainAPI(wbfPath, None, None, 1) == 0
+
+	lines = [PHASES_LINE.match(l) for l in capsys.readouterr().out.splitlines()]
+	printed = [(int(m.group(1)), int(m.group(2))) for m in lines if m]
+	assert printed
+	for phases, ptr in printed:
+		assert phases == kws[ptr].state_count >> 6
+
+
+def testWrfRoundTrip(wbf: bytes, tmp_path: Path) -> None:
+	h = readHeader(wbf)
+	index = _index(wbf)
+	cache = WaveformCache(wbf, index, h.bits_per_pixel)
+	wrfData = bytes(renderWrf(wbf, h, index, cache))
+	wrf = WrfFile.fromBuffer(wrfData)
+
+	assert (wrf.modeCount, wrf.tempRangeCount) == index.ptrs.shape
+	for mode, ranges in enumerate(index.ptrs.tolist()):
+		for tempRange, ptr in enumerate(ranges):
+			assert wrf.stateCountMatches(mode, tempRange)
+			assert np.array_equal(wrf.waveform(mode, tempRange).expand(), cache.get(ptr).expand())
+
+	wbfPath, wrfPath = tmp_path / "in.wbf", tmp_path / "out.wrf"
+	wbfPath.write_bytes(wbf)
+	assert mainAPI(wbfPath, None, wrfPath, 0) == 0
+	assert wrfPath.read_bytes() == wrfData
+
+
+def testLookup(wbf: bytes) -> None:
+	h = readHeader(wbf)
+	index = _index(wbf)
+	wrfData = renderWrf(wbf, h, index)
+	for mode in range(h.mode_count + 1):
+		for temp in range(-10, 70, 7):
+			found = lookupWaveform(wbf, mode, temp)
+			assert found.ptr == index.ptrs[mode, found.tempRange]
+			# the temperatures out of the table fall into the outermost ranges
+			assert temp in found.temps or found.tempRange in (0, h.temperature_range_count)
+
+			foundWrf = lookupWrfWaveform(wrfData, mode, temp)
+			assert foundWrf.tempRange == found.tempRange
+			assert np.array_equal(foundWrf.waveform.lut(), found.waveform.lut())
+			assert foundWrf.waveform.lutPhases == len(found.waveform.lut())
+
+	with pytest.raises(ValueError):
+		lookupWaveform(wbf, h.mode_count + 1, 20)
+
+
+def testDiskCache(wbf: bytes, tmp_path: Path) -> None:
+	h = readHeader(wbf)
+	index = _index(wbf)
+	cache = WaveformCache(wbf, index, h.bits_per_pixel)
+	cache.sweep()
+
+	disk = DiskCache(tmp_path)
+	assert disk.load(h.whole_header_crc32, h.size, wbf) is None
+	disk.store(h.whole_header_crc32, h.size, index, cache)
+
+	loadedIndex, loadedCache = disk.load(h.whole_header_crc32, h.size, wbf)
+	assert np.array_equal(loadedIndex.ptrs, index.ptrs)
+	for ptr in index.unique:
+		assert np.array_equal(loadedCache.get(ptr).expand(), cache.get(ptr).expand())
+
+
+def testChecksums(wbf: bytes) -> None:
+	validateChecksums(wbf)
+	assert not list(iterChecksumErrors(wbf))
+
+	d = bytearray(wbf)
+	d[-1] ^= 1
+	with pytest.raises(ChecksumError) as e:
+		validateChecksums(bytes(d))
+	assert e.value.offset == 0
+
+	modesTable = readHeader(wbf).waveform_modes_table
+	with pytest.raises(ChecksumError) as e:
+		validateChecksums(_corrupt(wbf, modesTable))
+	assert e.value.offset == modesTable
+
+
+def _status(response: bytes) -> int:
+	return RESPONSE_HEADER.unpack_from(response)[0]
+
+
+def testServerResponses(wbfPath: Path, tmp_path: Path) -> None:
+	wbf = wbfPath.read_bytes()
+	short = tmp_path / "short.wbf"
+	short.write_bytes(wbf[:20])
+	garbage = tmp_path / "garbage.wbf"
+	garbage.write_bytes(bytes(range(256)) * 8)
+
+	server = WaveformServer(maxFiles=1)
+	res = server.respond(wbfPath, "GC16", 20)
+	assert _status(res) == STATUS_OK
+	found = lookupWaveform(wbf, 2, 20)
+	assert res[RESPONSE_HEADER.size :] == found.waveform.lut().tobytes()
+
+	for path, mode in ((short, 0), (garbage, 0), (tmp_path / "missing.wbf", 0), (wbfPath, 99), (wbfPath, "BOGUS")):
+		assert _status(server.respond(path, mode, 20)) == STATUS_ERROR
+	assert len(server.files) <= 1
+
+
+def testServerProtocol(wbfPath: Path, tmp_path: Path) -> None:
+	address = tmp_path / "inkwave.sock"
+	server = makeServer(address, WaveformServer())
+	thread = threading.Thread(target=server.serve_forever, daemon=True)
+	thread.start()
+	try:
+		with WaveformClient(address) as client:
+			# a path which is not UTF-8 is answered with an error, and the connection stays usable
+			path, mode = b"\xff.wbf", b"0"
+			client.sock.sendall(REQUEST_HEADER.pack(len(path), len(mode), 20) + path + mode)
+			head = RESPONSE_HEADER.unpack(client.sock.recv(RESPONSE_HEADER.size))
+			assert head[0] == STATUS_ERROR
+			client.sock.recv(head[-1], socket.MSG_WAITALL)
+
+			with pytest.raises(ValueError):
+				client.get(wbfPath, 99, 20)
+
+			served = client.get(wbfPath, 1, 20)
+			found = lookupWaveform(wbfPath.read_bytes(), 1, 20)
+			assert served.tempRange == found.tempRange
+			assert np.array_equal(served.lut, found.waveform.lut())
+	finally:
+		server.shutdown()
+		server.server_close()
+
+
+def testCorpusToolsSkipShortFiles(tmp_path: Path, capsys) -> None:
+	corpus = tmp_path / "corpus"
+	corpus.mkdir()
+	wbf = generateWbf(0, PARAMS[4])
+	(corpus / "good.wbf").write_bytes(wbf)
+	(corpus / "short.wbf").write_bytes(wbf[:20])
+
+	trailerAPI([corpus], jobs=1)
+	assert "short.wbf <== ERROR" in capsys.readouterr().err
+
+	assert storeAPI(tmp_path / "store", [corpus], jobs=1, quiet=True) == 1
+	out = capsys.readouterr().out
+	assert "short.wbf <== ERROR" in out
+	assert "1 files ingested, 1 failed" in out